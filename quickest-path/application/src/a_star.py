@@ -1,96 +1,232 @@
 import networkx as nx
+import numpy as np
 import heapq as h
 from src.left_turn_handler import LeftTurnHandler
 from src.graph_utils import calculate_heuristic
+from src.graph_components import ComponentIndex
+from src.slim_graph import SlimGraph
+from src.a_star_kernel import a_star_kernel, prepare_kernel_data, prepare_restriction_data
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
 
 
 # klasa ma na celu umożliwić znajdowanie najszybszej ścieżki przejazdu między dwoma (!) węzłami w grafie
 # wykorzystywany jest algorytm A* z ustaloną wcześniej heurystyką
 # zakładającą maksymalny dopuszczlny maxspeed od następnego węzła w linii prostej do celu
 # można modyfikować heurystykę poprzez zmianę wartości maksymalnej dopuszczalnej prędkości
+# jeśli podano indeks silnie spójnych składowych, zapytania o węzły wzajemnie nieosiągalne odrzucane są bez przeszukiwania
+# jeśli do grafu dołączono zakazy skrętu (G.graph["turn_restrictions"]), zakazane manewry są pomijane przy relaksacji krawędzi
+# backend określa implementację przeszukiwania:
+# "python" - pętla korzystająca z interfejsu grafu networkx (działa dla każdego grafu)
+# "kernel" - jądro działające bezpośrednio na tablicach odchudzonego grafu (SlimGraph), kompilowane przez numbę, jeśli jest dostępna
+#            (dla grafów innych niż SlimGraph wykorzystywana jest pętla "python"); zwraca te same ścieżki i koszty
 class BestPathFinder:
     
-    def __init__(self, left_turn_handler: LeftTurnHandler, heur_maxspeed: int = 120):
+    BACKENDS = ["python", "kernel"]
+    
+    def __init__(self, left_turn_handler: LeftTurnHandler, heur_maxspeed: int = 120, component_index: ComponentIndex = None,
+                 backend: str = "python"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Nieznana implementacja przeszukiwania: {backend}. Dostępne: {', '.join(self.BACKENDS)}")
         self._left_turn_handler = left_turn_handler
         self._heur_maxspeed = heur_maxspeed
+        self._component_index = component_index
+        self._backend = backend
 
     
     def find_shortest_path(self, G: nx.MultiDiGraph, source: int, dest: int) -> list:
+        path, _, _ = self.find_shortest_path_with_stats(G, source, dest)
+        return path
+    
+    
+    # wariant zwracający oprócz ścieżki również jej koszt (czas przejazdu wraz z karami)
+    # oraz liczbę przetworzonych węzłów (na potrzeby eksperymentów)
+    def find_shortest_path_with_stats(self, G: nx.MultiDiGraph, source: int, dest: int) -> tuple:
+        # jeśli wiadomo, że z source nie da się dojechać do dest, nie ma sensu przeszukiwać grafu
+        if self._component_index is not None and not self._component_index.can_reach(source, dest):
+            raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+        
+        if self._backend == "kernel" and isinstance(G, SlimGraph):
+            return self._find_shortest_path_kernel(G, source, dest)
+        
+        target_states, real_dist, predecessors, number_of_visited = self._search(G, source, [dest], dest)
+        if dest not in target_states:
+            raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+        state = target_states[dest]
+        return self._reconstruct_path(predecessors, state), real_dist[state], number_of_visited
+    
+    
+    # czasy przejazdu (wraz z karami) z węzła source do każdego z węzłów targets - np. na potrzeby macierzy czasów przejazdu
+    # zamiast osobnego A* dla każdej pary wykonywane jest jedno przeszukiwanie Dijkstry (heurystyka zerowa),
+    # zakończone po osiągnięciu wszystkich celów; koszty są takie same jak koszty ścieżek z find_shortest_path_with_stats
+    # zwraca listę kosztów w kolejności targets (nieskończoność dla celów nieosiągalnych)
+    def find_travel_times(self, G: nx.MultiDiGraph, source: int, targets: list) -> list:
+        # cele, do których wiadomo, że nie da się dojechać, pomijamy bez przeszukiwania
+        reachable = [target for target in targets
+                     if self._component_index is None or self._component_index.can_reach(source, target)]
+        if len(reachable) == 0:
+            return [float('inf')] * len(targets)
+        
+        if self._backend == "kernel" and isinstance(G, SlimGraph):
+            costs = self._find_travel_times_kernel(G, source, reachable)
+        else:
+            target_states, real_dist, _, _ = self._search(G, source, reachable, None)
+            costs = {target: real_dist[state] for target, state in target_states.items()}
+        return [costs.get(target, float('inf')) for target in targets]
+    
+    
+    # przeszukiwanie od węzła source zakończone po przetworzeniu wszystkich węzłów targets (lub wyczerpaniu kolejki)
+    # heurystyka prowadzi do węzła dest (dla dest = None heurystyka jest zerowa, czyli jest to przeszukiwanie Dijkstry)
+    # zwraca (słownik stanów, w których osiągnięto cele, słownik kosztów, słownik poprzedników, liczba przetworzonych stanów)
+    def _search(self, G: nx.MultiDiGraph, source: int, targets: list, dest: int) -> tuple:
+        # zakazy skrętu (jeśli zostały wczytane razem z grafem)
+        # w węzłach, przez które prowadzi jakiś zakaz, przechowywana jest osobna etykieta dla każdego poprzednika
+        # (stan przeszukiwania to para (węzeł, poprzednik)), aby zakaz dla jednej krawędzi wjazdowej nie blokował pozostałych;
+        # dla pozostałych węzłów stanem jest sam węzeł, tak jak dotychczas
+        restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+        via_nodes = restrictions.via_nodes if restrictions is not None else frozenset()
+        source_state = (source, -1) if source in via_nodes else source
+        
         # inicjalizacja:
-        # definiujemy kolejkę priorytetową węzłów do przetworzenia
+        # definiujemy kolejkę priorytetową stanów do przetworzenia (węzeł w krotce rozstrzyga remisy tak jak dotychczas)
         priority_queue = []
-        h.heappush(priority_queue, (0, source))
+        h.heappush(priority_queue, (0, source, source_state))
         # definiujemy słownik przechowujący poprzedników na najkrótszej dotychczas znanej ścieżce
-        predecessors = {source: -1}
+        predecessors = {source_state: -1}
         # definiujemy słownik rzeczywistych długości na najkrótszej znalezionej ścieżce
         real_dist = {node: float('inf') for node in G.nodes}
-        real_dist[source] = 0
-        # definiujemy zbiór przetworzonych węzłów, aby żaden węzeł nie był przetworzony 2 razy
+        real_dist[source_state] = 0
+        # definiujemy zbiór przetworzonych stanów, aby żaden stan nie był przetworzony 2 razy
         visited_nodes = set()
+        # cele jeszcze nieosiągnięte oraz stany, w których osiągnięto cele
+        remaining_targets = set(targets)
+        target_states = {}
         
-        # przetwarzamy kolejne węzły do momentu znalezienia węzła końcowego lub wyczerpania kolejki
+        # przetwarzamy kolejne stany do momentu osiągnięcia wszystkich celów lub wyczerpania kolejki
         while len(priority_queue) > 0:
             
-            # wyciągnij z kolejki priorytetowej węzeł o najniższym oczekiwanym koszcie
-            _, current_node = h.heappop(priority_queue)
+            # wyciągnij z kolejki priorytetowej stan o najniższym oczekiwanym koszcie
+            _, current_node, current_state = h.heappop(priority_queue)
             
-            # jeżeli węzeł był już wcześniej odwiedzony, przejdź dalej
-            if current_node in visited_nodes:
+            # jeżeli stan był już wcześniej odwiedzony, przejdź dalej
+            if current_state in visited_nodes:
                 continue
             
-            # jeśli doszliśmy do celu - zwracamy ścieżkę
-            if current_node == dest:
-                return self._reconstruct_path(predecessors, current_node)#, real_dist[dest]
+            # pierwszy przetworzony stan celu ma najmniejszy koszt - jeśli osiągnęliśmy wszystkie cele, kończymy
+            if current_node in remaining_targets:
+                remaining_targets.remove(current_node)
+                target_states[current_node] = current_state
+                if len(remaining_targets) == 0:
+                    break
+            
+            # węzeł poprzedni na ścieżce (potrzebny do rozpoznawania skrętów)
+            predecessor = self._state_node(predecessors[current_state])
+            
+            # zakazy skrętu sprawdzamy tylko w węzłach, przez które prowadzi jakiś zakaz
+            restricted = type(current_state) is tuple and current_state != source_state
             
             # następnie badamy wszystkie sąsiednie węzły osiągalne z obecnego
             for edge in nx.edges(G, [current_node]):
                 
                 # zapisz id sąsiedniego węzła
-                neighbor = G.edges[(edge[0], edge[1], 0)]["v"]
+                edge_data = G.edges[(edge[0], edge[1], 0)]
+                neighbor = edge_data["v"]
+                
+                # pomiń manewr zabroniony przez zakaz skrętu
+                if restricted and restrictions.is_forbidden(predecessor, current_node, neighbor):
+                    continue
                 
                 # zapisz dystans pomiędzy węzłami (czyli oczekiwany czas przejazdu)
-                edge_length = G.edges[(edge[0], edge[1], 0)]["estimated_time"]
+                edge_length = edge_data["estimated_time"]
+                
+                # krawędzie uproszczonego grafu mogą zawierać skręty w lewo w usuniętych węzłach pośrednich
+                if "inner_left_turns" in edge_data:
+                    edge_length += self._left_turn_handler.calculate_inner_penalty(edge_data["inner_left_turns"])
                 
                 # sprawdź, czy rozpatrywany jest skręt w lewo
                 # jeśli tak, dolicz odpowiednią karę
-                if current_node != source:
-                    if self._left_turn_handler.is_turn_left(G, predecessors[current_node], current_node, neighbor):
-                        edge_length += self._left_turn_handler.calculate_penalty(G, predecessors[current_node], current_node, neighbor)
+                if current_state != source_state:
+                    if self._left_turn_handler.is_turn_left(G, predecessor, current_node, neighbor):
+                        edge_length += self._left_turn_handler.calculate_penalty(G, predecessor, current_node, neighbor)
                     
                 # oblicz oczekiwany koszt dojazdu ze startu do sąsiada przez current_node
-                dist_start_neighbor = real_dist[current_node] + edge_length
+                dist_start_neighbor = real_dist[current_state] + edge_length
+                neighbor_state = (neighbor, current_node) if neighbor in via_nodes else neighbor
                 
                 # jeśli czas dojazdu do sąsiada przez obecny punkt jest mniejszy niż najlepszy dotychczas wykryty,
                 # zapisz informację o znalezieniu lepszej trasy
-                if dist_start_neighbor < real_dist[neighbor]:
+                if dist_start_neighbor < real_dist.get(neighbor_state, float('inf')):
                     
                     # uaktualnij poprzednika
-                    predecessors[neighbor] = current_node
+                    predecessors[neighbor_state] = current_state
                     
                     # uaktualnij rzeczywisty czas dojazdu od startu do sąsiada
-                    real_dist[neighbor] = dist_start_neighbor
+                    real_dist[neighbor_state] = dist_start_neighbor
                     
                     # dodaj sąsiada do kolejki priorytetowej z estymowanym czasem dojazdu
                     # na który składa się suma dotychczasowego czasu dojazdu do węzła oraz wyniku heurystyki
-                    heur_est = calculate_heuristic(G, neighbor, dest, self._heur_maxspeed)
-                    h.heappush(priority_queue, (dist_start_neighbor + heur_est, neighbor))
+                    heur_est = calculate_heuristic(G, neighbor, dest, self._heur_maxspeed) if dest is not None else 0
+                    h.heappush(priority_queue, (dist_start_neighbor + heur_est, neighbor, neighbor_state))
                 
-            # dodaj właśnie przetwrzony węzeł do zbioru, aby nie był on przetwrzony ponownie
-            visited_nodes.add(current_node)
+            # dodaj właśnie przetwrzony stan do zbioru, aby nie był on przetworzony ponownie
+            visited_nodes.add(current_state)
         
-        # nie znaleziono ścieżki
-        raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+        return target_states, real_dist, predecessors, len(visited_nodes)
         
         
         
-    def _reconstruct_path(self, predecessors: dict, current_node: int) -> list:
-        path = [current_node]
-        while current_node in predecessors:
-            current_node = predecessors[current_node]
-            if current_node != -1:
-                path.insert(0, current_node)
+    # przeszukiwanie na tablicach odchudzonego grafu (indeksy węzłów zamiast id z OSM)
+    def _find_shortest_path_kernel(self, G: SlimGraph, source: int, dest: int) -> tuple:
+        dest_idx = G.node_index(dest)
+        number_of_visited, real_dist, predecessors, target_states = self._run_kernel(
+            G, source, np.array([dest_idx], dtype=np.int64), dest_idx, float(self._heur_maxspeed))
+        state = target_states[0]
+        if state == -1:
+            raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+        
+        # odtwórz ścieżkę po stanach (indeksach węzłów) i zamień je na id z OSM
+        _, _, state_node, _, _, _, _ = prepare_restriction_data(G)
+        cost = real_dist[state]
+        path = []
+        while state != -1:
+            path.append(state_node[state])
+            state = predecessors[state]
+        return G.node_ids[path[::-1]].tolist(), float(cost), int(number_of_visited)
+    
+    
+    # przeszukiwanie Dijkstry (heurystyka zerowa - nieskończona prędkość) do wielu celów na tablicach odchudzonego grafu
+    def _find_travel_times_kernel(self, G: SlimGraph, source: int, targets: list) -> dict:
+        targets_idx = np.array([G.node_index(target) for target in targets], dtype=np.int64)
+        source_idx = G.node_index(source)
+        _, real_dist, _, target_states = self._run_kernel(G, source, targets_idx, source_idx, np.inf)
+        return {target: float(real_dist[state]) for target, state in zip(targets, target_states) if state != -1}
+    
+    
+    def _run_kernel(self, G: SlimGraph, source: int, targets_idx: np.ndarray, dest_idx: int, heur_maxspeed: float) -> tuple:
+        source_idx = G.node_index(source)
+        cartesian_x, cartesian_y, cartesian_z, plane_x, plane_y, neighbor_count, highway_rank = prepare_kernel_data(G)
+        split_indptr, split_from, state_node, state_rule_start, state_rule_end, rule_to, rule_mandatory = prepare_restriction_data(G)
+        min_angle_left_turn, penalty_to_better_road, penalty_to_equal_road, penalty_to_worse_road = self._left_turn_handler.get_parameters()
+        return a_star_kernel(
+            G.indptr, G.indices, G.estimated_time, highway_rank, neighbor_count,
+            cartesian_x, cartesian_y, cartesian_z, plane_x, plane_y,
+            split_indptr, split_from, state_node, state_rule_start, state_rule_end, rule_to, rule_mandatory,
+            source_idx, targets_idx, dest_idx, heur_maxspeed, float(min_angle_left_turn),
+            float(penalty_to_better_road), float(penalty_to_equal_road), float(penalty_to_worse_road))
+    
+    
+    def _reconstruct_path(self, predecessors: dict, current_state) -> list:
+        path = [self._state_node(current_state)]
+        while current_state in predecessors:
+            current_state = predecessors[current_state]
+            if current_state != -1:
+                path.insert(0, self._state_node(current_state))
         return path
     
     
+    # węzeł odpowiadający stanowi przeszukiwania (stanem jest węzeł lub para (węzeł, poprzednik))
+    def _state_node(self, state) -> int:
+        return state[0] if type(state) is tuple else state
+    
+    
     
     
@@ -0,0 +1,244 @@
+import math
+import heapq
+import numpy as np
+from src.graph_utils import HIGHWAY_CATEGORIES, compare_highways
+from src.slim_graph import SlimGraph
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# jądro przeszukiwania kompilowane przez numbę (z zapisem skompilowanego kodu na dysku - cache=True),
+# a przy braku numby wykonywane jako zwykła funkcja Pythona (wynik jest taki sam, różni się tylko czas)
+def _compile(function):
+    if njit is None:
+        return function
+    return njit(cache=True)(function)
+
+
+NUMBA_AVAILABLE = njit is not None
+
+# klucz, pod którym w G.graph przechowywane są tablice pomocnicze jądra (wyznaczane raz dla grafu)
+KERNEL_DATA_KEY = "a_star_kernel_data"
+
+# klucz, pod którym w G.graph przechowywane są zakazy skrętu zapisane w indeksach węzłów grafu
+RESTRICTION_DATA_KEY = "a_star_kernel_restrictions"
+
+
+# tablice pomocnicze jądra wyznaczane raz dla grafu:
+# współrzędne kartezjańskie węzłów [km] (heurystyka - tak jak calculate_euclid_dist),
+# współrzędne węzłów zrzutowane na płaszczyznę [m] (wektory skrętów - tak jak get_vector_between_points),
+# liczba sąsiadów węzłów (poprzedników i następników - tak jak nx.all_neighbors)
+# oraz ranga kategorii drogi każdej krawędzi (porządek z compare_highways)
+def prepare_kernel_data(G: SlimGraph) -> tuple:
+    if KERNEL_DATA_KEY in G.graph:
+        return G.graph[KERNEL_DATA_KEY]
+
+    R = 6371
+    lon = np.radians(G.x.astype(np.float64))
+    lat = np.radians(G.y.astype(np.float64))
+    cartesian_x = R * np.cos(lat) * np.cos(lon)
+    cartesian_y = R * np.cos(lat) * np.sin(lon)
+    cartesian_z = R * np.sin(lat)
+    plane_x = 6371000 * lon
+    plane_y = 6371000 * lat
+
+    # liczba różnych następników i różnych poprzedników (krawędzie w obrębie węzła są posortowane po drugim końcu)
+    sources = np.repeat(np.arange(G.number_of_nodes()), np.diff(G.indptr))
+    new_successor = np.ones(G.number_of_edges(), dtype=bool)
+    new_successor[1:] = (sources[1:] != sources[:-1]) | (G.indices[1:] != G.indices[:-1])
+    targets = G.indices[G.redges]
+    new_predecessor = np.ones(G.number_of_edges(), dtype=bool)
+    new_predecessor[1:] = (targets[1:] != targets[:-1]) | (G.rindices[1:] != G.rindices[:-1])
+    neighbor_count = (np.bincount(sources[new_successor], minlength=G.number_of_nodes())
+                      + np.bincount(targets[new_predecessor], minlength=G.number_of_nodes())).astype(np.int32)
+
+    # ranga kategorii drogi: porównanie rang daje ten sam wynik co compare_highways
+    ranks = np.array([_highway_rank(code) for code in range(len(HIGHWAY_CATEGORIES))], dtype=np.int8)
+    highway_rank = ranks[G.highway]
+
+    data = (cartesian_x, cartesian_y, cartesian_z, plane_x, plane_y, neighbor_count, highway_rank)
+    G.graph[KERNEL_DATA_KEY] = data
+    return data
+
+
+# zakazy skrętu w postaci tablic w indeksach węzłów grafu
+# w węzłach, przez które prowadzi jakiś zakaz (via), przeszukiwanie przechowuje osobną etykietę dla każdego poprzednika:
+# stany 0..N-1 to węzły grafu, a kolejne stany to pary (węzeł via, poprzednik) - dla węzła i są to stany
+# N + split_indptr[i]..N + split_indptr[i + 1] - 1 z poprzednikami split_from (posortowanymi, więc stan wyznaczany jest
+# wyszukiwaniem binarnym); dla każdego stanu zapamiętany jest zakres reguł rule_to / rule_mandatory dotyczących
+# jego krawędzi wjazdowej (pusty dla stanów bez zakazów)
+# reguły dotyczące węzłów spoza grafu (np. usuniętych małych składowych) są pomijane
+def prepare_restriction_data(G: SlimGraph) -> tuple:
+    if RESTRICTION_DATA_KEY in G.graph:
+        return G.graph[RESTRICTION_DATA_KEY]
+
+    number_of_nodes = G.number_of_nodes()
+    restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+    rule_nodes = [np.empty(0, dtype=np.int64)] * 3 if restrictions is None else [restrictions.via, restrictions.from_node, restrictions.to_node]
+    mandatory = np.empty(0, dtype=np.bool_) if restrictions is None else restrictions.mandatory
+
+    # zamiana id węzłów z OSM na indeksy węzłów grafu
+    indexes, in_graph = [], np.ones(len(mandatory), dtype=bool)
+    for nodes in rule_nodes:
+        index = np.minimum(G.node_ids.searchsorted(nodes), number_of_nodes - 1)
+        in_graph &= G.node_ids[index] == nodes
+        indexes.append(index)
+    via, from_node, to_node = (index[in_graph] for index in indexes)
+    order = np.lexsort((to_node, from_node, via))
+    via, from_node, rule_to, rule_mandatory = via[order], from_node[order], to_node[order], mandatory[in_graph][order]
+
+    # stany (węzeł via, poprzednik) - różni poprzednicy węzłów via (odwrotny CSR jest posortowany po poprzedniku)
+    has_rules = np.zeros(number_of_nodes, dtype=bool)
+    has_rules[via] = True
+    targets = np.repeat(np.arange(number_of_nodes), np.diff(G.rindptr))
+    split_mask = has_rules[targets]
+    split_via, split_from = targets[split_mask], G.rindices[split_mask].astype(np.int64)
+    distinct = np.ones(len(split_via), dtype=bool)
+    distinct[1:] = (split_via[1:] != split_via[:-1]) | (split_from[1:] != split_from[:-1])
+    split_via, split_from = split_via[distinct], split_from[distinct]
+    split_indptr = np.zeros(number_of_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(split_via, minlength=number_of_nodes), out=split_indptr[1:])
+
+    # węzeł każdego stanu oraz zakres reguł dotyczących jego krawędzi wjazdowej
+    state_node = np.concatenate((np.arange(number_of_nodes, dtype=np.int64), split_via))
+    rule_keys = via * number_of_nodes + from_node
+    split_keys = split_via * number_of_nodes + split_from
+    state_rule_start = np.zeros(len(state_node), dtype=np.int64)
+    state_rule_end = np.zeros(len(state_node), dtype=np.int64)
+    state_rule_start[number_of_nodes:] = rule_keys.searchsorted(split_keys, side="left")
+    state_rule_end[number_of_nodes:] = rule_keys.searchsorted(split_keys, side="right")
+
+    data = (split_indptr, split_from, state_node, state_rule_start, state_rule_end, rule_to, rule_mandatory)
+    G.graph[RESTRICTION_DATA_KEY] = data
+    return data
+
+
+# ranga kategorii drogi (im mniejsza, tym lepsza droga) wyznaczona na podstawie compare_highways
+def _highway_rank(code: int) -> int:
+    return sum(compare_highways(code, other) == 1 for other in range(len(HIGHWAY_CATEGORIES)))
+
+
+# sprawdzenie, czy wjazd do węzła to_node jest zabroniony przez reguły rule_to[start:end] (dotyczące jednej krawędzi wjazdowej)
+# manewr jest zakazany, jeśli istnieje dla niego zakaz lub jeśli istnieje nakaz innego manewru (tak jak TurnRestrictionIndex.is_forbidden)
+@_compile
+def is_turn_forbidden(rule_to, rule_mandatory, start, end, to_node):
+    has_mandatory = False
+    mandatory_allows = False
+    for rule in range(start, end):
+        if rule_mandatory[rule]:
+            has_mandatory = True
+            if rule_to[rule] == to_node:
+                mandatory_allows = True
+        elif rule_to[rule] == to_node:
+            return True
+    return has_mandatory and not mandatory_allows
+
+
+# przeszukiwanie A* z karami za skręty w lewo na tablicach grafu (CSR)
+# odpowiada dokładnie pętli BestPathFinder._search:
+# etykieta na węzeł (w węzłach via zakazów skrętu - na parę (węzeł, poprzednik)), brak kary w węźle startowym,
+# dla krawędzi wielokrotnych brana jest pierwsza krawędź (klucz 0), węzeł o dwóch sąsiadach nie jest skrzyżowaniem,
+# a skręt w lewo rozpoznawany jest po kącie między wektorami; manewry zabronione przez zakazy skrętu są pomijane
+# przeszukiwanie kończy się po przetworzeniu wszystkich węzłów targets (heurystyka prowadzi do węzła dest),
+# więc dla heur_maxspeed = inf (heurystyka zerowa) jest to przeszukiwanie Dijkstry od source do wielu celów
+# zwraca (liczba przetworzonych stanów, tablica kosztów, tablica poprzedników (stanów), stan osiągnięcia każdego celu lub -1)
+@_compile
+def a_star_kernel(indptr, indices, estimated_time, highway_rank, neighbor_count,
+                  cartesian_x, cartesian_y, cartesian_z, plane_x, plane_y,
+                  split_indptr, split_from, state_node, state_rule_start, state_rule_end, rule_to, rule_mandatory,
+                  source, targets, dest, heur_maxspeed, min_angle_left_turn,
+                  penalty_to_better_road, penalty_to_equal_road, penalty_to_worse_road):
+    number_of_nodes = len(indptr) - 1
+    number_of_states = len(state_node)
+    real_dist = np.full(number_of_states, np.inf)
+    predecessors = np.full(number_of_states, -1, dtype=np.int64)
+    predecessor_edge = np.full(number_of_states, -1, dtype=np.int64)
+    visited = np.zeros(number_of_states, dtype=np.bool_)
+    number_of_visited = 0
+
+    # cele jeszcze nieosiągnięte (ten sam węzeł może wystąpić na liście kilka razy)
+    is_target = np.zeros(number_of_nodes, dtype=np.bool_)
+    remaining_targets = 0
+    for target in targets:
+        if not is_target[target]:
+            is_target[target] = True
+            remaining_targets += 1
+    target_states = np.full(len(targets), -1, dtype=np.int64)
+
+    real_dist[source] = 0.0
+    priority_queue = [(0.0, source, source)]
+    while len(priority_queue) > 0:
+        _, current_node, current_state = heapq.heappop(priority_queue)
+        if visited[current_state]:
+            continue
+        if is_target[current_node]:
+            is_target[current_node] = False
+            for k in range(len(targets)):
+                if targets[k] == current_node:
+                    target_states[k] = current_state
+            remaining_targets -= 1
+            if remaining_targets == 0:
+                return number_of_visited, real_dist, predecessors, target_states
+
+        predecessor_state = predecessors[current_state]
+        predecessor = state_node[predecessor_state] if predecessor_state >= 0 else -1
+        rule_start = state_rule_start[current_state]
+        rule_end = state_rule_end[current_state]
+        for edge in range(indptr[current_node], indptr[current_node + 1]):
+            neighbor = np.int64(indices[edge])
+
+            # kolejne krawędzie do tego samego sąsiada - A* korzysta z danych krawędzi o kluczu 0 (pierwszej)
+            if edge > indptr[current_node] and indices[edge - 1] == neighbor:
+                continue
+
+            # pomiń manewr zabroniony przez zakaz skrętu (dla stanów bez zakazów zakres reguł jest pusty)
+            if rule_start < rule_end and is_turn_forbidden(rule_to, rule_mandatory, rule_start, rule_end, neighbor):
+                continue
+            edge_length = float(estimated_time[edge])
+
+            # kara za skręt w lewo w węźle current_node (poza węzłem startowym i węzłami w środku drogi)
+            if current_state != source and neighbor_count[current_node] != 2:
+                ax = plane_x[current_node] - plane_x[predecessor]
+                ay = plane_y[current_node] - plane_y[predecessor]
+                bx = plane_x[neighbor] - plane_x[current_node]
+                by = plane_y[neighbor] - plane_y[current_node]
+                norms = math.sqrt(ax * ax + ay * ay) * math.sqrt(bx * bx + by * by)
+                alpha = math.degrees(math.atan2((ax * by - ay * bx) / norms, (ax * bx + ay * by) / norms))
+                if alpha > min_angle_left_turn:
+                    from_rank = highway_rank[predecessor_edge[current_state]]
+                    to_rank = highway_rank[edge]
+                    if from_rank < to_rank:
+                        edge_length += penalty_to_worse_road
+                    elif from_rank == to_rank:
+                        edge_length += penalty_to_equal_road
+                    else:
+                        edge_length += penalty_to_better_road
+
+            # stan sąsiada - w węźle via zakazu wyznaczany wyszukiwaniem binarnym po poprzedniku
+            neighbor_state = neighbor
+            split_start = split_indptr[neighbor]
+            split_end = split_indptr[neighbor + 1]
+            if split_start < split_end:
+                neighbor_state = number_of_nodes + split_start + np.searchsorted(split_from[split_start:split_end], current_node)
+
+            dist_start_neighbor = real_dist[current_state] + edge_length
+            if dist_start_neighbor < real_dist[neighbor_state]:
+                predecessors[neighbor_state] = current_state
+                predecessor_edge[neighbor_state] = edge
+                real_dist[neighbor_state] = dist_start_neighbor
+
+                # heurystyka tak jak calculate_heuristic: odległość euklidesowa [km] / prędkość [km/s]
+                dx = cartesian_x[dest] - cartesian_x[neighbor]
+                dy = cartesian_y[dest] - cartesian_y[neighbor]
+                dz = cartesian_z[dest] - cartesian_z[neighbor]
+                heur_est = math.sqrt(dx * dx + dy * dy + dz * dz) / (heur_maxspeed / 3600)
+                heapq.heappush(priority_queue, (dist_start_neighbor + heur_est, neighbor, neighbor_state))
+
+        visited[current_state] = True
+        number_of_visited += 1
+
+    return number_of_visited, real_dist, predecessors, target_states
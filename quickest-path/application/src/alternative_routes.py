@@ -0,0 +1,156 @@
+import networkx as nx
+import heapq as h
+from src.left_turn_handler import LeftTurnHandler
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+
+
+# klasa ma na celu wyznaczenie kilku istotnie różnych tras alternatywnych między dwoma węzłami
+# wykorzystywana jest metoda "plateau": jedno przeszukiwanie (Dijkstra) od źródła i jedno wstecz od celu,
+# a trasy alternatywne składane są z obu drzew najkrótszych ścieżek w miejscach, w których drzewa się pokrywają (plateau)
+# dzięki temu k tras wyznaczamy na podstawie dwóch przeszukiwań zamiast k niezależnych wywołań A*
+# kary za skręty w lewo uwzględniane są w obu przeszukiwaniach oraz przy wyznaczaniu kosztu gotowych tras
+# zakazy skrętu (G.graph["turn_restrictions"]) pomijane są przy relaksacji krawędzi w obu przeszukiwaniach,
+# a trasy złożone z obu drzew, które w miejscu złączenia wymagałyby zakazanego manewru, są odrzucane
+# (w odróżnieniu od A* każdy węzeł ma jedną etykietę, więc trasa wymagająca innego wjazdu do węzła z zakazem może nie zostać znaleziona)
+class AlternativeRouteFinder:
+
+    # parametry:
+    # max_stretch - o ile (względnie) trasa alternatywna może być dłuższa od najlepszej (0.3 = o 30%)
+    # max_overlap - jaka część czasu przejazdu trasy może pokrywać się z wcześniej wybraną trasą
+
+    def __init__(self, left_turn_handler: LeftTurnHandler, max_stretch: float = 0.3, max_overlap: float = 0.7):
+        self._left_turn_handler = left_turn_handler
+        self._max_stretch = max_stretch
+        self._max_overlap = max_overlap
+
+
+    # główna metoda udostępniana na zewnątrz
+    # zwraca listę krotek (ścieżka, koszt, udział części wspólnej z najlepszą trasą)
+    # pierwsza trasa na liście jest trasą najlepszą, pozostałe są posortowane według jakości plateau
+    def find_alternatives(self, G: nx.MultiDiGraph, source: int, dest: int, number_of_routes: int = 3) -> list:
+
+        restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+
+        # przeszukiwanie od źródła - do osiągnięcia celu, a następnie do granicy dopuszczalnego wydłużenia trasy
+        forward_dist, forward_pred = self._search(G, source, dest, forward=True)
+        if dest not in forward_dist:
+            raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+        best_cost = forward_dist[dest]
+        cost_limit = (1 + self._max_stretch) * best_cost
+
+        # przeszukiwanie wstecz od celu ograniczone tą samą granicą
+        backward_dist, backward_succ = self._search(G, dest, source, forward=False, cost_limit=cost_limit)
+
+        best_path = self._tree_path(forward_pred, dest)[::-1]
+        routes = [(best_path, self._left_turn_handler.calculate_path_cost(G, best_path), 1.0)]
+        accepted_edges = [self._edge_times(G, best_path)]
+
+        # rozpatruj plateau od najdłuższego - długie plateau oznaczają trasy istotnie różne i "naturalne"
+        for via_node in self._find_plateaus(forward_dist, forward_pred, backward_dist, backward_succ, cost_limit):
+            if len(routes) >= number_of_routes:
+                break
+
+            # złóż trasę: ze źródła do węzła pośredniego po drzewie w przód, dalej do celu po drzewie wstecz
+            path = self._tree_path(forward_pred, via_node)[::-1] + self._tree_path(backward_succ, via_node)[1:]
+
+            # odrzuć trasy z pętlami, z zakazanym manewrem w miejscu złączenia drzew oraz zbyt długie
+            if len(set(path)) != len(path):
+                continue
+            if restrictions is not None and not restrictions.allows_path(path):
+                continue
+            cost = self._left_turn_handler.calculate_path_cost(G, path)
+            if cost > cost_limit:
+                continue
+
+            # odrzuć trasy pokrywające się w zbyt dużym stopniu z którąkolwiek z wybranych wcześniej tras
+            edge_times = self._edge_times(G, path)
+            total_time = sum(edge_times.values())
+            overlaps = [sum(time for edge, time in edge_times.items() if edge in accepted) / total_time
+                        for accepted in accepted_edges]
+            if max(overlaps) > self._max_overlap:
+                continue
+
+            routes.append((path, cost, overlaps[0]))
+            accepted_edges.append(edge_times)
+
+        return routes
+
+
+    # przeszukiwanie Dijkstry z karami za skręty w lewo (forward=False oznacza przeszukiwanie po krawędziach odwróconych)
+    # zwraca słownik odległości oraz słownik poprzedników (przy przeszukiwaniu wstecz - następników na drodze do celu)
+    # przeszukiwanie kończy się, gdy najmniejszy koszt w kolejce przekroczy cost_limit
+    # (przy braku limitu - po osiągnięciu węzła target, a następnie po przekroczeniu (1 + max_stretch) * koszt celu)
+    def _search(self, G: nx.MultiDiGraph, start: int, target: int, forward: bool, cost_limit: float = None) -> tuple:
+        restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+        priority_queue = [(0.0, start)]
+        dist = {start: 0.0}
+        tree = {start: -1}
+        settled = {}
+
+        while len(priority_queue) > 0:
+            current_dist, current_node = h.heappop(priority_queue)
+            if current_node in settled:
+                continue
+            if cost_limit is not None and current_dist > cost_limit:
+                break
+            settled[current_node] = current_dist
+            if current_node == target and cost_limit is None:
+                cost_limit = (1 + self._max_stretch) * current_dist
+
+            # węzeł sąsiadujący w drzewie (poprzednik przy przeszukiwaniu w przód, następnik - wstecz)
+            tree_neighbor = tree[current_node]
+            edges = G.out_edges(current_node) if forward else G.in_edges(current_node)
+            for u, v in edges:
+                neighbor = v if forward else u
+                edge_data = G.get_edge_data(u, v, 0)
+                edge_length = edge_data["estimated_time"] + self._left_turn_handler.calculate_inner_penalty(edge_data.get("inner_left_turns", 0))
+
+                # skręt w bieżącym węźle: (poprzednik, bieżący, sąsiad) w przód lub (sąsiad, bieżący, następnik) wstecz
+                # (manewry zabronione przez zakazy skrętu są pomijane)
+                if tree_neighbor != -1:
+                    turn = (tree_neighbor, current_node, neighbor) if forward else (neighbor, current_node, tree_neighbor)
+                    if restrictions is not None and restrictions.is_forbidden(*turn):
+                        continue
+                    if self._left_turn_handler.is_turn_left(G, *turn):
+                        edge_length += self._left_turn_handler.calculate_penalty(G, *turn)
+
+                new_dist = current_dist + edge_length
+                if new_dist < dist.get(neighbor, float("inf")):
+                    dist[neighbor] = new_dist
+                    tree[neighbor] = current_node
+                    h.heappush(priority_queue, (new_dist, neighbor))
+
+        return settled, {node: tree[node] for node in settled}
+
+
+    # wyznaczenie plateau, czyli maksymalnych fragmentów wspólnych dla drzewa w przód i drzewa wstecz
+    # zwraca po jednym węźle z każdego plateau (jego początek), posortowane malejąco według długości plateau
+    def _find_plateaus(self, forward_dist: dict, forward_pred: dict, backward_dist: dict, backward_succ: dict, cost_limit: float) -> list:
+        plateau_start = {}
+        plateau_length = {}
+
+        # węzły przetwarzamy w kolejności odległości od źródła, aby początek plateau był znany przed jego dalszą częścią
+        candidates = sorted((node for node in forward_dist if node in backward_dist
+                             and forward_dist[node] + backward_dist[node] <= cost_limit), key=lambda node: forward_dist[node])
+        for node in candidates:
+            predecessor = forward_pred[node]
+            if predecessor in plateau_start and backward_succ.get(predecessor) == node:
+                start = plateau_start[predecessor]
+            else:
+                start = node
+            plateau_start[node] = start
+            plateau_length[start] = forward_dist[node] - forward_dist[start]
+
+        return sorted(plateau_length, key=lambda start: -plateau_length[start])
+
+
+    def _tree_path(self, tree: dict, node: int) -> list:
+        path = [node]
+        while tree[path[-1]] != -1:
+            path.append(tree[path[-1]])
+        return path
+
+
+    # czasy przejazdu krawędzi ścieżki (do wyznaczania części wspólnej tras)
+    def _edge_times(self, G: nx.MultiDiGraph, path: list) -> dict:
+        return {(u, v): G.get_edge_data(u, v, 0)["estimated_time"] for u, v in zip(path[:-1], path[1:])}
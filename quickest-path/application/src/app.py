@@ -1,9 +1,21 @@
+import os
+import time
+import networkx as nx
 from src.graph_provider import GraphProvider
 from src.left_turn_handler import LeftTurnHandler
-from src.input_validator import InputValidator
+from src.input_validator import InputValidator, MAX_ISOCHRONE_MINUTES
 from src.geo_mapper import GeoMapper
 from src.a_star import BestPathFinder
 from src.travel_sales_solver import TravelSalesmanSolver
+from src.vrp_solver import VehicleRoutingSolver
+from src.graph_simplifier import GraphSimplifier
+from src.slim_graph import SlimGraph
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+from src.graph_components import ComponentIndex
+from src.alternative_routes import AlternativeRouteFinder
+from src.isochrone import IsochroneBuilder
+from src.pareto_path_finder import ParetoPathFinder
+from src.heuristic_audit import derive_admissible_heuristic_speed
 from osmnx._errors import InsufficientResponseError
 
 # klasa reprezentująca działanie aplikacji
@@ -17,33 +29,66 @@ class App:
     # read_graph_from_pickle - czy graf ma być wczytany z pliku pkl (True), czy budowany od zera (False)
     # pickle_filepath - ścieżka do pliku .pkl w przypadku czytania z pliku
     # region - region, dla którego budujemy graf (domyślnie Warszawa w naszym zastosowaniu)
+    # array_graph_dir - katalog z grafem zapisanym w postaci tablic (np. przez GraphProvider.build_graph_streaming);
+    #                   jeśli podany, graf wczytywany jest z niego zamiast z pliku pkl lub z OSM - od razu jako graf odchudzony
+    #                   (slim_graph), a do grafu networkx konwertowany jest tylko wtedy, gdy wybrano simplify_graph
     # min_angle_left_turn - minimalny kąt odchylenia od kierunku jazdy, aby skręt klasyfikowany był jako skręt w lewo
     # penalty_to_better_road - kara za skręt w lewo w drogę o wyższym standardzie [s]
     # penalty_to_equal_road - kara za skręt w lewo w drogę o równym standardzie [s]
     # penalty_to_worse_road - kara za skręt w lewo w drogę o niższym standardzie [s]
     # heur_maxspeed - maksymalna prędkość hipotetycznej drogi wykorzystywana w heurystyce A* (jak bardzo eksplorujemy graf)
+    #                 domyślnie (None) wyznaczana przy wczytaniu grafu jako najmniejsza prędkość, przy której heurystyka jest dopuszczalna
+    # simplify_graph - czy usuwać z grafu węzły leżące w środku drogi (łańcuchy węzłów o dwóch sąsiadach)
+    # snap_to_largest_component - czy punkty mają być mapowane wyłącznie na węzły największej silnie spójnej składowej
+    # slim_graph - czy graf ma być przechowywany w postaci odchudzonej (tylko atrybuty potrzebne do wyszukiwania tras,
+    #              w postaci tablic); nie można go łączyć z simplify_graph
+    # search_backend - implementacja wyszukiwania najszybszej ścieżki: "python" lub "kernel"
+    #                  (jądro na tablicach odchudzonego grafu, kompilowane przez numbę, jeśli jest zainstalowana - wymaga slim_graph)
+    # nominatim_endpoint - adres usługi geokodowania Nominatim (np. lokalnej atrapy przy testach obciążeniowych);
+    #                      pusty - domyślny adres z osmnx
     
     def __init__(self,
                  read_graph_from_pickle: bool = False,
                  pickle_filepath: str = "",
                  region: str = "Warsaw",
+                 array_graph_dir: str = "",
                  max_points_allowed: int = 7,
                  min_angle_left_turn: float = 45.0,
                  penalty_to_better_road: float = 30.0,
                  penalty_to_equal_road: float = 20.0,
                  penalty_to_worse_road: float = 10.0,
-                 heur_maxspeed: int = 140):
+                 heur_maxspeed: float = None,
+                 simplify_graph: bool = False,
+                 snap_to_largest_component: bool = False,
+                 slim_graph: bool = False,
+                 search_backend: str = "python",
+                 nominatim_endpoint: str = ""):
+        
+        # graf z tablic nie jest konwertowany do networkx (zachowuje to ograniczenie pamięci z wczytywania strumieniowego)
+        if array_graph_dir and not simplify_graph:
+            slim_graph = True
+        
+        if simplify_graph and slim_graph:
+            raise ValueError("Odchudzony graf (slim_graph) nie obsługuje upraszczania (simplify_graph).")
+        if search_backend == "kernel" and not slim_graph:
+            raise ValueError("Wyszukiwanie na tablicach grafu (search_backend=\"kernel\") wymaga odchudzonego grafu (slim_graph).")
         
         self._is_state_initialized = False
         self._read_graph_from_pickle = read_graph_from_pickle
         self._pickle_filepath = pickle_filepath
         self._region = region
+        self._array_graph_dir = array_graph_dir
         self._max_points_allowed = max_points_allowed
         self._min_angle_left_turn = min_angle_left_turn
         self._penalty_to_better_road = penalty_to_better_road
         self._penalty_to_equal_road = penalty_to_equal_road
         self._penalty_to_worse_road = penalty_to_worse_road
         self._heur_maxspeed = heur_maxspeed
+        self._simplify_graph = simplify_graph
+        self._snap_to_largest_component = snap_to_largest_component
+        self._slim_graph = slim_graph
+        self._search_backend = search_backend
+        self._nominatim_endpoint = nominatim_endpoint
         
         self._G = None
         self._geo_mapper = None
@@ -51,7 +96,13 @@ class App:
         self._left_turn_handler = None
         self._best_path_finder = None
         self._travel_sales_solver = None
+        self._graph_simplifier = None
+        self._component_index = None
+        self._alternative_route_finder = None
+        self._isochrone_builder = None
+        self._pareto_path_finder = None
         self._last_query_coordinates = None
+        self._graph_version = None
         
     
     # metoda odpowiedzialna za inicjalizację stanu na starcie aplikacji
@@ -63,25 +114,61 @@ class App:
         
         # wczytaj / stwórz graf reprezentujący sieć drogową
         graph_provider = GraphProvider()
-        if self._read_graph_from_pickle:
+        if self._array_graph_dir and self._slim_graph:
+            self._G = graph_provider.read_slim_graph(self._array_graph_dir)
+        elif self._array_graph_dir:
+            self._G = graph_provider.read_array_graph(self._array_graph_dir)
+        elif self._read_graph_from_pickle:
             self._G = graph_provider.read_graph_from_pickle(self._pickle_filepath)
         else:
             self._G = graph_provider.build_graph(self._region)
         
-        # zainicjalizuj obiekty wymagane do funkcjonowania aplikacji
+        # jeśli wybrano, zastąp graf networkx grafem odchudzonym
+        if self._slim_graph and not isinstance(self._G, SlimGraph):
+            self._G = SlimGraph.from_networkx(self._G)
         
-        # obiekt odpowiedzialny za geomapowanie
-        self._geo_mapper = GeoMapper()
+        # jeśli nie podano prędkości w heurystyce, wyznacz najciaśniejszą dopuszczalną na podstawie danych o krawędziach
+        if self._heur_maxspeed is None:
+            self._heur_maxspeed = derive_admissible_heuristic_speed(self._G)
         
-        # obiekt odpowiedzialny za walidację danych wprowadzanych przy zapytaniu
-        self._input_validator = InputValidator(self._max_points_allowed)
+        # zapamiętaj wersję wczytanego grafu (np. do unieważniania zapamiętanych wyników zapytań)
+        self._graph_version = self._get_graph_version()
         
         # obiekt odpowiedzialny za rozpoznawanie i naliczanie kary za skręty w lewo
         self._left_turn_handler = LeftTurnHandler(self._penalty_to_better_road, self._penalty_to_equal_road, 
                                                   self._penalty_to_worse_road, self._min_angle_left_turn)
         
+        # obiekt odpowiedzialny za walidację danych wprowadzanych przy zapytaniu
+        # (zasięg mapy wyznaczany jest z grafu przed ewentualnym uproszczeniem)
+        self._input_validator = InputValidator(self._max_points_allowed)
+        self._input_validator.set_bbox_from_graph(self._G)
+        
+        # jeśli wybrano, uprość graf, usuwając węzły w środku drogi (skręty w nich są zliczane przy upraszczaniu)
+        if self._simplify_graph:
+            # węzły, których dotyczą zakazy skrętu, muszą pozostać w grafie (inaczej zakazów nie dałoby się sprawdzić)
+            restrictions = self._G.graph.get(TURN_RESTRICTIONS_KEY)
+            self._graph_simplifier = GraphSimplifier(self._left_turn_handler, restrictions.nodes() if restrictions is not None else None)
+            self._G = self._graph_simplifier.simplify(self._G)
+        
+        # zainicjalizuj obiekty wymagane do funkcjonowania aplikacji
+        
+        # etykiety silnie spójnych składowych - pozwalają od razu odrzucać zapytania o wzajemnie nieosiągalne węzły
+        self._component_index = ComponentIndex(self._G)
+        
+        # obiekt odpowiedzialny za geomapowanie
+        self._geo_mapper = GeoMapper(self._component_index, self._snap_to_largest_component, self._nominatim_endpoint)
+        
         # obiekt odpowiedzialny za obliczanie najszybszej ścieżki pomiędzy dwoma punktami (A*)
-        self._best_path_finder = BestPathFinder(self._left_turn_handler, self._heur_maxspeed)
+        self._best_path_finder = BestPathFinder(self._left_turn_handler, self._heur_maxspeed, self._component_index, self._search_backend)
+        
+        # obiekt odpowiedzialny za wyznaczanie tras alternatywnych
+        self._alternative_route_finder = AlternativeRouteFinder(self._left_turn_handler)
+        
+        # obiekt odpowiedzialny za wyznaczanie obszarów osiągalnych w zadanym czasie (izochron)
+        self._isochrone_builder = IsochroneBuilder(self._left_turn_handler)
+        
+        # obiekt odpowiedzialny za wyznaczanie tras Pareto-optymalnych względem czasu przejazdu i liczby skrętów w lewo
+        self._pareto_path_finder = ParetoPathFinder(self._left_turn_handler, self._heur_maxspeed, self._component_index)
         
         # obiekt odpowiedzialny za zachłanny algorytm aproksymacyjny rozwiązujący TSP
         self._travel_sales_solver = TravelSalesmanSolver(self._best_path_finder)
@@ -93,7 +180,147 @@ class App:
     # metoda udostępniana na zewnątrz, by móc wykonywać zapytania o najkrótszą ścieżkę
     # jako parametr przyjmuje listę adresów punktów, które należy odwiedzić
     # pierwszy punkt w liście jest punktem startowym, kolejność odwiedzania pozostałych jest wyznaczana przez algorytm
-    def run_query(self, addresses: list) -> list:
+    # jeśli podano słownik timings, zapisywane są w nim czasy [s] poszczególnych etapów zapytania (geocode, snap, search);
+    # słownik należy do wywołującego, więc równoległe zapytania (np. w wątkach serwera) nie mieszają swoich czasów
+    def run_query(self, addresses: list, timings: dict = None) -> list:
+        
+        # zmapuj adresy na węzły grafu
+        G, nodes_to_visit = self._map_addresses_to_nodes(addresses, timings)
+        
+        # mające listę węzłów do odwiedzenia, szukamy rozwiązania zadanego TSP
+        start = time.perf_counter()
+        discovered_path = self._travel_sales_solver.solve(G, nodes_to_visit)
+        if timings is not None:
+            timings["search"] = time.perf_counter() - start
+        
+        # zwracamy znalezioną ścieżkę (w uproszczonym grafie rozwiniętą o usunięte węzły pośrednie)
+        return self._expand_path(G, discovered_path)
+    
+    
+    # wariant run_query dla punktów podanych od razu jako współrzędne geograficzne (szerokość geo., długość geo.),
+    # bez geomapowania adresów (np. gdy adresy zostały zgeomapowane wcześniej, przez ShardRouter)
+    def run_query_from_coordinates(self, points_coordinates: list) -> list:
+        
+        # zmapuj współrzędne na węzły grafu
+        G, nodes_to_visit = self._map_coordinates_to_nodes(points_coordinates)
+        
+        # mające listę węzłów do odwiedzenia, szukamy rozwiązania zadanego TSP
+        discovered_path = self._travel_sales_solver.solve(G, nodes_to_visit)
+        
+        # zwracamy znalezioną ścieżkę (w uproszczonym grafie rozwiniętą o usunięte węzły pośrednie)
+        return self._expand_path(G, discovered_path)
+    
+    
+    # wariant run_query zwracający kolejne odcinki trasy od razu po ich wyznaczeniu
+    # walidacja i geomapowanie wykonywane są od razu (błędy zgłaszane są przy wywołaniu metody),
+    # a zwracany generator wyznacza kolejne odcinki w postaci krotek (ścieżka, współrzędne (dł. geo., szer. geo.), koszt)
+    def run_query_iter(self, addresses: list):
+        
+        # zmapuj adresy na węzły grafu
+        G, nodes_to_visit = self._map_addresses_to_nodes(addresses)
+        
+        def legs():
+            for best_path, cost in self._travel_sales_solver.solve_iter(G, nodes_to_visit):
+                yield self._expand_path(G, best_path), self._path_coordinates(G, best_path), cost
+        
+        return legs()
+    
+    
+    # metoda udostępniana na zewnątrz, by móc wyznaczać trasy alternatywne
+    # kolejność odwiedzania punktów wyznaczana jest tak samo jak w run_query,
+    # a dla każdego odcinka trasy (pary kolejnych punktów) zwracana jest lista tras alternatywnych
+    # w postaci krotek (ścieżka, koszt, udział części wspólnej z najlepszą trasą)
+    def run_alternatives_query(self, addresses: list, number_of_routes: int = 3) -> list:
+        
+        # zmapuj adresy na węzły grafu i wyznacz kolejność ich odwiedzania
+        G, nodes_to_visit = self._map_addresses_to_nodes(addresses)
+        order = self._travel_sales_solver.get_visit_order(G, nodes_to_visit)
+        
+        # dla każdego odcinka wyznacz trasy alternatywne
+        legs = []
+        for source, dest in zip(order[:-1], order[1:]):
+            alternatives = self._alternative_route_finder.find_alternatives(G, source, dest, number_of_routes)
+            legs.append([(self._expand_path(G, path), cost, overlap) for path, cost, overlap in alternatives])
+        return legs
+    
+    
+    # metoda udostępniana na zewnątrz, by móc porównać trasy różniące się liczbą skrętów w lewo
+    # kolejność odwiedzania punktów wyznaczana jest tak samo jak w run_query, a dla każdego odcinka trasy zwracany jest
+    # front Pareto w postaci krotek (czas przejazdu bez kar, (skręty w lepszą, równą, gorszą drogę), ścieżka)
+    def run_pareto_query(self, addresses: list) -> list:
+        
+        # zmapuj adresy na węzły grafu i wyznacz kolejność ich odwiedzania
+        G, nodes_to_visit = self._map_addresses_to_nodes(addresses)
+        order = self._travel_sales_solver.get_visit_order(G, nodes_to_visit)
+        
+        # dla każdego odcinka wyznacz front Pareto
+        legs = []
+        for source, dest in zip(order[:-1], order[1:]):
+            front = self._pareto_path_finder.find_pareto_front(G, source, dest)
+            if len(front) == 0:
+                raise RuntimeError(f"Algorytmowi nie udało się znaleźć ścieżki pomiędzy {source} a {dest}.")
+            legs.append([(travel_time, turns, self._expand_path(G, path)) for travel_time, turns, path in front])
+        return legs
+    
+    
+    # metoda udostępniana na zewnątrz, by móc dzielić przystanki między kilka pojazdów wyjeżdżających z jednej bazy
+    # pierwszy adres jest bazą, pozostałe to przystanki; ograniczenia pojazdów opisane są w VehicleRoutingSolver
+    # zwraca listę tras kolejnych pojazdów w postaci krotek (kolejność przystanków, ścieżka, koszt)
+    def run_vehicle_routing_query(self, addresses: list, number_of_vehicles: int, max_stops=None, max_route_time=None,
+                                  time_budget: float = 5.0) -> list:
+        
+        # zmapuj adresy na węzły grafu
+        G, nodes_to_visit = self._map_addresses_to_nodes(addresses)
+        
+        # podziel przystanki między pojazdy
+        solver = VehicleRoutingSolver(self._best_path_finder, number_of_vehicles, max_stops, max_route_time, time_budget=time_budget)
+        routes = solver.solve(G, nodes_to_visit)
+        return [(order, self._expand_path(G, path), cost) for order, path, cost in routes]
+    
+    
+    # metoda udostępniana na zewnątrz, by móc wyznaczać obszary osiągalne z danego adresu
+    # w zadanych czasach przejazdu [min]; zwraca GeoJSON z jednym wielokątem dla każdego progu
+    # (słownik timings - tak jak w run_query, z etapem isochrone zamiast search)
+    def run_isochrone_query(self, address: str, minutes: list, timings: dict = None) -> dict:
+        
+        # sprawdź progi czasowe przed geomapowaniem (nieskończony lub bardzo duży budżet przeszukałby cały graf)
+        if self._is_state_initialized and not self._input_validator.validate_isochrone_minutes(minutes):
+            raise RuntimeError(f"Progi czasowe izochron muszą być dodatnie i nie większe niż {MAX_ISOCHRONE_MINUTES} min.")
+        
+        # zmapuj adres na węzeł grafu
+        G, nodes = self._map_addresses_to_nodes([address], timings)
+        source = nodes[0]
+        
+        # wyznacz obszary osiągalne dla wszystkich progów w jednym przeszukiwaniu
+        start = time.perf_counter()
+        isochrones = self._isochrone_builder.build_isochrones(G, source, minutes)
+        if timings is not None:
+            timings["isochrone"] = time.perf_counter() - start
+        return isochrones
+    
+    
+    # wersja grafu, na którym działa aplikacja - zmienia się po podmianie pliku z grafem (czas modyfikacji, rozmiar)
+    # lub po każdym zbudowaniu grafu od zera; uwzględnia też upraszczanie grafu
+    def get_graph_version(self) -> str:
+        return self._graph_version
+    
+    
+    # parametry wpływające na wynik wyszukiwania trasy
+    def get_routing_parameters(self) -> dict:
+        return {
+            "min_angle_left_turn": self._min_angle_left_turn,
+            "penalty_to_better_road": self._penalty_to_better_road,
+            "penalty_to_equal_road": self._penalty_to_equal_road,
+            "penalty_to_worse_road": self._penalty_to_worse_road,
+            "heur_maxspeed": self._heur_maxspeed,
+            "snap_to_largest_component": self._snap_to_largest_component
+        }
+    
+    
+    # walidacja zapytania, geomapowanie adresów i wyznaczenie odpowiadających im węzłów grafu
+    # zwraca graf, na którym należy wykonać zapytanie (patrz _map_coordinates_to_nodes), i listę węzłów
+    # (czasy geomapowania i wyznaczania węzłów zapisywane są w słowniku timings, jeśli go podano)
+    def _map_addresses_to_nodes(self, addresses: list, timings: dict = None) -> tuple:
         
         # jeśli stan nie został zainicjalizowany, przerwij działanie
         if not self._is_state_initialized:
@@ -105,10 +332,29 @@ class App:
     
         # zmapuj adresy na współrzędne geograficzne punktów w formie (szerokość geo., długość geo.)
         points_coordinates = []
+        start = time.perf_counter()
         try:
             points_coordinates = [self._geo_mapper.map_to_coordinates(address) for address in addresses]
         except InsufficientResponseError as e:
-            raise RuntimeError(f"Nie udało się zrealizować geomapowania jednego z punktów: {str(e).replace("'", "")}")
+            raise RuntimeError("Nie udało się zrealizować geomapowania jednego z punktów: " + str(e).replace("'", ""))
+        if timings is not None:
+            timings["geocode"] = time.perf_counter() - start
+        
+        return self._map_coordinates_to_nodes(points_coordinates, timings)
+    
+    
+    # walidacja współrzędnych punktów (szerokość geo., długość geo.) i wyznaczenie odpowiadających im węzłów grafu
+    # zwraca graf zapytania i listę węzłów - w uproszczonym grafie jest to widok z przywróconymi węzłami pośrednimi,
+    # na które trafiły punkty (wspólny graf aplikacji nie jest modyfikowany przez zapytania)
+    def _map_coordinates_to_nodes(self, points_coordinates: list, timings: dict = None) -> tuple:
+        
+        # jeśli stan nie został zainicjalizowany, przerwij działanie
+        if not self._is_state_initialized:
+            raise RuntimeError("Nie można wykonywać zapytań bez uprzedniego zainicjalizowania stanu.")
+        
+        # sprawdź, czy nie podano zbyt wielu punktów
+        if not self._input_validator.validate_number_of_points(points_coordinates):
+            raise RuntimeError("Podano zbyt wiele punktów do odwiedzenia!")
         
         # sprawdź, czy każdy z punktów znajduje się w bbox wczytanej mapy
         if not self._input_validator.validate_points_within_bbox(self._G, points_coordinates):
@@ -118,11 +364,54 @@ class App:
         self._last_query_coordinates = points_coordinates
         
         # wiedząc, że adresy są w zasięgu naszej mapy, mapujemy każdy z nich na najbliższy mu geograficznie węzeł w grafie
+        start = time.perf_counter()
         nodes_to_visit = [self._geo_mapper.map_to_node(self._G, point_coor) for point_coor in points_coordinates]
         
-        # mające listę węzłów do odwiedzenia, szukamy rozwiązania zadanego TSP
-        discovered_path = self._travel_sales_solver.solve(self._G, nodes_to_visit)
+        # w uproszczonym grafie punkt mógł leżeć najbliżej usuniętego węzła pośredniego - wtedy go przywracamy
+        G = self._G
+        if self._graph_simplifier is not None:
+            nodes_to_visit = [self._graph_simplifier.snap_to_original_node(self._G, point_coor, node)
+                              for point_coor, node in zip(points_coordinates, nodes_to_visit)]
+            G = self._graph_simplifier.with_restored_nodes(self._G, nodes_to_visit)
+        if timings is not None:
+            timings["snap"] = time.perf_counter() - start
         
-        # zwracamy znalezioną ścieżkę
-        return discovered_path
+        return G, nodes_to_visit
+    
+    
+    def _get_graph_version(self) -> str:
+        if self._array_graph_dir:
+            source = os.path.join(self._array_graph_dir, "meta.json")
+        elif self._read_graph_from_pickle:
+            source = self._pickle_filepath
+        else:
+            source = None
         
+        if source is not None:
+            stat = os.stat(source)
+            version = f"{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}"
+        else:
+            version = f"{self._region}:{time.time_ns()}"
+        if self._simplify_graph:
+            version += ":simplified"
+        return f"{version}:slim" if self._slim_graph else version
+    
+    
+    # w uproszczonym grafie rozwijamy ścieżkę o usunięte węzły pośrednie
+    def _expand_path(self, G: nx.MultiDiGraph, path: list) -> list:
+        if self._graph_simplifier is not None:
+            return self._graph_simplifier.expand_path(G, path)
+        return path
+    
+    
+    # współrzędne kolejnych punktów ścieżki (wraz z usuniętymi węzłami pośrednimi w uproszczonym grafie)
+    # w postaci listy par (długość geo., szerokość geo.)
+    def _path_coordinates(self, G: nx.MultiDiGraph, path: list) -> list:
+        if len(path) == 0:
+            return []
+        coordinates = [(G.nodes[path[0]]["x"], G.nodes[path[0]]["y"])]
+        for u, v in zip(path[:-1], path[1:]):
+            edge_data = G.get_edge_data(u, v, 0)
+            coordinates.extend(zip(edge_data.get("inner_x", []), edge_data.get("inner_y", [])))
+            coordinates.append((G.nodes[v]["x"], G.nodes[v]["y"]))
+        return coordinates
@@ -0,0 +1,116 @@
+import os
+import json
+import numpy as np
+import networkx as nx
+from src.graph_utils import HIGHWAY_CATEGORIES
+
+
+# klasa przechowująca sieć drogową w postaci zwartych tablic numpy (format CSR)
+# węzły są posortowane rosnąco po id z OSM, dzięki czemu indeks węzła wyznaczamy wyszukiwaniem binarnym
+# krawędzie wychodzące z węzła o indeksie i zajmują przedział [indptr[i], indptr[i+1]) tablic krawędzi
+# w takiej postaci graf zajmuje wielokrotnie mniej pamięci niż graf networkx i może być zapisany wprost na dysk
+class ArrayGraph:
+
+    # nazwy tablic zapisywanych na dysku (każda w osobnym pliku .npy, aby można było je mapować do pamięci)
+    NODE_ARRAYS = ["node_ids", "x", "y"]
+    EDGE_ARRAYS = ["indptr", "indices", "length", "estimated_time", "highway", "maxspeed"]
+
+    def __init__(self, node_ids: np.ndarray, x: np.ndarray, y: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 length: np.ndarray, estimated_time: np.ndarray, highway: np.ndarray, maxspeed: np.ndarray):
+        self.node_ids = node_ids
+        self.x = x
+        self.y = y
+        self.indptr = indptr
+        self.indices = indices
+        self.length = length
+        self.estimated_time = estimated_time
+        self.highway = highway
+        self.maxspeed = maxspeed
+
+
+    # metoda budująca graf z list krawędzi (u, v podane jako id węzłów z OSM)
+    # krawędzie sortowane są po węźle początkowym i końcowym, po czym wyznaczana jest tablica indptr
+    @classmethod
+    def from_edge_arrays(cls, node_ids: np.ndarray, x: np.ndarray, y: np.ndarray, u: np.ndarray, v: np.ndarray,
+                         length: np.ndarray, estimated_time: np.ndarray, highway: np.ndarray, maxspeed: np.ndarray) -> "ArrayGraph":
+
+        # zamień id węzłów z OSM na indeksy w tablicy posortowanych węzłów
+        u_idx = np.searchsorted(node_ids, u).astype(np.int32)
+        v_idx = np.searchsorted(node_ids, v).astype(np.int32)
+
+        # posortuj krawędzie po (u, v)
+        order = np.lexsort((v_idx, u_idx))
+        u_idx = u_idx[order]
+
+        # wyznacz początki przedziałów krawędzi dla kolejnych węzłów
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u_idx, minlength=len(node_ids)), out=indptr[1:])
+
+        return cls(node_ids, x, y, indptr, v_idx[order], length[order], estimated_time[order], highway[order], maxspeed[order])
+
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+
+    def number_of_edges(self) -> int:
+        return len(self.indices)
+
+
+    # zwraca indeks węzła o podanym id z OSM (wyszukiwanie binarne w posortowanej tablicy id)
+    def node_index(self, node_id: int) -> int:
+        idx = int(self.node_ids.searchsorted(node_id))
+        if idx >= len(self.node_ids) or self.node_ids[idx] != node_id:
+            raise KeyError(node_id)
+        return idx
+
+
+    # zapis grafu do katalogu - każda tablica w osobnym pliku .npy
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.NODE_ARRAYS + self.EDGE_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        self.save_meta(directory)
+
+
+    # zapis opisu grafu (liczności, słownik kategorii dróg) - osobno, bo tablice mogą być zapisywane bezpośrednio do plików
+    def save_meta(self, directory: str):
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"nodes": self.number_of_nodes(), "edges": self.number_of_edges(),
+                       "highway_categories": HIGHWAY_CATEGORIES}, f)
+
+
+    # wczytanie grafu z katalogu
+    # przy mmap=True tablice nie są wczytywane do pamięci, lecz mapowane z pliku
+    @classmethod
+    def load(cls, directory: str, mmap: bool = False) -> "ArrayGraph":
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in cls.NODE_ARRAYS + cls.EDGE_ARRAYS}
+        return cls(**arrays)
+
+
+    # konwersja do grafu networkx o takich samych atrybutach, jakie tworzy pyrosm
+    # pozwala korzystać z grafu wczytanego z tablic w pozostałej części aplikacji
+    def to_networkx(self) -> nx.MultiDiGraph:
+        G = nx.MultiDiGraph()
+
+        # dodaj węzły wraz ze współrzędnymi
+        node_ids = self.node_ids.tolist()
+        xs = self.x.tolist()
+        ys = self.y.tolist()
+        G.add_nodes_from((node_id, {"id": node_id, "x": x, "y": y}) for node_id, x, y in zip(node_ids, xs, ys))
+
+        # dodaj krawędzie - pętla po węzłach początkowych i ich przedziałach w tablicach krawędzi
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        lengths = self.length.tolist()
+        times = self.estimated_time.tolist()
+        highways = self.highway.tolist()
+        maxspeeds = self.maxspeed.tolist()
+        for i, u in enumerate(node_ids):
+            for e in range(indptr[i], indptr[i + 1]):
+                v = node_ids[indices[e]]
+                G.add_edge(u, v, u=u, v=v, length=lengths[e], estimated_time=times[e],
+                           highway=HIGHWAY_CATEGORIES[highways[e]], maxspeed=maxspeeds[e])
+        return G
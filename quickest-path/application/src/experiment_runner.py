@@ -0,0 +1,191 @@
+import gc
+import sys
+import csv
+import numbers
+import json
+import time
+import pickle
+import itertools
+import importlib.util
+import multiprocessing as mp
+import networkx as nx
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.left_turn_handler import LeftTurnHandler
+from src.a_star import BestPathFinder
+from src.travel_sales_solver import TravelSalesmanSolver
+from src.geo_mapper import GeoMapper
+from src.heuristic_audit import derive_admissible_heuristic_speed
+
+
+# parametry App, które można badać w eksperymentach, wraz z wartościami domyślnymi
+# heur_maxspeed domyślnie (None) wyznaczana jest z grafu tak samo jak w App (najmniejsza dopuszczalna prędkość)
+EXPERIMENT_PARAMETERS = {
+    "min_angle_left_turn": 45.0,
+    "penalty_to_better_road": 30.0,
+    "penalty_to_equal_road": 20.0,
+    "penalty_to_worse_road": 10.0,
+    "heur_maxspeed": None
+}
+
+# biblioteki, z których pandas może korzystać przy zapisie do formatu Parquet
+PARQUET_ENGINES = ["pyarrow", "fastparquet"]
+
+# graf współdzielony przez procesy robocze
+# przy starcie procesów metodą fork procesy potomne widzą graf procesu głównego bez kopiowania (copy-on-write)
+_shared_graph = None
+
+
+def _init_worker(G: nx.MultiDiGraph):
+    global _shared_graph
+    _shared_graph = G
+
+
+# pojedyncze zadanie wykonywane w procesie roboczym: jedno zapytanie dla jednego zestawu parametrów
+# zapytanie to lista węzłów do odwiedzenia - kolejność ustalana jest tak samo jak w App (Nearest Neighbor)
+def _run_single(params: dict, query_id: int, nodes: list) -> dict:
+    G = _shared_graph
+    left_turn_handler = LeftTurnHandler(params["penalty_to_better_road"], params["penalty_to_equal_road"],
+                                        params["penalty_to_worse_road"], params["min_angle_left_turn"])
+    best_path_finder = BestPathFinder(left_turn_handler, params["heur_maxspeed"])
+    travel_sales_solver = TravelSalesmanSolver(best_path_finder)
+
+    row = dict(params)
+    row.update({"query_id": query_id, "status": "ok", "cost": 0.0, "left_turns": 0, "settled_nodes": 0, "path_nodes": 0})
+    start = time.perf_counter()
+    try:
+        order = travel_sales_solver.get_visit_order(G, nodes)
+        for source, dest in zip(order[:-1], order[1:]):
+            path, cost, settled_nodes = best_path_finder.find_shortest_path_with_stats(G, source, dest)
+            row["cost"] += cost
+            row["settled_nodes"] += settled_nodes
+            row["left_turns"] += left_turn_handler.count_left_turns(G, path)
+            row["path_nodes"] += len(path)
+    except RuntimeError as e:
+        row["status"] = str(e)
+    row["latency_ms"] = (time.perf_counter() - start) * 1000
+    return row
+
+
+# klasa ma na celu zautomatyzowanie eksperymentów z parametrami aplikacji
+# (kąt skrętu w lewo, kary za skręty, prędkość w heurystyce)
+# dla każdej kombinacji wartości z siatki parametrów wykonuje ten sam zestaw zapytań,
+# równolegle w puli procesów, a wyniki zapisuje w postaci tabeli (CSV lub Parquet)
+class ExperimentRunner:
+
+    # parametry:
+    # G - graf wczytany raz i współdzielony przez procesy robocze (tylko do odczytu)
+    # param_grid - słownik: nazwa parametru App -> lista badanych wartości (pozostałe parametry mają wartości domyślne)
+    # processes - liczba procesów roboczych (domyślnie liczba rdzeni)
+
+    def __init__(self, G: nx.MultiDiGraph, param_grid: dict, processes: int = None):
+        unknown = set(param_grid) - set(EXPERIMENT_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Nieznane parametry eksperymentu: {', '.join(sorted(unknown))}")
+        self._G = G
+        self._param_grid = param_grid
+        self._processes = processes
+        self._default_heur_maxspeed = None
+
+
+    # wszystkie kombinacje parametrów z siatki
+    def get_parameter_combinations(self) -> list:
+        names = list(self._param_grid)
+        combinations = []
+        for values in itertools.product(*(self._param_grid[name] for name in names)):
+            params = dict(EXPERIMENT_PARAMETERS)
+            params.update(zip(names, values))
+            if params["heur_maxspeed"] is None:
+                params["heur_maxspeed"] = self._get_default_heur_maxspeed()
+            combinations.append(params)
+        return combinations
+
+
+    # główna metoda udostępniana na zewnątrz
+    # queries - lista zapytań; każde to lista węzłów (np. para [źródło, cel]) lub lista adresów
+    # output_path - ścieżka pliku wynikowego (.csv lub .parquet); pusta - wyniki nie są zapisywane
+    def run(self, queries: list, output_path: str = "") -> list:
+        # brak biblioteki do zapisu wyników zgłaszany jest przed wykonaniem (długich) eksperymentów
+        if output_path:
+            self._check_output_format(output_path)
+        node_queries = [self._to_nodes(query) for query in queries]
+        tasks = [(params, query_id, nodes) for params in self.get_parameter_combinations()
+                 for query_id, nodes in enumerate(node_queries)]
+
+        rows = []
+        if tasks:
+            rows = self._run_tasks(tasks)
+
+        if output_path:
+            self.save_results(rows, output_path)
+        return rows
+
+
+    # wykonanie zadań w puli procesów
+    # graf przekazywany jest procesom raz: przez fork (bez kopiowania) lub, gdy fork jest niedostępny, w inicjalizacji
+    # gc.freeze zapobiega kopiowaniu stron pamięci z grafem przez odśmiecacz w procesach potomnych
+    # (odśmiecacz jest odmrażany również wtedy, gdy któreś z zadań zakończy się wyjątkiem)
+    def _run_tasks(self, tasks: list) -> list:
+        if "fork" in mp.get_all_start_methods():
+            _init_worker(self._G)
+            gc.freeze()
+            executor = ProcessPoolExecutor(self._processes, mp_context=mp.get_context("fork"))
+        else:
+            executor = ProcessPoolExecutor(self._processes, initializer=_init_worker, initargs=(self._G,))
+        try:
+            with executor:
+                return list(executor.map(_run_single, *zip(*tasks), chunksize=max(1, len(tasks) // 64)))
+        finally:
+            gc.unfreeze()
+
+
+    def save_results(self, rows: list, output_path: str):
+        self._check_output_format(output_path)
+        if output_path.endswith(".parquet"):
+            pd.DataFrame(rows).to_parquet(output_path, index=False)
+        else:
+            with open(output_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+    # zapis do formatu Parquet wymaga pyarrow lub fastparquet (nie są zależnościami aplikacji)
+    def _check_output_format(self, output_path: str):
+        if output_path.endswith(".parquet") and not any(importlib.util.find_spec(engine) for engine in PARQUET_ENGINES):
+            raise RuntimeError("Zapis wyników do pliku .parquet wymaga biblioteki pyarrow lub fastparquet "
+                               "(pip install pyarrow) - można też zapisać wyniki do pliku .csv.")
+
+
+    # prędkość w heurystyce wyznaczana z grafu (raz, przy pierwszym użyciu)
+    def _get_default_heur_maxspeed(self) -> float:
+        if self._default_heur_maxspeed is None:
+            self._default_heur_maxspeed = derive_admissible_heuristic_speed(self._G)
+        return self._default_heur_maxspeed
+
+
+    # zapytanie podane jako lista adresów jest geomapowane (raz, w procesie głównym) i mapowane na węzły grafu
+    def _to_nodes(self, query: list) -> list:
+        if all(isinstance(point, numbers.Integral) for point in query):
+            return list(query)
+        geo_mapper = GeoMapper()
+        return [geo_mapper.map_to_node(self._G, geo_mapper.map_to_coordinates(address)) for address in query]
+
+
+# uruchomienie z linii poleceń:
+# python -m src.experiment_runner graph.gpickle grid.json queries.json results.csv [liczba_procesów]
+# grid.json: {"penalty_to_better_road": [10, 30], "heur_maxspeed": [120, 140]}
+# queries.json: [[261028006, 4309679488], ["Plac Defilad 1, Warszawa", "Nowy Świat 1, Warszawa"]]
+if __name__ == "__main__":
+    if len(sys.argv) < 5:
+        print("Użycie: python -m src.experiment_runner <graf.gpickle> <siatka.json> <zapytania.json> <wyniki.csv|.parquet> [procesy]")
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        graph = pickle.load(f)
+    with open(sys.argv[2]) as f:
+        grid = json.load(f)
+    with open(sys.argv[3]) as f:
+        query_set = json.load(f)
+    runner = ExperimentRunner(graph, grid, int(sys.argv[5]) if len(sys.argv) > 5 else None)
+    results = runner.run(query_set, sys.argv[4])
+    print(f"Wykonano {len(results)} przebiegów, wyniki zapisano w {sys.argv[4]}")
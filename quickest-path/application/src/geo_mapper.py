@@ -1,17 +1,32 @@
 import osmnx as ox
 import networkx as nx
 from typing import Tuple
+from src.graph_components import ComponentIndex
+from src.slim_graph import SlimGraph
 
 
 # klasa ma na celu umożliwienie usługi geomapowania
 # otrzymując adres w formie tekstowej, zwraca jego współrzędne geograficzne
 # dla zadanych współrzędnych, znajduje najbliższy możliwy węzeł w grafie
+# opcjonalnie (prefer_largest_component) wybiera wyłącznie spośród węzłów największej silnie spójnej składowej,
+# dzięki czemu punkt nie zostanie przyciągnięty do odciętej "wyspy", z której nie da się dojechać do pozostałych punktów
+# opcjonalnie (nominatim_endpoint) geokodowanie kierowane jest pod inny adres usługi Nominatim (np. lokalną atrapę)
 class GeoMapper:
     
+    def __init__(self, component_index: ComponentIndex = None, prefer_largest_component: bool = False, nominatim_endpoint: str = ""):
+        self._component_index = component_index
+        self._prefer_largest_component = prefer_largest_component
+        if nominatim_endpoint:
+            ox.settings.nominatim_url = nominatim_endpoint
+    
     def map_to_coordinates(self, address: str) -> Tuple[float, float]:
         y, x = ox.geocode(address) # throws InsufficientResponseError
         return (y, x)
     
     def map_to_node(self, G: nx.MultiDiGraph, coordinates: tuple) -> int:
+        if self._prefer_largest_component and self._component_index is not None:
+            return self._component_index.nearest_node_in_largest_component(coordinates)
+        if isinstance(G, SlimGraph):
+            return G.nearest_node(coordinates[1], coordinates[0])
         return ox.distance.nearest_nodes(G, coordinates[1], coordinates[0])
     
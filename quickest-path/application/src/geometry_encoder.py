@@ -0,0 +1,181 @@
+import sys
+import json
+import time
+import pickle
+import random
+import numpy as np
+from shapely.geometry import LineString
+from src.graph_utils import haversine_distance
+
+
+# rozmiar kafelka mapy (Leaflet / OSM) w pikselach
+TILE_SIZE = 256
+
+
+# tolerancja upraszczania [stopnie] odpowiadająca zadanej liczbie pikseli na mapie przy danym przybliżeniu
+# (na poziomie zoom cały obwód Ziemi - 360 stopni - zajmuje TILE_SIZE * 2^zoom pikseli)
+def tolerance_for_zoom(zoom: int, pixel_tolerance: float = 1.0) -> float:
+    return pixel_tolerance * 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+# uproszczenie łamanej algorytmem Douglasa-Peuckera (punkty w postaci (dł. geo., szer. geo.))
+# punkty początkowy i końcowy są zawsze zachowywane
+def simplify_coordinates(coordinates: list, tolerance: float) -> list:
+    if len(coordinates) < 3 or tolerance <= 0:
+        return list(coordinates)
+    return list(LineString(coordinates).simplify(tolerance, preserve_topology=False).coords)
+
+
+# zakodowanie łamanej w formacie Google Encoded Polyline (punkty w postaci (dł. geo., szer. geo.))
+# format zapisuje kolejno szerokość i długość geo. jako różnice względem poprzedniego punktu
+def encode_polyline(coordinates: list, precision: int = 5) -> str:
+    factor = 10 ** precision
+    result = []
+    previous_lat, previous_lon = 0, 0
+    for lon, lat in coordinates:
+        lat, lon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (lat - previous_lat, lon - previous_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        previous_lat, previous_lon = lat, lon
+    return "".join(result)
+
+
+# odkodowanie łamanej zapisanej w formacie Google Encoded Polyline (zwraca punkty (dł. geo., szer. geo.))
+def decode_polyline(polyline: str, precision: int = 5) -> list:
+    factor = 10 ** precision
+    coordinates = []
+    index, lat, lon = 0, 0, 0
+    while index < len(polyline):
+        deltas = []
+        for _ in range(2):
+            shift, value = 0, 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                value |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coordinates.append((lon / factor, lat / factor))
+    return coordinates
+
+
+# długość łamanej [m]
+def polyline_length(coordinates: list) -> float:
+    if len(coordinates) < 2:
+        return 0.0
+    points = np.asarray(coordinates, dtype=float)
+    return float(np.sum(haversine_distance(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])))
+
+
+# klasa ma na celu przygotowanie zwięzłej reprezentacji trasy do wysłania na mapę
+# zamiast osobnego punktu dla każdego węzła OSM trasa zapisywana jest jako jedna łamana na odcinek (między kolejnymi punktami),
+# uproszczona algorytmem Douglasa-Peuckera z tolerancją zależną od przybliżenia mapy
+# i opcjonalnie zakodowana w formacie Google Encoded Polyline
+# każdy odcinek opisany jest kosztem (czas przejazdu z karami [s]) oraz długością (liczoną przed uproszczeniem) [m]
+class RouteGeometryEncoder:
+
+    # parametry:
+    # zoom - poziom przybliżenia mapy, dla którego dobierana jest tolerancja upraszczania
+    # pixel_tolerance - maksymalne odchylenie uproszczonej łamanej od trasy w pikselach mapy
+    # use_polyline - czy kodować łamane w formacie Google Encoded Polyline (zamiast współrzędnych GeoJSON)
+
+    def __init__(self, zoom: int = 14, pixel_tolerance: float = 1.0, use_polyline: bool = False):
+        self._tolerance = tolerance_for_zoom(zoom, pixel_tolerance)
+        self._use_polyline = use_polyline
+
+
+    # główna metoda udostępniana na zewnątrz
+    # legs - lista odcinków w postaci krotek (współrzędne (dł. geo., szer. geo.), koszt)
+    # zwraca GeoJSON (FeatureCollection) z jednym obiektem na odcinek
+    # w trybie polyline geometria zapisana jest we właściwości "polyline", a pole "geometry" jest puste
+    def encode_legs(self, legs: list) -> dict:
+        features = [self.encode_leg(leg_index, coordinates, cost) for leg_index, (coordinates, cost) in enumerate(legs)]
+        return {
+            "type": "FeatureCollection",
+            "properties": {
+                "cost": sum(feature["properties"]["cost"] for feature in features),
+                "distance": sum(feature["properties"]["distance"] for feature in features)
+            },
+            "features": features
+        }
+
+
+    def encode_leg(self, leg_index: int, coordinates: list, cost: float) -> dict:
+        simplified = simplify_coordinates(coordinates, self._tolerance)
+        properties = {
+            "leg": leg_index,
+            "cost": round(float(cost), 1),
+            "distance": round(polyline_length(coordinates), 1),
+            "points": len(simplified)
+        }
+        if self._use_polyline:
+            properties["polyline"] = encode_polyline(simplified)
+            return {"type": "Feature", "properties": properties, "geometry": None}
+        return {
+            "type": "Feature",
+            "properties": properties,
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[round(lon, 6), round(lat, 6)] for lon, lat in simplified]
+            }
+        }
+
+
+# porównanie rozmiaru danych wysyłanych na mapę: dotychczasowy format (punkt GeoJSON dla każdego węzła)
+# oraz łamane uproszczone przy różnych przybliżeniach, bez kodowania i z kodowaniem polyline
+# python -m src.geometry_encoder graph.gpickle [liczba_punktów] [liczba_zapytań]
+if __name__ == "__main__":
+    from src.left_turn_handler import LeftTurnHandler
+    from src.a_star import BestPathFinder
+    from src.travel_sales_solver import TravelSalesmanSolver
+
+    if len(sys.argv) < 2:
+        print("Użycie: python -m src.geometry_encoder <graf.gpickle> [liczba_punktów] [liczba_zapytań]")
+        sys.exit(1)
+    number_of_points = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    number_of_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    with open(sys.argv[1], "rb") as f:
+        G = pickle.load(f)
+    solver = TravelSalesmanSolver(BestPathFinder(LeftTurnHandler(30.0, 20.0, 10.0, 45.0), 140))
+    random.seed(0)
+
+    formats = {"punkty (obecnie)": 0}
+    for zoom in (12, 14, 16):
+        formats[f"LineString, zoom {zoom}"] = 0
+        formats[f"polyline, zoom {zoom}"] = 0
+    encoding_time = 0.0
+
+    for _ in range(number_of_queries):
+        nodes = random.sample(list(G.nodes), number_of_points)
+        try:
+            legs = list(solver.solve_iter(G, nodes))
+        except RuntimeError:
+            continue
+        leg_coordinates = [([(G.nodes[node]["x"], G.nodes[node]["y"]) for node in path], cost) for path, cost in legs]
+
+        # dotychczasowy format: osobny obiekt Point (z identyfikatorem węzła) dla każdego węzła trasy
+        path = solver.solve(G, nodes)
+        points = {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "id": str(node), "geometry": {"type": "Point", "coordinates": [G.nodes[node]["x"], G.nodes[node]["y"]]}}
+            for node in path]}
+        formats["punkty (obecnie)"] += len(json.dumps(points))
+
+        for zoom in (12, 14, 16):
+            start = time.perf_counter()
+            formats[f"LineString, zoom {zoom}"] += len(json.dumps(RouteGeometryEncoder(zoom).encode_legs(leg_coordinates)))
+            formats[f"polyline, zoom {zoom}"] += len(json.dumps(RouteGeometryEncoder(zoom, use_polyline=True).encode_legs(leg_coordinates)))
+            encoding_time += time.perf_counter() - start
+
+    baseline = formats["punkty (obecnie)"]
+    for name, size in formats.items():
+        print(f"{name}: {size / 1024:.1f} kB ({100 * size / max(baseline, 1):.1f}%)")
+    print(f"Łączny czas kodowania: {encoding_time * 1000:.1f} ms")
@@ -0,0 +1,240 @@
+import networkx as nx
+import numpy as np
+from src.graph_utils import haversine_distance
+from src.slim_graph import SlimGraph
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# maksymalna liczba składowych, dla której wyznaczana jest macierz bitowa osiągalności (C^2 / 8 bajtów - tu 8 MB)
+# graf nieoczyszczony z małych składowych (np. wczytany z pliku pickle) może mieć ich dziesiątki tysięcy -
+# wtedy osiągalność sprawdzana jest przeszukiwaniem grafu składowych
+MAX_REACHABILITY_COMPONENTS = 8192
+
+
+# wyznaczenie silnie spójnych składowych algorytmem Tarjana (w wersji iteracyjnej) na tablicach grafu w formacie CSR
+# zwraca etykiety składowych węzłów (int32) i liczbę składowych
+# składowe numerowane są w kolejności ich zamknięcia przez algorytm, czyli w odwrotnym porządku topologicznym:
+# jeśli krawędź prowadzi ze składowej a do innej składowej b, to b < a
+def _strongly_connected_labels(indptr: np.ndarray, indices: np.ndarray) -> tuple:
+    n = len(indptr) - 1
+    order = np.full(n, -1, dtype=np.int32)
+    lowlink = np.zeros(n, dtype=np.int32)
+    labels = np.full(n, -1, dtype=np.int32)
+    on_stack = np.zeros(n, dtype=np.bool_)
+    stack = np.empty(n, dtype=np.int32)
+    call_node = np.empty(n, dtype=np.int32)
+    call_edge = np.empty(n, dtype=np.int64)
+    stack_size = 0
+    counter = 0
+    number_of_components = 0
+
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        order[root] = counter
+        lowlink[root] = counter
+        counter += 1
+        stack[stack_size] = root
+        stack_size += 1
+        on_stack[root] = True
+        call_node[0] = root
+        call_edge[0] = indptr[root]
+        depth = 1
+
+        while depth > 0:
+            v = call_node[depth - 1]
+            e = call_edge[depth - 1]
+            if e < indptr[v + 1]:
+                # kolejna krawędź węzła v: zejdź do nieodwiedzonego sąsiada lub zaktualizuj lowlink
+                call_edge[depth - 1] = e + 1
+                w = indices[e]
+                if order[w] == -1:
+                    order[w] = counter
+                    lowlink[w] = counter
+                    counter += 1
+                    stack[stack_size] = w
+                    stack_size += 1
+                    on_stack[w] = True
+                    call_node[depth] = w
+                    call_edge[depth] = indptr[w]
+                    depth += 1
+                elif on_stack[w] and order[w] < lowlink[v]:
+                    lowlink[v] = order[w]
+            else:
+                # wszystkie krawędzie v przejrzane: przekaż lowlink rodzicowi i ewentualnie zamknij składową
+                depth -= 1
+                if depth > 0 and lowlink[v] < lowlink[call_node[depth - 1]]:
+                    lowlink[call_node[depth - 1]] = lowlink[v]
+                if lowlink[v] == order[v]:
+                    while True:
+                        stack_size -= 1
+                        w = stack[stack_size]
+                        on_stack[w] = False
+                        labels[w] = number_of_components
+                        if w == v:
+                            break
+                    number_of_components += 1
+    return labels, number_of_components
+
+
+# przy dostępnej numbie algorytm jest kompilowany (graf regionu ma miliony węzłów)
+if njit is not None:
+    _strongly_connected_labels = njit(cache=True)(_strongly_connected_labels)
+
+
+# tablice grafu w formacie CSR: posortowane id węzłów, indptr i indeksy węzłów końcowych krawędzi
+# graf odchudzony ma je od razu, graf networkx jest na nie zamieniany (bez słowników dla każdego węzła)
+def _csr_arrays(G: nx.MultiDiGraph) -> tuple:
+    if isinstance(G, SlimGraph):
+        return G.node_ids, G.indptr, G.indices
+    node_ids = np.sort(np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes()))
+    edges = np.fromiter((node for edge in G.edges() for node in edge), dtype=np.int64, count=2 * G.number_of_edges())
+    u = np.searchsorted(node_ids, edges[0::2])
+    v = np.searchsorted(node_ids, edges[1::2]).astype(np.int32)
+    order = np.argsort(u, kind="stable")
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=len(node_ids)), out=indptr[1:])
+    return node_ids, indptr, v[order]
+
+
+# etykiety silnie spójnych składowych węzłów grafu
+# zwraca krotkę (posortowane id węzłów, etykiety, liczba składowych, indptr, indices) - tablice CSR przydają się
+# do wyznaczenia krawędzi grafu składowych
+def strongly_connected_labels(G: nx.MultiDiGraph) -> tuple:
+    node_ids, indptr, indices = _csr_arrays(G)
+    labels, number_of_components = _strongly_connected_labels(indptr, indices)
+    return node_ids, labels, int(number_of_components), indptr, indices
+
+
+# klasa przechowująca informacje o silnie spójnych składowych grafu (SCC)
+# etykiety składowych wyznaczane są raz, przy wczytaniu grafu, i przechowywane w tablicy indeksowanej pozycją węzła
+# pozwala to odrzucić zapytanie o ścieżkę między węzłami, które nie są wzajemnie osiągalne,
+# zanim A* przeszuka całą osiągalną część grafu
+class ComponentIndex:
+
+    # max_reachability_components - maksymalna liczba składowych, dla której budowana jest macierz bitowa osiągalności
+
+    def __init__(self, G: nx.MultiDiGraph, max_reachability_components: int = MAX_REACHABILITY_COMPONENTS):
+
+        # wyznacz składowe i przypisz każdemu węzłowi etykietę jego składowej
+        self._node_ids, self._labels, number_of_components, indptr, indices = strongly_connected_labels(G)
+        self._sizes = np.bincount(self._labels, minlength=number_of_components)
+
+        # graf składowych (acykliczny) w formacie CSR - krawędzie między różnymi składowymi, bez powtórzeń
+        sources = self._labels[np.repeat(np.arange(len(self._node_ids)), np.diff(indptr))].astype(np.int64)
+        targets = self._labels[indices].astype(np.int64)
+        pairs = np.unique(sources[sources != targets] * number_of_components + targets[sources != targets])
+        self._condensation_indptr = np.zeros(number_of_components + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // max(number_of_components, 1), minlength=number_of_components),
+                  out=self._condensation_indptr[1:])
+        self._condensation_indices = (pairs % max(number_of_components, 1)).astype(np.int32)
+
+        # osiągalność między składowymi wyznaczana jest raz (jeśli składowych nie jest zbyt wiele)
+        self._reachable = None
+        if number_of_components <= max_reachability_components:
+            self._reachable = self._build_reachability()
+
+        # zapamiętaj największą składową wraz ze współrzędnymi jej węzłów (do przyciągania punktów)
+        self._largest_label = int(np.argmax(self._sizes)) if number_of_components > 0 else -1
+        largest = self._labels == self._largest_label
+        self._largest_node_ids = self._node_ids[largest]
+        if isinstance(G, SlimGraph):
+            self._largest_node_x = np.asarray(G.x)[largest]
+            self._largest_node_y = np.asarray(G.y)[largest]
+        else:
+            self._largest_node_x = np.array([G.nodes[node]["x"] for node in self._largest_node_ids.tolist()])
+            self._largest_node_y = np.array([G.nodes[node]["y"] for node in self._largest_node_ids.tolist()])
+
+
+    def number_of_components(self) -> int:
+        return len(self._sizes)
+
+
+    def component_of(self, node: int) -> int:
+        idx = int(self._node_ids.searchsorted(node))
+        if idx >= len(self._node_ids) or self._node_ids[idx] != node:
+            return -1
+        return int(self._labels[idx])
+
+
+    def is_in_largest_component(self, node: int) -> bool:
+        return self.component_of(node) == self._largest_label
+
+
+    # macierz bitowa osiągalności składowych: bit d w wierszu s oznacza, że ze składowej s da się dojechać do składowej d
+    # składowe ponumerowane są w odwrotnym porządku topologicznym, więc wiersze wyznaczane są po kolei
+    # jako suma wierszy następników (mają mniejsze numery); zajmuje C^2 / 8 bajtów dla C składowych
+    def _build_reachability(self) -> np.ndarray:
+        number_of_components = len(self._sizes)
+        reachable = np.zeros((number_of_components, (number_of_components + 7) // 8), dtype=np.uint8)
+        for label in range(number_of_components):
+            reachable[label, label >> 3] |= 1 << (label & 7)
+            successors = self._condensation_indices[self._condensation_indptr[label]:self._condensation_indptr[label + 1]]
+            if len(successors) > 0:
+                reachable[label] |= np.bitwise_or.reduce(reachable[successors], axis=0)
+        return reachable
+
+
+    # sprawdzenie, czy z węzła source da się dojechać do węzła dest
+    # dla węzłów z tej samej składowej odpowiedź jest natychmiastowa, dla różnych składowych odczytujemy bit
+    # z macierzy osiągalności (czas stały) lub - przy bardzo wielu składowych - przeszukujemy graf składowych
+    def can_reach(self, source: int, dest: int) -> bool:
+        source_label = self.component_of(source)
+        dest_label = self.component_of(dest)
+
+        # węzły spoza indeksu (np. przywrócone po uproszczeniu grafu) - decyzję zostawiamy wyszukiwaniu
+        if source_label == -1 or dest_label == -1:
+            return True
+        if source_label == dest_label:
+            return True
+
+        # krawędzie grafu składowych prowadzą wyłącznie do składowych o mniejszych numerach
+        if dest_label > source_label:
+            return False
+        if self._reachable is not None:
+            return bool(self._reachable[source_label, dest_label >> 3] & (1 << (dest_label & 7)))
+        return self._search_condensation(source_label, dest_label)
+
+
+    # przeszukiwanie grafu składowych ze składowej source do składowej dest
+    # (pomijane są składowe o numerach mniejszych niż dest - nie da się z nich do niej dojechać)
+    def _search_condensation(self, source_label: int, dest_label: int) -> bool:
+        visited = {source_label}
+        stack = [source_label]
+        while stack:
+            label = stack.pop()
+            start, end = self._condensation_indptr[label], self._condensation_indptr[label + 1]
+            for successor in self._condensation_indices[start:end].tolist():
+                if successor == dest_label:
+                    return True
+                if successor > dest_label and successor not in visited:
+                    visited.add(successor)
+                    stack.append(successor)
+        return False
+
+
+    # najbliższy węzeł największej składowej dla zadanych współrzędnych (szerokość geo., długość geo.)
+    def nearest_node_in_largest_component(self, coordinates: tuple) -> int:
+        distances = haversine_distance(coordinates[1], coordinates[0], self._largest_node_x, self._largest_node_y)
+        return int(self._largest_node_ids[np.argmin(distances)])
+
+
+# metoda usuwająca z grafu małe "wyspy", czyli silnie spójne składowe liczące mniej niż min_size węzłów
+# (np. drogi serwisowe odcięte od reszty sieci, ślepe odcinki dróg jednokierunkowych)
+# zwraca liczbę usuniętych węzłów
+def prune_small_components(G: nx.MultiDiGraph, min_size: int) -> int:
+    nodes_to_remove = find_small_component_nodes(G, min_size)
+    G.remove_nodes_from(nodes_to_remove)
+    return len(nodes_to_remove)
+
+
+# węzły należące do silnie spójnych składowych liczących mniej niż min_size węzłów
+# (graf odchudzony jest tylko do odczytu - takie węzły usuwa się z niego metodą SlimGraph.without_nodes)
+def find_small_component_nodes(G: nx.MultiDiGraph, min_size: int) -> list:
+    node_ids, labels, number_of_components, _, _ = strongly_connected_labels(G)
+    sizes = np.bincount(labels, minlength=number_of_components)
+    return node_ids[sizes[labels] < min_size].tolist()
@@ -1,8 +1,14 @@
+import os
 import networkx as nx
 import pickle
 import sys
 from pyrosm import OSM, get_data
 from src.graph_utils import fill_max_speed, clean_edges_data
+from src.array_graph import ArrayGraph
+from src.stream_ingestor import StreamingGraphIngestor
+from src.slim_graph import SlimGraph, DISPLAY_STORE_FILENAME
+from src.graph_components import prune_small_components, find_small_component_nodes
+from src.turn_restrictions import RestrictionParser, TurnRestrictionIndex, TURN_RESTRICTIONS_KEY, TURN_RESTRICTIONS_FILENAME
 
 # klasa ta ma za zadanie dostarczyć gotowy graf przedstawiający sieć drogową
 # na podstawie wartości parametru albo wczytuje graf z wcześniej zapisanego pliku
@@ -14,10 +20,12 @@ class GraphProvider:
     
     # główna metoda udostępniana na zewnątrz
     # pozwala wywołującemu ją zbudować gotowy graf, na którym można puszczać algorytmy
-    def build_graph(self, region: str = "Warsaw") -> nx.MultiDiGraph:
+    # min_component_size - silnie spójne składowe mniejsze niż podana liczba węzłów są usuwane z grafu
+    def build_graph(self, region: str = "Warsaw", min_component_size: int = 50) -> nx.MultiDiGraph:
         
         # pobieramy dane, tworzymy tabelę węzłów oraz krawędzi
-        osm = OSM(get_data(region, directory="."))
+        pbf_filepath = get_data(region, directory=".")
+        osm = OSM(pbf_filepath)
         nodes, edges = osm.get_network(nodes=True, network_type="driving")
         
         # usuwamy zbędne kolumny z tabeli reprezentującej węzły
@@ -31,14 +39,76 @@ class GraphProvider:
         edges["maxspeed"] = edges.apply(fill_max_speed, axis=1)
         
         # wyliczamy estymowany czas przejazdu daną krawędzią, co będzie stanowiło wagi w naszym grafie
-        edges["estimated_time"] = edges.apply(lambda x: x["length"] / (x["maxspeed"] / 3.6), axis=1)
+        # (limit prędkości 0, np. z błędnego tagu maxspeed=0, traktujemy jak 1 km/h)
+        edges["estimated_time"] = edges.apply(lambda x: x["length"] / (max(x["maxspeed"], 1) / 3.6), axis=1)
         
         # zbudowanie grafu na podstawie tabel z węzłami i krawędziami
         G = osm.to_graph(nodes, edges, graph_type="networkx", network_type="driving") # TODO if not suitable change to "driving+service"
         
+        # usuwamy małe "wyspy", do których lub z których nie da się dojechać z reszty sieci
+        prune_small_components(G, min_component_size)
+        
+        # zakazy skrętu (relacje restriction) nie są odczytywane przez pyrosm - czytamy je osobno z tego samego pliku
+        # (wymaga to pyosmium - bez niego graf budowany jest bez zakazów skrętu)
+        if RestrictionParser.is_available():
+            G.graph[TURN_RESTRICTIONS_KEY] = RestrictionParser().parse(pbf_filepath)
+        
+        return G
+    
+    
+    # budowa grafu dla dużych regionów (np. województwo, cała Polska)
+    # plik .osm.pbf czytany jest strumieniowo, a gotowy graf w postaci tablic zapisywany do output_dir
+    # max_memory_mb określa limit pamięci, po którego przekroczeniu dane pośrednie zrzucane są na dysk
+    # zakazy skrętu zapisywane są obok grafu (turn_restrictions.npz) i dołączane do niego przy wczytaniu
+    def build_graph_streaming(self, region: str, output_dir: str, max_memory_mb: int = 2048) -> ArrayGraph:
+        pbf_filepath = get_data(region, directory=".")
+        ingestor = StreamingGraphIngestor(max_memory_mb=max_memory_mb)
+        graph = ingestor.ingest(pbf_filepath, output_dir)
+        if RestrictionParser.is_available():
+            RestrictionParser().parse(pbf_filepath).save(os.path.join(output_dir, TURN_RESTRICTIONS_FILENAME))
+        return graph
+    
+    
+    # wczytanie grafu zapisanego w postaci tablic (np. przez build_graph_streaming)
+    # i konwersja do grafu networkx - potrzebna tylko tam, gdzie wymagany jest graf networkx (upraszczanie grafu);
+    # graf networkx zajmuje wielokrotnie więcej pamięci niż tablice, więc zwykle należy korzystać z read_slim_graph
+    def read_array_graph(self, directory: str, min_component_size: int = 50) -> nx.MultiDiGraph:
+        G = ArrayGraph.load(directory, mmap=True).to_networkx()
+        prune_small_components(G, min_component_size)
+        self._attach_turn_restrictions(G, directory)
         return G
     
     
+    # budowa odchudzonego grafu (tylko atrybuty potrzebne do wyszukiwania tras, w postaci tablic)
+    # pozostałe atrybuty krawędzi (nazwy, geometria itp.) zapisywane są w osobnym pliku w output_dir
+    def build_slim_graph(self, region: str, output_dir: str, min_component_size: int = 50) -> SlimGraph:
+        G = self.build_graph(region, min_component_size)
+        os.makedirs(output_dir, exist_ok=True)
+        slim_graph = SlimGraph.from_networkx(G, os.path.join(output_dir, DISPLAY_STORE_FILENAME))
+        slim_graph.save(output_dir)
+        if TURN_RESTRICTIONS_KEY in G.graph:
+            G.graph[TURN_RESTRICTIONS_KEY].save(os.path.join(output_dir, TURN_RESTRICTIONS_FILENAME))
+        return slim_graph
+    
+    
+    # wczytanie odchudzonego grafu z katalogu (zapisanego przez build_slim_graph lub build_graph_streaming)
+    # graf nie jest konwertowany do networkx - algorytmy korzystają bezpośrednio z tablic (mapowanych z plików)
+    def read_slim_graph(self, directory: str, min_component_size: int = 50) -> SlimGraph:
+        G = SlimGraph.load(directory, mmap=True)
+        small_component_nodes = find_small_component_nodes(G, min_component_size)
+        if small_component_nodes:
+            G = G.without_nodes(small_component_nodes)
+        self._attach_turn_restrictions(G, directory)
+        return G
+    
+    
+    # dołączenie do grafu zakazów skrętu zapisanych obok grafu w postaci tablic (jeśli istnieją)
+    def _attach_turn_restrictions(self, G: nx.MultiDiGraph, directory: str):
+        filepath = os.path.join(directory, TURN_RESTRICTIONS_FILENAME)
+        if os.path.exists(filepath):
+            G.graph[TURN_RESTRICTIONS_KEY] = TurnRestrictionIndex.load(filepath)
+    
+    
     # w celu usprawnienia startu aplikacji przy wielokrotnym jej uruchamianiu
     # możliwe jest szybkie wczytanie gotowego grafu z pickle'a
     def read_graph_from_pickle(self, filepath: str = "graph.pkl") -> nx.MultiDiGraph:
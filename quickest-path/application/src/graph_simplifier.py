@@ -0,0 +1,463 @@
+import os
+import sys
+import time
+import tempfile
+import random
+import itertools
+import pickle
+import networkx as nx
+import numpy as np
+import multiprocessing as mp
+from shapely.geometry import LineString
+from src.left_turn_handler import LeftTurnHandler
+from src.graph_utils import haversine_distance, get_resident_memory_mb
+
+
+# klasa ma na celu uproszczenie grafu poprzez usunięcie węzłów leżących w środku drogi
+# (węzły o dokładnie dwóch sąsiadach, które w danych OSM opisują jedynie kształt drogi)
+# łańcuch takich węzłów zastępowany jest jedną krawędzią o zsumowanym czasie przejazdu,
+# która pamięta oryginalną sekwencję węzłów i ich współrzędne, co pozwala odtworzyć pełną ścieżkę
+# skręty w lewo w usuniętych węzłach są zliczane i doliczane do kosztu krawędzi przez BestPathFinder,
+# więc najlepsze ścieżki po rozwinięciu są takie same jak w grafie pierwotnym
+class GraphSimplifier:
+
+    # parametry:
+    # left_turn_handler - obiekt rozpoznający skręty w lewo (potrzebny do zliczenia skrętów w węzłach pośrednich)
+    # keep_nodes - węzły, które nie mogą zostać usunięte (np. węzły, w których obowiązują zakazy skrętu)
+
+    def __init__(self, left_turn_handler: LeftTurnHandler, keep_nodes: set = None):
+        self._left_turn_handler = left_turn_handler
+        self._keep_nodes = keep_nodes or set()
+
+        # informacje o usuniętych węzłach: id węzła -> lista krawędzi (u, w), w których się znajduje
+        self._inner_edges = {}
+        self._inner_node_ids = np.empty(0, dtype=np.int64)
+        self._inner_node_x = np.empty(0)
+        self._inner_node_y = np.empty(0)
+
+
+    # główna metoda udostępniana na zewnątrz
+    # upraszcza graf w miejscu (usuwa węzły pośrednie i dodaje krawędzie zastępcze) i go zwraca
+    def simplify(self, G: nx.MultiDiGraph) -> nx.MultiDiGraph:
+
+        # wyznacz węzły, które mogą zostać usunięte
+        removable = {node for node in G.nodes if self._is_removable(G, node)}
+
+        # wyznacz łańcuchy węzłów pośrednich, zanim zaczniemy modyfikować graf
+        # (zliczanie skrętów w lewo wymaga pierwotnej geometrii)
+        chains = self._find_chains(G, removable)
+        new_edges = [self._build_edge(G, chain) for chain in chains]
+
+        # usuń węzły pośrednie i dodaj krawędzie zastępcze
+        inner_nodes = {node for chain in chains for node in chain[1:-1]}
+        self._inner_node_ids = np.fromiter(inner_nodes, dtype=np.int64, count=len(inner_nodes))
+        self._inner_node_x = np.array([G.nodes[node]["x"] for node in self._inner_node_ids.tolist()])
+        self._inner_node_y = np.array([G.nodes[node]["y"] for node in self._inner_node_ids.tolist()])
+        G.remove_nodes_from(inner_nodes)
+        for u, w, data in new_edges:
+            G.add_edge(u, w, **data)
+            self._register_inner_nodes(u, w, data["nodes"])
+
+        return G
+
+
+    # zamiana ścieżki w uproszczonym grafie na ścieżkę w grafie pierwotnym (wraz z węzłami pośrednimi)
+    def expand_path(self, G: nx.MultiDiGraph, path: list) -> list:
+        if len(path) == 0:
+            return []
+        expanded_path = [path[0]]
+        for u, w in zip(path[:-1], path[1:]):
+            nodes = G.get_edge_data(u, w, 0).get("nodes")
+            if nodes is None:
+                expanded_path.append(w)
+            else:
+                expanded_path.extend(nodes[1:])
+        return expanded_path
+
+
+    # jeśli zadane współrzędne leżą bliżej usuniętego węzła pośredniego niż węzła candidate, zwracany jest ten węzeł
+    # (przed wyszukiwaniem należy go przywrócić metodą with_restored_nodes)
+    # dzięki temu punkty początkowe i końcowe zapytań są takie same jak w grafie pierwotnym
+    def snap_to_original_node(self, G: nx.MultiDiGraph, coordinates: tuple, candidate: int) -> int:
+        if len(self._inner_node_ids) == 0:
+            return candidate
+
+        # porównaj odległość do najbliższego węzła pośredniego z odległością do kandydata
+        lat, lon = coordinates
+        distances = haversine_distance(lon, lat, self._inner_node_x, self._inner_node_y)
+        nearest = int(np.argmin(distances))
+        candidate_distance = haversine_distance(lon, lat, G.nodes[candidate]["x"], G.nodes[candidate]["y"])
+        if distances[nearest] >= candidate_distance:
+            return candidate
+        return int(self._inner_node_ids[nearest])
+
+
+    # graf zapytania, w którym przywrócono podane usunięte węzły pośrednie (krawędzie, w których się znajdują, są dzielone)
+    # graf uproszczony nie jest modyfikowany - jest współdzielony przez równoległe zapytania,
+    # więc przywrócone węzły istnieją wyłącznie w zwracanym widoku (jeśli nie ma czego przywracać, zwracany jest sam graf)
+    def with_restored_nodes(self, G: nx.MultiDiGraph, nodes: list):
+        nodes = {node for node in nodes if node not in G.nodes and node in self._inner_edges}
+        if len(nodes) == 0:
+            return G
+
+        # węzły przywracane w obrębie każdej z krawędzi zastępczych
+        restored_in_edge = {}
+        for node in nodes:
+            for u, w in self._inner_edges[node]:
+                restored_in_edge.setdefault((u, w), []).append(node)
+
+        # dodaj węzły ze współrzędnymi zapisanymi w krawędzi
+        view = _RestoredNodesView(G)
+        for (u, w), edge_nodes in restored_in_edge.items():
+            data = G.get_edge_data(u, w, 0)
+            for node in edge_nodes:
+                position = data["nodes"].index(node)
+                view.add_node(node, id=node, x=data["inner_x"][position - 1], y=data["inner_y"][position - 1])
+
+        # podziel krawędzie na części (skręt w przywróconym węźle liczony jest już przez A*)
+        for (u, w), edge_nodes in restored_in_edge.items():
+            data = G.get_edge_data(u, w, 0)
+            cuts = [0] + sorted(data["nodes"].index(node) for node in edge_nodes) + [len(data["nodes"]) - 1]
+            view.remove_edge(u, w)
+            for start, end in zip(cuts[:-1], cuts[1:]):
+                part = self._slice_edge(data, start, end)
+                self._fill_aggregates(view, part, part["u"], part["v"])
+                view.add_edge(part["u"], part["v"], part)
+        return view
+
+
+    # węzeł można usunąć, jeśli leży w środku drogi: ma jednego poprzednika i jednego następnika (droga jednokierunkowa)
+    # lub tych samych dwóch sąsiadów w obu kierunkach (droga dwukierunkowa), a wszystkie jego krawędzie są tej samej kategorii
+    def _is_removable(self, G: nx.MultiDiGraph, node: int) -> bool:
+        if node in self._keep_nodes:
+            return False
+        successors = set(G.successors(node))
+        predecessors = set(G.predecessors(node))
+        if node in successors:
+            return False
+        one_way = len(successors) == 1 and len(predecessors) == 1 and successors != predecessors
+        two_way = len(successors) == 2 and successors == predecessors
+        if not (one_way or two_way):
+            return False
+
+        # krawędzie wielokrotne lub różne kategorie dróg uniemożliwiają usunięcie węzła
+        edges = list(G.out_edges(node, data="highway")) + list(G.in_edges(node, data="highway"))
+        if len(edges) != len(successors) + len(predecessors):
+            return False
+        return len({highway for _, _, highway in edges}) == 1
+
+
+    # wyznaczenie łańcuchów [u, x1, ..., xk, w], gdzie x1..xk to węzły do usunięcia, a u i w pozostają w grafie
+    # łańcuch nie może zastąpić krawędzi już istniejącej między u i w (graf nie może mieć krawędzi wielokrotnych,
+    # bo A* korzysta tylko z krawędzi o kluczu 0) - wtedy ostatni węzeł pośredni zostaje w grafie
+    def _find_chains(self, G: nx.MultiDiGraph, removable: set) -> list:
+        chains = []
+        existing_pairs = set(G.edges())
+
+        for u in G.nodes:
+            if u in removable:
+                continue
+            for first in list(G.successors(u)):
+                if first not in removable:
+                    continue
+
+                # idź wzdłuż łańcucha aż do węzła, który pozostaje w grafie
+                chain = [u, first]
+                while chain[-1] in removable:
+                    chain.append(next(n for n in G.successors(chain[-1]) if n != chain[-2]))
+                w = chain[-1]
+
+                # łańcuch dwukierunkowy zostanie znaleziony z obu końców - rozpatrujemy go tylko raz,
+                # a krawędź w przeciwnym kierunku tworzymy razem z nim
+                two_way = G.has_edge(first, u)
+                if two_way and (w < u or (w == u and chain[1] > chain[-2])):
+                    continue
+
+                # unikamy krawędzi wielokrotnych i pętli - zostaw w grafie ostatni węzeł pośredni
+                if u == w or (u, w) in existing_pairs or (w, u) in existing_pairs:
+                    chain.pop()
+                    w = chain[-1]
+                    if len(chain) < 3 or (u, w) in existing_pairs or (w, u) in existing_pairs:
+                        continue
+
+                chains.append(chain)
+                existing_pairs.add((u, w))
+                if two_way:
+                    chains.append(chain[::-1])
+                    existing_pairs.add((w, u))
+        return chains
+
+
+    # wyznaczenie atrybutów krawędzi zastępującej łańcuch
+    def _build_edge(self, G: nx.MultiDiGraph, chain: list) -> tuple:
+        u, w = chain[0], chain[-1]
+        segments = [G.get_edge_data(a, b, 0) for a, b in zip(chain[:-1], chain[1:])]
+
+        # atrybuty opisowe bierzemy z pierwszego odcinka
+        data = {key: value for key, value in segments[0].items() if key != "geometry"}
+
+        # sprawdź, w których węzłach pośrednich następuje skręt w lewo
+        inner_turn_flags = [int(self._left_turn_handler.is_turn_left(G, a, b, c))
+                            for a, b, c in zip(chain[:-2], chain[1:-1], chain[2:])]
+
+        data["u"] = u
+        data["v"] = w
+        data["nodes"] = chain
+        data["inner_x"] = [G.nodes[node]["x"] for node in chain[1:-1]]
+        data["inner_y"] = [G.nodes[node]["y"] for node in chain[1:-1]]
+        data["segment_times"] = [segment["estimated_time"] for segment in segments]
+        data["segment_lengths"] = [segment.get("length", 0.0) for segment in segments]
+        data["inner_turn_flags"] = inner_turn_flags
+        self._fill_aggregates(G, data, u, w)
+        return (u, w, data)
+
+
+    # wycięcie fragmentu krawędzi zastępczej między pozycjami start i end sekwencji węzłów
+    def _slice_edge(self, data: dict, start: int, end: int) -> dict:
+        part = dict(data)
+        part["nodes"] = data["nodes"][start:end + 1]
+        part["u"] = part["nodes"][0]
+        part["v"] = part["nodes"][-1]
+        part["inner_x"] = data["inner_x"][start:end - 1]
+        part["inner_y"] = data["inner_y"][start:end - 1]
+        part["segment_times"] = data["segment_times"][start:end]
+        part["segment_lengths"] = data["segment_lengths"][start:end]
+        part["inner_turn_flags"] = data["inner_turn_flags"][start:end - 1]
+        return part
+
+
+    # uzupełnienie sumarycznych atrybutów krawędzi zastępczej (czas, długość, liczba skrętów, geometria)
+    def _fill_aggregates(self, G: nx.MultiDiGraph, data: dict, u: int, w: int):
+        data["estimated_time"] = sum(data["segment_times"])
+        data["length"] = sum(data["segment_lengths"])
+        data["inner_left_turns"] = sum(data["inner_turn_flags"])
+        xs = [G.nodes[u]["x"]] + data["inner_x"] + [G.nodes[w]["x"]]
+        ys = [G.nodes[u]["y"]] + data["inner_y"] + [G.nodes[w]["y"]]
+        data["geometry"] = LineString(zip(xs, ys))
+
+
+    # zapamiętanie, w których krawędziach znajdują się węzły pośrednie
+    def _register_inner_nodes(self, u: int, w: int, nodes: list):
+        for node in nodes[1:-1]:
+            self._inner_edges.setdefault(node, []).append((u, w))
+
+
+# widok węzłów grafu zapytania działający jak G.nodes w networkx (G.nodes[n]["x"], G.nodes(data=True), iteracja po id)
+class _RestoredNodeView:
+
+    def __init__(self, graph: "_RestoredNodesView"):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if not data:
+            return iter(self)
+        return itertools.chain(self._graph._base.nodes(data=True), self._graph._restored_nodes.items())
+
+    def __getitem__(self, node: int) -> dict:
+        if node in self._graph._restored_nodes:
+            return self._graph._restored_nodes[node]
+        return self._graph._base.nodes[node]
+
+    def __iter__(self):
+        return itertools.chain(self._graph._base.nodes, self._graph._restored_nodes)
+
+    def __len__(self) -> int:
+        return len(self._graph._base.nodes) + len(self._graph._restored_nodes)
+
+    def __contains__(self, node: int) -> bool:
+        return node in self._graph._restored_nodes or node in self._graph._base.nodes
+
+
+# widok krawędzi grafu zapytania działający jak G.edges w networkx (G.edges(nbunch), G.edges[(u, v, klucz)])
+class _RestoredEdgeView:
+
+    def __init__(self, graph: "_RestoredNodesView"):
+        self._graph = graph
+
+    def __call__(self, nbunch=None):
+        nodes = self._graph.nodes if nbunch is None else nbunch
+        return [edge for node in nodes for edge in self._graph.out_edges(node)]
+
+    def __getitem__(self, edge: tuple) -> dict:
+        u, v, key = edge
+        data = self._graph.get_edge_data(u, v, key)
+        if data is None:
+            raise KeyError(edge)
+        return data
+
+    def __iter__(self):
+        return iter(self())
+
+    def __len__(self) -> int:
+        return self._graph.number_of_edges()
+
+
+# graf uproszczony z przywróconymi na potrzeby jednego zapytania węzłami pośrednimi
+# przechowuje jedynie różnice względem grafu bazowego (przywrócone węzły, zastąpione krawędzie i ich części),
+# a pozostałe odwołania przekazuje do grafu bazowego, który nie jest modyfikowany
+# udostępnia podzbiór interfejsu grafu networkx, z którego korzystają algorytmy wyszukiwania tras
+class _RestoredNodesView:
+
+    def __init__(self, G: nx.MultiDiGraph):
+        self._base = G
+        self._restored_nodes = {}
+        self._removed_edges = set()
+        self._added_edges = {}
+        self._added_out = {}
+        self._added_in = {}
+        self.graph = G.graph
+        self.nodes = _RestoredNodeView(self)
+        self.edges = _RestoredEdgeView(self)
+
+
+    def add_node(self, node: int, **data):
+        self._restored_nodes[node] = data
+
+
+    def remove_edge(self, u: int, v: int):
+        self._removed_edges.add((u, v))
+
+
+    def add_edge(self, u: int, v: int, data: dict):
+        self._added_edges[(u, v)] = data
+        self._added_out.setdefault(u, []).append((u, v))
+        self._added_in.setdefault(v, []).append((u, v))
+
+
+    # podzbiór interfejsu grafu networkx
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_multigraph(self) -> bool:
+        return True
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node: int) -> bool:
+        return node in self.nodes
+
+    def has_node(self, node: int) -> bool:
+        return node in self.nodes
+
+    def has_edge(self, u: int, v: int, key: int = None) -> bool:
+        return self.get_edge_data(u, v, 0 if key is None else key) is not None
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return self._base.number_of_edges() - len(self._removed_edges) + len(self._added_edges)
+
+    def out_edges(self, node: int) -> list:
+        edges = self._added_out.get(node, [])
+        if node in self._base.nodes:
+            edges = [edge for edge in self._base.out_edges(node) if edge not in self._removed_edges] + edges
+        return edges
+
+    def in_edges(self, node: int) -> list:
+        edges = self._added_in.get(node, [])
+        if node in self._base.nodes:
+            edges = [edge for edge in self._base.in_edges(node) if edge not in self._removed_edges] + edges
+        return edges
+
+    def successors(self, node: int):
+        return iter(dict.fromkeys(v for _, v in self.out_edges(node)))
+
+    def predecessors(self, node: int):
+        return iter(dict.fromkeys(u for u, _ in self.in_edges(node)))
+
+    def neighbors(self, node: int):
+        return self.successors(node)
+
+    def get_edge_data(self, u: int, v: int, key: int = None, default=None):
+        if (u, v) in self._added_edges:
+            data = self._added_edges[(u, v)]
+            if key is None:
+                return {0: data}
+            return data if key == 0 else default
+        if (u, v) in self._removed_edges or u in self._restored_nodes or v in self._restored_nodes:
+            return default
+        return self._base.get_edge_data(u, v, key, default)
+
+
+def _measure_memory(graph_path: str, queue):
+    before = get_resident_memory_mb()
+    with open(graph_path, "rb") as f:
+        G = pickle.load(f)
+    queue.put(get_resident_memory_mb() - before)
+
+
+# pamięć (RSS) zajmowana przez graf zapisany w pliku pickle - mierzona w osobnym, nowym procesie,
+# aby pomiar nie obejmował pamięci zajmowanej wcześniej przez proces główny
+def measure_graph_memory(graph_path: str) -> float:
+    context = mp.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_memory, args=(graph_path, queue))
+    process.start()
+    memory = queue.get()
+    process.join()
+    return memory
+
+
+# porównanie grafu pierwotnego i uproszczonego: liczba węzłów i krawędzi, pamięć (RSS), czas zapytań
+# ścieżki wyznaczone w obu grafach (po rozwinięciu) są sprawdzane pod kątem identyczności
+# python -m src.graph_simplifier graph.gpickle [liczba_zapytań]
+if __name__ == "__main__":
+    from src.a_star import BestPathFinder
+
+    if len(sys.argv) < 2:
+        print("Użycie: python -m src.graph_simplifier <graf.gpickle> [liczba_zapytań]")
+        sys.exit(1)
+    number_of_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with open(sys.argv[1], "rb") as f:
+        G = pickle.load(f)
+    handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+    finder = BestPathFinder(handler, 140)
+    random.seed(0)
+    queries = [tuple(random.sample(list(G.nodes), 2)) for _ in range(number_of_queries)]
+
+    # zapytania w grafie pierwotnym
+    nodes_before, edges_before = G.number_of_nodes(), G.number_of_edges()
+    paths_before = []
+    start = time.time()
+    for source, dest in queries:
+        try:
+            paths_before.append(finder.find_shortest_path(G, source, dest))
+        except RuntimeError:
+            paths_before.append(None)
+    time_before = time.time() - start
+
+    # uproszczenie grafu i te same zapytania (węzły początkowe i końcowe są przywracane, jeśli zostały usunięte)
+    simplifier = GraphSimplifier(handler)
+    simplifier.simplify(G)
+    nodes_after, edges_after = G.number_of_nodes(), G.number_of_edges()
+    paths_after = []
+    start = time.time()
+    for source, dest in queries:
+        query_graph = simplifier.with_restored_nodes(G, [source, dest])
+        try:
+            paths_after.append(simplifier.expand_path(query_graph, finder.find_shortest_path(query_graph, source, dest)))
+        except RuntimeError:
+            paths_after.append(None)
+    time_after = time.time() - start
+
+    # pamięć zajmowana przez każdy z wariantów grafu po wczytaniu w nowym procesie
+    with tempfile.TemporaryDirectory() as directory:
+        simplified_path = os.path.join(directory, "simplified.gpickle")
+        with open(simplified_path, "wb") as f:
+            pickle.dump(G, f, pickle.HIGHEST_PROTOCOL)
+        memory_before = measure_graph_memory(sys.argv[1])
+        memory_after = measure_graph_memory(simplified_path)
+
+    identical = sum(before == after for before, after in zip(paths_before, paths_after))
+    print(f"Węzły: {nodes_before} -> {nodes_after} ({100 * (1 - nodes_after / nodes_before):.1f}% mniej)")
+    print(f"Krawędzie: {edges_before} -> {edges_after}")
+    print(f"Pamięć (RSS) po wczytaniu grafu: {memory_before:.1f} MB -> {memory_after:.1f} MB")
+    print(f"Czas {number_of_queries} zapytań: {time_before:.2f} s -> {time_after:.2f} s")
+    print(f"Identyczne ścieżki: {identical}/{number_of_queries}")
@@ -1,9 +1,44 @@
+import re
 import pandas as pd
 import geopandas as gpd
 import networkx as nx
 import numpy as np
 
 
+# kategorie dróg (atrybut 'highway') kodowane jako małe liczby całkowite
+# wykorzystywane przy zapisie grafu w postaci tablic, gdzie napisy zajmowałyby zbyt dużo pamięci
+# kod 0 oznacza kategorię spoza listy
+HIGHWAY_CATEGORIES = ["other", "motorway", "trunk", "primary", "secondary", "tertiary",
+                      "unclassified", "residential", "living_street", "service",
+                      "motorway_link", "trunk_link", "primary_link", "secondary_link", "tertiary_link"]
+HIGHWAY_CODES = {name: code for code, name in enumerate(HIGHWAY_CATEGORIES)}
+
+# wartości tagów, dla których pyrosm (network_type="driving") nie uznaje drogi za przejezdną dla samochodu
+DRIVING_EXCLUDED_TAGS = {
+    "area": ["yes"],
+    "highway": ["cycleway", "footway", "path", "pedestrian", "steps", "track", "corridor", "elevator",
+                "escalator", "proposed", "construction", "bridleway", "abandoned", "platform", "raceway"],
+    "motor_vehicle": ["no"],
+    "motorcar": ["no"],
+    "service": ["parking", "parking_aisle", "private", "emergency_access"]
+}
+
+# wartości tagów, dla których krawędź uznajemy za zawierającą błędne lub nieprzydatne dane
+# z tych reguł korzysta zarówno clean_edges_data, jak i strumieniowe wczytywanie danych
+EDGE_EXCLUDED_TAGS = {
+    "access": ["no", "emergency", "military", "bus", "employees", "forestry"],
+    "area": ["no", "yes"],
+    "bicycle": ["designated", "destination", "dismount", "official", "permit"],
+    "foot": ["designated", "destination", "permit"],
+    "highway": ["bridleway", "cyclist_waiting_aid", "road", "steps", "cycleway", "path"],
+    "motorcar": ["delivery", "destination", "forestry", "agricultural"],
+    "motor_vehicle": ["delivery", "destination", "forestry", "agricultural", "official", "forestry"],
+    "service": ["yard", "*", "da", "spur", "fire_road", "droga_wewnetrzna"],
+    "surface": ["grass", "grass_paver", "rock", "paving_stones:30", "wood", "woodchips"],
+    "tracktype": ["grade1", "grade2", "grade3", "grade4", "grade5"]
+}
+
+
 # metoda definiująca heurystykę obliczającą najbardziej optymistyczny czas przejazdu między dwoma punktami w grafie
 # wyznacza odległość euklidesową między węzłami na podstawie ich współrzędnych
 # a następnie wyznacza optymistyczny oczekiwany czas dojazdu przy założeniu,
@@ -42,10 +77,33 @@ def calculate_euclid_dist(G: nx.MultiDiGraph, first_node: int, second_node: int)
     return np.sqrt((x_dest - x_curr)**2 + (y_dest - y_curr)**2 + (z_dest - z_curr)**2)
     
 
+# metoda wyznaczająca odległość po powierzchni Ziemi [m] (wzór haversine)
+# działa zarówno dla pojedynczych współrzędnych, jak i dla tablic numpy
+def haversine_distance(lon_from, lat_from, lon_to, lat_to):
+    R = 6371000 # promień Ziemi w m
+    lon_from, lat_from, lon_to, lat_to = map(np.radians, (lon_from, lat_from, lon_to, lat_to))
+    a = np.sin((lat_to - lat_from) / 2)**2 + np.cos(lat_from) * np.cos(lat_to) * np.sin((lon_to - lon_from) / 2)**2
+    return 2 * R * np.arcsin(np.sqrt(a))
+    
+
+# metoda wyznaczająca odległość euklidesową (cięciwę) między punktami na powierzchni Ziemi [km]
+# daje ten sam wynik co calculate_euclid_dist, ale działa również dla tablic numpy
+def calculate_chord_dist(lon_from, lat_from, lon_to, lat_to):
+    R = 6371 # promień Ziemi w km
+    lon_from, lat_from, lon_to, lat_to = map(np.radians, (lon_from, lat_from, lon_to, lat_to))
+    a = np.sin((lat_to - lat_from) / 2)**2 + np.cos(lat_from) * np.cos(lat_to) * np.sin((lon_to - lon_from) / 2)**2
+    return 2 * R * np.sqrt(a)
+    
+
 # metoda definiująca liniowy porządek dla dróg różnego typu (atrybut 'highway')
 # w celu rozpoznawania zmiany kategorii drogi przy skręcie w lewo
 # metoda zwraca -1, jeśli skręcamy w gorszą drogę, 0 jeśli w taką samą, 1 jeśli na lepszą
-def compare_highways(from_highway: str, to_highway: str) -> int:
+# kategorie dróg mogą być podane jako napisy lub jako kody z HIGHWAY_CATEGORIES (graf odchudzony)
+def compare_highways(from_highway, to_highway) -> int:
+    if isinstance(from_highway, (int, np.integer)):
+        from_highway = HIGHWAY_CATEGORIES[from_highway]
+    if isinstance(to_highway, (int, np.integer)):
+        to_highway = HIGHWAY_CATEGORIES[to_highway]
     custom_highway_order = {
             'motorway': 1,
             'trunk': 2,
@@ -82,13 +140,15 @@ def calculate_sin(a: np.ndarray, b: np.ndarray) -> float:
 # metoda tworząca wektor pomiędzy dwoma węzłami w grafie
 # dokonuje ona mapowania współrzędnych geograficznych (kątów) na płaszczyznę 2D
 def get_vector_between_nodes(G: nx.MultiDiGraph, node_from: int, node_to: int) -> np.ndarray:
-    R = 6371000 # promień Ziemi
     
     # wydobądź informacje o wsp. geograficznych obu punktów
-    lon_from = G.nodes[node_from]['x']
-    lat_from = G.nodes[node_from]['y']
-    lon_to = G.nodes[node_to]['x']
-    lat_to = G.nodes[node_to]['y']
+    return get_vector_between_points(G.nodes[node_from]['x'], G.nodes[node_from]['y'],
+                                     G.nodes[node_to]['x'], G.nodes[node_to]['y'])
+
+
+# metoda tworząca wektor pomiędzy dwoma punktami o zadanych współrzędnych geograficznych
+def get_vector_between_points(lon_from: float, lat_from: float, lon_to: float, lat_to: float) -> np.ndarray:
+    R = 6371000 # promień Ziemi
     
     # zmapuj je na płaszczyznę 2D [m]
     x_from = R * np.radians(lon_from)
@@ -103,6 +163,25 @@ def get_vector_between_nodes(G: nx.MultiDiGraph, node_from: int, node_to: int) -
     return np.array([dx, dy])
 
 
+# metoda wyznaczająca wektor ostatniego odcinka krawędzi (kierunek, z którego wjeżdżamy do node_to)
+# dla krawędzi powstałych przez uproszczenie grafu uwzględnia zapisane współrzędne usuniętych węzłów pośrednich
+def get_edge_end_vector(G: nx.MultiDiGraph, node_from: int, node_to: int) -> np.ndarray:
+    inner_x = G.get_edge_data(node_from, node_to, 0).get("inner_x")
+    if not inner_x:
+        return get_vector_between_nodes(G, node_from, node_to)
+    inner_y = G.get_edge_data(node_from, node_to, 0)["inner_y"]
+    return get_vector_between_points(inner_x[-1], inner_y[-1], G.nodes[node_to]['x'], G.nodes[node_to]['y'])
+
+
+# metoda wyznaczająca wektor pierwszego odcinka krawędzi (kierunek, w którym wyjeżdżamy z node_from)
+def get_edge_start_vector(G: nx.MultiDiGraph, node_from: int, node_to: int) -> np.ndarray:
+    inner_x = G.get_edge_data(node_from, node_to, 0).get("inner_x")
+    if not inner_x:
+        return get_vector_between_nodes(G, node_from, node_to)
+    inner_y = G.get_edge_data(node_from, node_to, 0)["inner_y"]
+    return get_vector_between_points(G.nodes[node_from]['x'], G.nodes[node_from]['y'], inner_x[0], inner_y[0])
+
+
 # metoda pozwalająca na wyznaczenie bbox na podstawie posiadanego grafu G
 # ma to na celu późniejsze eliminowanie zapytań spoza obszaru objętego naszą mapą
 def calculate_bbox(G: nx.MultiDiGraph) -> (float, float, float, float):
@@ -159,19 +238,10 @@ def fill_max_speed(row: pd.Series) -> int:
 def clean_edges_data(edges: gpd.geodataframe.GeoDataFrame):
         
     # wyznaczamy indeksy rzędów, które prawdopodobnie zawierają błędne dane
-    index_1 = edges.index[edges["access"].isin(["no", "emergency", "military", "bus", "employees", "forestry"])]
-    index_2 = edges.index[edges["area"].isin(["no", "yes"])]
-    index_3 = edges.index[edges["bicycle"].isin(["designated", "destination", "dismount", "official", "permit"])]
-    index_4 = edges.index[edges["foot"].isin(["designated", "destination", "permit"])]
-    index_5 = edges.index[edges["highway"].isin(["bridleway", "cyclist_waiting_aid", "road", "steps", "cycleway", "path"])]
-    index_6 = edges.index[edges["motorcar"].isin(["delivery", "destination", "forestry", "agricultural"])]
-    index_7 = edges.index[edges["motor_vehicle"].isin(["delivery", "destination", "forestry", "agricultural", "official", "forestry"])]
-    index_8 = edges.index[edges["service"].isin(["yard", "*", "da", "spur", "fire_road", "droga_wewnetrzna"])]
-    index_9 = edges.index[edges["surface"].isin(["grass", "grass_paver", "rock", "paving_stones:30", "wood", "woodchips"])]
-    index_10 = edges.index[edges["tracktype"].isin(["grade1", "grade2", "grade3", "grade4", "grade5"])] 
-    
-    # łączymy znalezione indeksy w jeden i dokonujemy usunięcia wątpliwej jakości rekordów
-    indexes = index_1.union(index_2).union(index_3).union(index_4).union(index_5).union(index_6).union(index_7).union(index_8).union(index_9).union(index_10)
+    # i łączymy je w jeden, a następnie dokonujemy usunięcia wątpliwej jakości rekordów
+    indexes = edges.index[:0]
+    for column, values in EDGE_EXCLUDED_TAGS.items():
+        indexes = indexes.union(edges.index[edges[column].isin(values)])
     edges.drop(indexes, inplace=True)
     
     # skorzystawszy z zawartych w danych kolumnach informacji, możemy się ich pozbyć
@@ -180,3 +250,45 @@ def clean_edges_data(edges: gpd.geodataframe.GeoDataFrame):
                         "motor_vehicle", "overtaking", "passing_places", "psv", "service",
                         "segregated", "sidewalk", "smoothness", "surface", "tracktype", "turn",
                         "width", "timestamp", "version", "osm_type"], inplace=True)
+
+
+# metoda odpowiadająca clean_edges_data dla pojedynczej drogi (way) wczytywanej strumieniowo
+# otrzymuje słownik tagów drogi i zwraca informację, czy droga ma trafić do grafu
+# uwzględnia zarówno filtr "driving" biblioteki pyrosm, jak i nasze reguły czyszczenia danych
+def is_way_allowed(tags: dict) -> bool:
+    if tags.get("highway") is None:
+        return False
+    if tags.get("access") == "private":
+        return False
+    for excluded_tags in (DRIVING_EXCLUDED_TAGS, EDGE_EXCLUDED_TAGS):
+        for key, values in excluded_tags.items():
+            if tags.get(key) in values:
+                return False
+    return True
+
+
+# metoda zwracająca kod kategorii drogi na potrzeby zapisu grafu w postaci tablic
+def encode_highway(highway: str) -> int:
+    return HIGHWAY_CODES.get(highway, 0)
+
+
+# metoda zwracająca aktualne zużycie pamięci (RSS) procesu w [MB]
+# na Linuxie odczytuje bieżącą wartość z /proc, na innych systemach uniksowych zwraca wartość szczytową,
+# a na Windowsie (brak modułu resource) zwraca 0 - limity pamięci nie są wtedy egzekwowane
+def get_resident_memory_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# metoda sprowadzająca adres do postaci znormalizowanej (pojedyncze spacje, bez spacji na końcach, bez wielkości liter)
+# wykorzystywana przy kluczach pamięci podręcznej tras i przez atrapę Nominatim w testach obciążeniowych
+def normalize_address(address: str) -> str:
+    return re.sub(r'\s+', ' ', address).strip().casefold()
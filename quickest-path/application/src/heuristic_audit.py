@@ -0,0 +1,124 @@
+import sys
+import pickle
+import random
+import heapq as h
+import numpy as np
+import networkx as nx
+from src.graph_utils import calculate_heuristic, calculate_chord_dist
+from src.slim_graph import SlimGraph
+
+
+# względny zapas dodawany do wyznaczonej prędkości, pokrywający błędy zaokrągleń
+# (heurystyka liczy odległość inną, choć matematycznie równoważną, metodą niż calculate_chord_dist)
+SPEED_MARGIN = 1e-6
+
+
+# wyznaczenie najmniejszej prędkości [km/h], przy której heurystyka A* jest dopuszczalna dla danego grafu
+# heurystyka dzieli odległość w linii prostej przez prędkość, więc wystarczy, aby dla każdej krawędzi
+# odległość w linii prostej między jej końcami przebyta z tą prędkością nie zajmowała więcej niż czas przejazdu krawędzią
+# (z nierówności trójkąta wynika wtedy, że heurystyka nie przeszacowuje kosztu żadnej ścieżki; kary za skręty tylko go zwiększają)
+# krawędzie o zerowym czasie przejazdu są pomijane
+def derive_admissible_heuristic_speed(G: nx.MultiDiGraph) -> float:
+    if isinstance(G, SlimGraph):
+        sources = np.repeat(np.arange(G.number_of_nodes()), np.diff(G.indptr))
+        x, y = G.x.astype(np.float64), G.y.astype(np.float64)
+        chord = calculate_chord_dist(x[sources], y[sources], x[G.indices], y[G.indices])
+        times = G.estimated_time.astype(np.float64)
+    else:
+        edges = [(G.nodes[u]["x"], G.nodes[u]["y"], G.nodes[v]["x"], G.nodes[v]["y"], data["estimated_time"])
+                 for u, v, data in G.edges(data=True)]
+        if len(edges) == 0:
+            raise ValueError("Nie można wyznaczyć prędkości w heurystyce dla grafu bez krawędzi.")
+        lon_from, lat_from, lon_to, lat_to, times = np.array(edges, dtype=np.float64).T
+        chord = calculate_chord_dist(lon_from, lat_from, lon_to, lat_to)
+
+    positive = times > 0
+    if not np.any(positive):
+        raise ValueError("Nie można wyznaczyć prędkości w heurystyce - żadna krawędź nie ma dodatniego czasu przejazdu.")
+    return float(np.max(chord[positive] / (times[positive] / 3600))) * (1 + SPEED_MARGIN)
+
+
+# klasa ma na celu sprawdzenie dopuszczalności heurystyki A* na rzeczywistym grafie
+# dla wylosowanych węzłów docelowych wyznaczany jest dokładny koszt dojazdu z wielu węzłów (Dijkstra wstecz od celu),
+# który porównywany jest z wartością heurystyki dla wylosowanych par (węzeł, cel)
+# koszt liczony jest bez kar za skręty w lewo - heurystyka musi być dopuszczalna już dla samych czasów przejazdu
+class HeuristicAuditor:
+
+    # parametry:
+    # number_of_targets - liczba losowanych węzłów docelowych
+    # pairs_per_target - liczba losowanych węzłów początkowych dla każdego celu
+    # seed - ziarno generatora liczb losowych (powtarzalność audytu)
+
+    def __init__(self, number_of_targets: int = 20, pairs_per_target: int = 200, seed: int = 0):
+        self._number_of_targets = number_of_targets
+        self._pairs_per_target = pairs_per_target
+        self._seed = seed
+
+
+    # główna metoda udostępniana na zewnątrz
+    # zwraca słownik z podsumowaniem audytu:
+    # pairs - liczba sprawdzonych par, violations - liczba par, dla których heurystyka przeszacowała koszt,
+    # max_violation - największe względne przeszacowanie, mean_slack - średni względny zapas (1 - heurystyka / koszt)
+    def audit(self, G: nx.MultiDiGraph, heur_maxspeed: float) -> dict:
+        rng = random.Random(self._seed)
+        nodes = list(G.nodes)
+        pairs, violations, max_violation, slacks = 0, 0, 0.0, []
+
+        for target in rng.sample(nodes, min(self._number_of_targets, len(nodes))):
+            dist = self._backward_dijkstra(G, target)
+            sources = [node for node in dist if node != target and dist[node] > 0]
+            for source in rng.sample(sources, min(self._pairs_per_target, len(sources))):
+                heuristic = calculate_heuristic(G, source, target, heur_maxspeed)
+                ratio = heuristic / dist[source]
+                pairs += 1
+                if ratio > 1 + SPEED_MARGIN:
+                    violations += 1
+                    max_violation = max(max_violation, ratio - 1)
+                slacks.append(1 - ratio)
+
+        return {
+            "heur_maxspeed": heur_maxspeed,
+            "pairs": pairs,
+            "violations": violations,
+            "max_violation": max_violation,
+            "mean_slack": float(np.mean(slacks)) if slacks else 0.0
+        }
+
+
+    # Dijkstra po krawędziach odwróconych - koszt dojazdu do celu ze wszystkich węzłów, z których cel jest osiągalny
+    # (tak jak w A*, pod uwagę brana jest krawędź o kluczu 0)
+    def _backward_dijkstra(self, G: nx.MultiDiGraph, target: int) -> dict:
+        priority_queue = [(0.0, target)]
+        dist = {}
+        best = {target: 0.0}
+        while len(priority_queue) > 0:
+            current_dist, current_node = h.heappop(priority_queue)
+            if current_node in dist:
+                continue
+            dist[current_node] = current_dist
+            for u, v in G.in_edges(current_node):
+                new_dist = current_dist + G.get_edge_data(u, v, 0)["estimated_time"]
+                if new_dist < best.get(u, float("inf")):
+                    best[u] = new_dist
+                    h.heappush(priority_queue, (new_dist, u))
+        return dist
+
+
+# audyt heurystyki dla zadanej prędkości oraz dla prędkości wyznaczonej na podstawie grafu
+# python -m src.heuristic_audit graph.gpickle [prędkość] [liczba_celów] [par_na_cel]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Użycie: python -m src.heuristic_audit <graf.gpickle> [prędkość] [liczba_celów] [par_na_cel]")
+        sys.exit(1)
+
+    with open(sys.argv[1], "rb") as f:
+        graph = pickle.load(f)
+    speeds = [float(sys.argv[2])] if len(sys.argv) > 2 and float(sys.argv[2]) > 0 else []
+    speeds.append(derive_admissible_heuristic_speed(graph))
+    auditor = HeuristicAuditor(int(sys.argv[3]) if len(sys.argv) > 3 else 20, int(sys.argv[4]) if len(sys.argv) > 4 else 200)
+
+    for speed in speeds:
+        report = auditor.audit(graph, speed)
+        print(f"Prędkość {speed:.2f} km/h: sprawdzono {report['pairs']} par, "
+              f"przeszacowań: {report['violations']} (maks. {100 * report['max_violation']:.2f}%), "
+              f"średni zapas: {100 * report['mean_slack']:.2f}%")
@@ -1,9 +1,14 @@
+import math
 import networkx as nx
 from src.graph_utils import calculate_bbox
 
+# maksymalny próg czasowy izochrony [min] - większe budżety oznaczałyby przeszukiwanie niemal całego grafu
+MAX_ISOCHRONE_MINUTES = 120
+
 # klasa mająca na celu walidację danych wprowadzonych przez użytkownika
 # sprawdza m.in. to, czy liczba podanych punktów nie przekracza dopuszczalnej wartości max
 # oraz czy podane punkty znajdują się w bbox stworzonego grafu
+# i czy progi czasowe izochron są skończonymi, dodatnimi liczbami nie większymi niż MAX_ISOCHRONE_MINUTES
 class InputValidator:
     
     def __init__(self, max_points_allowed: int = 7):
@@ -15,6 +20,15 @@ class InputValidator:
         return len(points) <= self._max_points_allowed
     
     
+    def validate_isochrone_minutes(self, minutes: list) -> bool:
+        return len(minutes) > 0 and all(math.isfinite(m) and 0 < m <= MAX_ISOCHRONE_MINUTES for m in minutes)
+    
+    
+    # wyznaczenie bbox z góry - np. przed uproszczeniem grafu, które usuwa również węzły leżące na jego skraju
+    def set_bbox_from_graph(self, G: nx.MultiDiGraph):
+        self._bbox = calculate_bbox(G)
+    
+    
     def validate_points_within_bbox(self, G: nx.MultiDiGraph, points: list) -> bool:
         if len(self._bbox) == 0:
             self._bbox = calculate_bbox(G)
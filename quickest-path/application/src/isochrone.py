@@ -0,0 +1,131 @@
+import threading
+import networkx as nx
+import heapq as h
+import shapely
+from collections import OrderedDict
+from shapely.geometry import MultiPoint, mapping
+from src.left_turn_handler import LeftTurnHandler
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+
+
+# klasa ma na celu wyznaczanie izochron, czyli obszarów osiągalnych z danego punktu w zadanym czasie
+# (np. "dokąd kurier dojedzie z magazynu w 10/20/30 minut")
+# wykorzystywane jest jedno przeszukiwanie Dijkstry z ograniczeniem kosztu (z karami za skręty w lewo),
+# z którego wyznaczane są wszystkie progi czasowe naraz; manewry zabronione przez zakazy skrętu są pomijane
+# wyniki przeszukiwań zapamiętywane są dla ostatnio używanych punktów startowych - osobno dla każdego grafu
+# (drzewo przeszukiwania odwołuje się do krawędzi grafu, w którym zostało wyznaczone, np. widoku z przywróconymi węzłami)
+# z pamięci podręcznej korzystają równolegle obsługiwane zapytania, więc dostęp do niej chroniony jest blokadą
+class IsochroneBuilder:
+
+    # parametry:
+    # cache_size - liczba punktów startowych, dla których pamiętamy wynik przeszukiwania
+    # concave_ratio - parametr otoczki wklęsłej (0 - najbardziej dopasowana, 1 - otoczka wypukła)
+
+    def __init__(self, left_turn_handler: LeftTurnHandler, cache_size: int = 32, concave_ratio: float = 0.3):
+        self._left_turn_handler = left_turn_handler
+        self._cache_size = cache_size
+        self._concave_ratio = concave_ratio
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+
+    # główna metoda udostępniana na zewnątrz
+    # zwraca GeoJSON (FeatureCollection) z jednym wielokątem dla każdego progu czasowego [min]
+    # wielokąty posortowane są malejąco po progu, aby mniejsze obszary były rysowane na wierzchu
+    def build_isochrones(self, G: nx.MultiDiGraph, source: int, minutes: list) -> dict:
+        bands = self.reachable_nodes(G, source, [m * 60 for m in minutes])
+        features = []
+        for i in sorted(range(len(minutes)), key=lambda i: minutes[i], reverse=True):
+            points = self._band_points(G, bands[i])
+            features.append({
+                "type": "Feature",
+                "properties": {"minutes": minutes[i], "reachable_nodes": len(bands[i])},
+                "geometry": mapping(self._to_polygon(points))
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+    # wyznaczenie węzłów osiągalnych w ramach kolejnych budżetów czasowych [s]
+    # zwraca listę (w kolejności budżetów) słowników: węzeł -> poprzednik w drzewie przeszukiwania
+    def reachable_nodes(self, G: nx.MultiDiGraph, source: int, budgets: list) -> list:
+        if len(budgets) == 0:
+            raise ValueError("Nie podano żadnego progu czasowego izochrony.")
+        dist, tree = self._search_cached(G, source, max(budgets))
+        return [{node: tree[node] for node, d in dist.items() if d <= budget} for budget in budgets]
+
+
+    # przeszukiwanie z pamięcią podręczną - wynik dla większego budżetu obejmuje wszystkie mniejsze
+    # wpis jest ważny tylko dla tego samego obiektu grafu (graf nie jest modyfikowany po wczytaniu - patrz GraphSimplifier)
+    def _search_cached(self, G: nx.MultiDiGraph, source: int, budget: float) -> tuple:
+        with self._cache_lock:
+            cached = self._cache.get(source)
+            if cached is not None and cached[0] is G and cached[1] >= budget:
+                self._cache.move_to_end(source)
+                return cached[2], cached[3]
+
+        # przeszukiwanie odbywa się poza blokadą, aby nie wstrzymywać innych zapytań
+        dist, tree = self._search(G, source, budget)
+        with self._cache_lock:
+            self._cache[source] = (G, budget, dist, tree)
+            self._cache.move_to_end(source)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return dist, tree
+
+
+    # przeszukiwanie Dijkstry z jednego źródła do wszystkich węzłów o koszcie nie większym niż budget
+    def _search(self, G: nx.MultiDiGraph, source: int, budget: float) -> tuple:
+        restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+        priority_queue = [(0.0, source)]
+        dist = {}
+        tree = {source: -1}
+        best = {source: 0.0}
+
+        while len(priority_queue) > 0:
+            current_dist, current_node = h.heappop(priority_queue)
+            if current_node in dist:
+                continue
+            if current_dist > budget:
+                break
+            dist[current_node] = current_dist
+            predecessor = tree[current_node]
+
+            for edge in nx.edges(G, [current_node]):
+                edge_data = G.edges[(edge[0], edge[1], 0)]
+                neighbor = edge_data["v"]
+                if restrictions is not None and predecessor != -1 and restrictions.is_forbidden(predecessor, current_node, neighbor):
+                    continue
+                edge_length = edge_data["estimated_time"] + self._left_turn_handler.calculate_inner_penalty(edge_data.get("inner_left_turns", 0))
+                if predecessor != -1 and self._left_turn_handler.is_turn_left(G, predecessor, current_node, neighbor):
+                    edge_length += self._left_turn_handler.calculate_penalty(G, predecessor, current_node, neighbor)
+
+                new_dist = current_dist + edge_length
+                if new_dist <= budget and new_dist < best.get(neighbor, float("inf")):
+                    best[neighbor] = new_dist
+                    tree[neighbor] = current_node
+                    h.heappush(priority_queue, (new_dist, neighbor))
+
+        return dist, {node: tree[node] for node in dist}
+
+
+    # punkty obszaru osiągalnego: osiągnięte węzły oraz węzły pośrednie krawędzi drzewa przeszukiwania
+    # (w uproszczonym grafie są one zapisane w krawędziach)
+    def _band_points(self, G: nx.MultiDiGraph, reached: dict) -> list:
+        points = []
+        for node, predecessor in reached.items():
+            points.append((G.nodes[node]["x"], G.nodes[node]["y"]))
+            if predecessor != -1:
+                edge_data = G.get_edge_data(predecessor, node, 0)
+                points.extend(zip(edge_data.get("inner_x", []), edge_data.get("inner_y", [])))
+        return points
+
+
+    # zamiana zbioru punktów na wielokąt (otoczka wklęsła; dla bardzo małych zbiorów - niewielki bufor wokół punktów)
+    def _to_polygon(self, points: list):
+        multipoint = MultiPoint(points)
+        if len(points) < 3:
+            return multipoint.buffer(0.0005)
+        polygon = shapely.concave_hull(multipoint, ratio=self._concave_ratio)
+        if polygon.geom_type != "Polygon":
+            return multipoint.buffer(0.0005)
+        return polygon
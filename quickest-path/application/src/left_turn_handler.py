@@ -1,5 +1,5 @@
 import networkx as nx
-from src.graph_utils import get_vector_between_nodes, calculate_sin, calculate_cos, calculate_angle, compare_highways
+from src.graph_utils import get_edge_end_vector, get_edge_start_vector, calculate_sin, calculate_cos, calculate_angle, compare_highways
 
 
 # klasa ma na celu udostępnienie funkcjonalności rozpoznawania skrętów w lewo w grafie
@@ -14,6 +14,12 @@ class LeftTurnHandler:
         self._min_angle_left_turn = min_angle_left_turn
 
 
+    # parametry rozpoznawania skrętów i kar w postaci krotki
+    # (minimalny kąt skrętu w lewo, kara za skręt w drogę lepszą, równą, gorszą)
+    def get_parameters(self) -> tuple:
+        return (self._min_angle_left_turn, self._penalty_to_better_road, self._penalty_to_equal_road, self._penalty_to_worse_road)
+
+
     def is_turn_left(self, G: nx.MultiDiGraph, first_node_id: int, second_node_id: int, third_node_id: int) -> bool:
         # sprawdzenie, czy badane węzły są połączone krawędziami
         if (first_node_id, second_node_id) not in nx.edges(G, [first_node_id]) or (second_node_id, third_node_id) not in nx.edges(G, [second_node_id]):
@@ -24,8 +30,9 @@ class LeftTurnHandler:
             return False
         
         # wyznacz wektory pomiędzy punktami 
-        vector_a = get_vector_between_nodes(G, first_node_id, second_node_id)
-        vector_b = get_vector_between_nodes(G, second_node_id, third_node_id)        
+        # (dla krawędzi uproszczonego grafu są to wektory odcinków przylegających do środkowego węzła)
+        vector_a = get_edge_end_vector(G, first_node_id, second_node_id)
+        vector_b = get_edge_start_vector(G, second_node_id, third_node_id)
         
         # wyznacz sin i cos powyższych wektorów
         sin_alpha = calculate_sin(vector_a, vector_b)
@@ -42,6 +49,15 @@ class LeftTurnHandler:
         
     
     def calculate_penalty(self, G: nx.MultiDiGraph, first_node_id: int, second_node_id: int, third_node_id: int) -> float:
+        # porównanie kategorii na podstawie zdefiniowanego porządku liniowego kategorii dróg
+        highway_comparison = self.get_turn_category(G, first_node_id, second_node_id, third_node_id)
+        
+        # zwrócenie właściwej kary na podstawie uzyskanego wyniku porównania
+        return self.penalty_for_category(highway_comparison)
+    
+    
+    # metoda zwracająca kategorię skrętu: -1 w drogę gorszą, 0 w drogę równą, 1 w drogę lepszą
+    def get_turn_category(self, G: nx.MultiDiGraph, first_node_id: int, second_node_id: int, third_node_id: int) -> int:
         # sprawdzenie, czy badane węzły są połączone krawędziami
         if (first_node_id, second_node_id) not in nx.edges(G, [first_node_id]) or (second_node_id, third_node_id) not in nx.edges(G, [second_node_id]):
             raise ValueError("Próba naliczenia kary za skręt dla niepoprawnych danych!")
@@ -50,10 +66,11 @@ class LeftTurnHandler:
         from_highway = G.get_edge_data(first_node_id, second_node_id, 0)["highway"]
         to_highway = G.get_edge_data(second_node_id, third_node_id, 0)["highway"]
         
-        # porównanie kategorii na podstawie zdefiniowanego porządku liniowego kategorii dróg
-        highway_comparison = compare_highways(from_highway, to_highway)
-        
-        # zwrócenie właściwej kary na podstawie uzyskanego wyniku porównania
+        return compare_highways(from_highway, to_highway)
+    
+    
+    # metoda zwracająca karę dla danej kategorii skrętu w lewo
+    def penalty_for_category(self, highway_comparison: int) -> float:
         if highway_comparison == -1:
             return self._penalty_to_worse_road
         elif highway_comparison == 0:
@@ -62,4 +79,30 @@ class LeftTurnHandler:
             return self._penalty_to_better_road
         else:
             raise ValueError("Niespodziewany błąd przy wyliczaniu kary za skręt w lewo.")
-        
+    
+    
+    # kara za skręty w lewo wykonywane w węzłach pośrednich krawędzi uproszczonego grafu (GraphSimplifier)
+    # obie drogi w takim węźle mają zawsze tę samą kategorię, stąd kara jak za skręt w drogę o równym standardzie
+    def calculate_inner_penalty(self, inner_left_turns: int) -> float:
+        return inner_left_turns * self._penalty_to_equal_road
+    
+    
+    # zliczenie skrętów w lewo na ścieżce (bez skrętu w pierwszym węźle, tak jak przy wyszukiwaniu)
+    def count_left_turns(self, G: nx.MultiDiGraph, path: list) -> int:
+        count = sum(G.get_edge_data(u, v, 0).get("inner_left_turns", 0) for u, v in zip(path[:-1], path[1:]))
+        for first_node_id, second_node_id, third_node_id in zip(path[:-2], path[1:-1], path[2:]):
+            if self.is_turn_left(G, first_node_id, second_node_id, third_node_id):
+                count += 1
+        return count
+    
+    
+    # wyznaczenie kosztu ścieżki tak, jak liczy go BestPathFinder: czas przejazdu powiększony o kary za skręty w lewo
+    # (bez skrętu w pierwszym węźle ścieżki)
+    def calculate_path_cost(self, G: nx.MultiDiGraph, path: list) -> float:
+        cost = 0.0
+        for i in range(len(path) - 1):
+            edge_data = G.get_edge_data(path[i], path[i+1], 0)
+            cost += edge_data["estimated_time"] + self.calculate_inner_penalty(edge_data.get("inner_left_turns", 0))
+            if i > 0 and self.is_turn_left(G, path[i-1], path[i], path[i+1]):
+                cost += self.calculate_penalty(G, path[i-1], path[i], path[i+1])
+        return cost
@@ -0,0 +1,305 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import pickle
+import threading
+import subprocess
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from src.array_graph import ArrayGraph
+from src.graph_utils import normalize_address
+
+
+# katalog aplikacji (z plikiem manage.py) - z niego uruchamiane są procesy serwera
+APPLICATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# domyślny port atrap usług zewnętrznych (stały, aby można go było podać serwerowi uruchomionemu ręcznie)
+STUB_PORT = 8090
+
+# port pierwszego z uruchamianych procesów serwera (kolejne procesy dostają kolejne porty)
+SERVER_BASE_PORT = 8100
+
+# percentyle raportowane dla czasu odpowiedzi
+PERCENTILES = [50, 95, 99]
+
+
+# współrzędne węzłów grafu posortowane po id (tablice node_ids, szerokość geo., długość geo.)
+# graf w postaci tablic mapowany jest do pamięci, więc atrapy nie wczytują całego grafu
+def load_node_coordinates(graph_path: str) -> tuple:
+    if os.path.isdir(graph_path):
+        graph = ArrayGraph.load(graph_path, mmap=True)
+        return np.asarray(graph.node_ids), np.asarray(graph.y), np.asarray(graph.x)
+    with open(graph_path, "rb") as f:
+        G = pickle.load(f)
+    node_ids = np.array(sorted(G.nodes), dtype=np.int64)
+    lat = np.array([G.nodes[node]["y"] for node in node_ids.tolist()])
+    lon = np.array([G.nodes[node]["x"] for node in node_ids.tolist()])
+    return node_ids, lat, lon
+
+
+# deterministyczny zestaw adresów testowych: nazwa adresu -> (szerokość geo., długość geo.) losowego węzła grafu
+# ten sam seed daje te same adresy, dzięki czemu wyniki kolejnych przebiegów są porównywalne
+def build_fixtures(node_ids: np.ndarray, lat: np.ndarray, lon: np.ndarray, number_of_addresses: int = 200, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    indices = rng.choice(len(node_ids), size=min(number_of_addresses, len(node_ids)), replace=False)
+    return {f"Adres testowy {i:04d}": (float(lat[index]), float(lon[index])) for i, index in enumerate(indices.tolist())}
+
+
+# handler HTTP obu atrap: Nominatim (GET /search?q=...) oraz Overpass (POST /api/interpreter)
+# atrapa Nominatim zwraca współrzędne adresów z zestawu testowego (nieznany adres - pusta lista, jak prawdziwa usługa)
+# atrapa Overpass zwraca węzły z zapytania "(node(id:...););out body;" posortowane po id, tak jak prawdziwa usługa
+class _StubRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/search":
+            self._send(404, "text/plain", b"")
+            return
+        time.sleep(self.server.nominatim_latency)
+        query = parse_qs(url.query).get("q", [""])[0]
+        coordinates = self.server.addresses.get(normalize_address(query))
+        places = []
+        if coordinates is not None:
+            places.append({"lat": str(coordinates[0]), "lon": str(coordinates[1]), "display_name": query,
+                           "type": "house", "importance": 1.0})
+        self._send(200, "application/json", json.dumps(places).encode("utf-8"))
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/api/interpreter":
+            self._send(404, "text/plain", b"")
+            return
+        time.sleep(self.server.overpass_latency)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        body = parse_qs(body).get("data", [body])[0]
+        match = re.search(r"node\(id:([^)]*)\)", body)
+        ids = np.unique(np.array([int(x) for x in match.group(1).split(",") if x.strip()] if match else [], dtype=np.int64))
+        node_ids, lat, lon = self.server.node_coordinates
+        positions = np.minimum(node_ids.searchsorted(ids), len(node_ids) - 1)
+        nodes = [f'<node id="{node_ids[i]}" lat="{lat[i]}" lon="{lon[i]}"/>'
+                 for i in positions[node_ids[positions] == ids].tolist()]
+        self._send(200, "application/xml", f'<?xml version="1.0" encoding="UTF-8"?><osm version="0.6">{"".join(nodes)}</osm>'.encode("utf-8"))
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# lokalne atrapy usług Nominatim i Overpass - test obciążeniowy nie odpytuje publicznych usług
+# (limity zapytań, zmienny czas odpowiedzi) i mierzy wyłącznie czas pracy aplikacji
+# opcjonalne opóźnienia (nominatim_latency, overpass_latency) [s] pozwalają zasymulować czas odpowiedzi prawdziwych usług
+class StubServices:
+
+    def __init__(self, node_coordinates: tuple, addresses: dict, port: int = STUB_PORT,
+                 nominatim_latency: float = 0.0, overpass_latency: float = 0.0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _StubRequestHandler)
+        self._server.daemon_threads = True
+        self._server.node_coordinates = node_coordinates
+        self._server.addresses = {normalize_address(address): coordinates for address, coordinates in addresses.items()}
+        self._server.nominatim_latency = nominatim_latency
+        self._server.overpass_latency = overpass_latency
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def nominatim_endpoint(self) -> str:
+        return self.base_url + "/"
+
+    @property
+    def overpass_endpoint(self) -> str:
+        return self.base_url + "/api/interpreter"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# pula procesów serwera Django (manage.py runserver) na kolejnych portach, skierowanych na atrapy usług
+# każdy proces obsługuje jedno żądanie naraz (--nothreading), więc liczba procesów to liczba równoległych workerów
+# (przy obsłudze wątkami czasy etapów zapisywane w App mieszałyby się między równoległymi żądaniami)
+class ServerPool:
+
+    def __init__(self, graph_path: str, stubs: StubServices, number_of_workers: int = 1,
+                 base_port: int = SERVER_BASE_PORT, startup_timeout: float = 600.0):
+        env = dict(os.environ)
+        env["NOMINATIM_ENDPOINT"] = stubs.nominatim_endpoint
+        env["OVERPASS_ENDPOINT"] = stubs.overpass_endpoint
+        env["ROUTING_ARRAY_GRAPH_DIR" if os.path.isdir(graph_path) else "ROUTING_PICKLE_FILEPATH"] = os.path.abspath(graph_path)
+
+        self.urls = [f"http://127.0.0.1:{base_port + i}/" for i in range(number_of_workers)]
+        self._processes = [subprocess.Popen([sys.executable, "manage.py", "runserver", "--noreload", "--nothreading",
+                                             f"127.0.0.1:{base_port + i}"],
+                                            cwd=APPLICATION_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                           for i in range(number_of_workers)]
+        try:
+            self._wait_until_ready(startup_timeout)
+        except RuntimeError:
+            self.close()
+            raise
+
+    # serwer jest gotowy, gdy odpowiada na zapytania (graf wczytywany jest przed otwarciem portu)
+    def _wait_until_ready(self, startup_timeout: float):
+        deadline = time.monotonic() + startup_timeout
+        for url, process in zip(self.urls, self._processes):
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Proces serwera {url} zakończył działanie z kodem {process.returncode}.")
+                try:
+                    requests.get(url + "api/route/", timeout=5)
+                    break
+                except requests.RequestException:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"Serwer {url} nie uruchomił się w ciągu {startup_timeout:.0f} s.")
+                    time.sleep(0.5)
+
+    def close(self):
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# odczyt nagłówka Server-Timing, np. "geocode;dur=812.4, search;dur=35.2" -> {"geocode": 812.4, "search": 35.2} [ms]
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        match = re.search(r"dur=([0-9.]+)", params)
+        if name and match:
+            timings[name] = float(match.group(1))
+    return timings
+
+
+# klasa ma na celu przeprowadzenie testu obciążeniowego endpointu api/route/
+# żądania wysyłane są równolegle (concurrency) do serwerów z listy urls (po kolei, round-robin)
+# number_of_queries - liczba różnych zapytań (mniejsza niż number_of_requests oznacza powtórzenia obsługiwane z cache tras)
+class LoadTestDriver:
+
+    def __init__(self, urls: list, addresses: list, concurrency: int = 4, number_of_requests: int = 200,
+                 number_of_queries: int = 50, stops_per_query: int = 3, seed: int = 0, timeout: float = 120.0):
+        if len(addresses) < stops_per_query:
+            raise ValueError("Zestaw testowy zawiera za mało adresów dla zadanej liczby punktów w zapytaniu.")
+        self._urls = urls
+        self._concurrency = concurrency
+        self._number_of_requests = number_of_requests
+        self._timeout = timeout
+        rng = random.Random(seed)
+        self._queries = [rng.sample(addresses, stops_per_query) for _ in range(number_of_queries)]
+
+    # główna metoda udostępniana na zewnątrz - zwraca raport z testu
+    def run(self) -> dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self._concurrency) as executor:
+            results = list(executor.map(self._send, range(self._number_of_requests)))
+        return self._report(results, time.perf_counter() - start)
+
+    def _send(self, request_id: int) -> dict:
+        url = self._urls[request_id % len(self._urls)] + "api/route/"
+        query = self._queries[request_id % len(self._queries)]
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, params={"address": query}, timeout=self._timeout)
+        except requests.RequestException as e:
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+        return {"ok": response.status_code == 200,
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "cache_hit": response.headers.get("X-Route-Cache") == "HIT",
+                "timings": parse_server_timing(response.headers.get("Server-Timing", "")),
+                "error": None if response.status_code == 200 else f"HTTP {response.status_code}"}
+
+    def _report(self, results: list, elapsed: float) -> dict:
+        ok = [result for result in results if result["ok"]]
+        latencies = np.array([result["latency_ms"] for result in ok])
+        phases = {}
+        for result in ok:
+            for phase, duration in result["timings"].items():
+                phases.setdefault(phase, []).append(duration)
+
+        return {
+            "workers": len(self._urls),
+            "concurrency": self._concurrency,
+            "requests": len(results),
+            "errors": len(results) - len(ok),
+            "error_examples": sorted({result["error"] for result in results if not result["ok"]})[:5],
+            "elapsed_s": elapsed,
+            "throughput_rps": len(ok) / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": {f"p{p}": float(np.percentile(latencies, p)) if len(latencies) else None for p in PERCENTILES},
+            "cache_hit_ratio": sum(result["cache_hit"] for result in ok) / len(ok) if ok else 0.0,
+            "phases_ms": {phase: {"mean": float(np.mean(durations)), "p95": float(np.percentile(durations, 95))}
+                          for phase, durations in phases.items()}
+        }
+
+
+def print_report(report: dict):
+    print(f"Workery: {report['workers']}, współbieżność: {report['concurrency']}, "
+          f"żądania: {report['requests']}, błędy: {report['errors']}")
+    for error in report["error_examples"]:
+        print(f"  błąd: {error}")
+    print(f"Przepustowość: {report['throughput_rps']:.1f} żądań/s (czas testu {report['elapsed_s']:.1f} s)")
+    print("Czas odpowiedzi: " + ", ".join(f"{name}={value:.1f} ms" for name, value in report["latency_ms"].items() if value is not None))
+    print(f"Trafienia w cache tras: {100 * report['cache_hit_ratio']:.1f}%")
+    for phase, stats in report["phases_ms"].items():
+        print(f"  {phase:<10} średnio {stats['mean']:8.1f} ms, p95 {stats['p95']:8.1f} ms")
+
+
+# test obciążeniowy na lokalnych atrapach Nominatim i Overpass
+# python -m src.load_test graph.gpickle 4 8 500 100 wynik.json
+# zamiast liczby procesów można podać adresy działających serwerów (po przecinku) - muszą one korzystać z tego samego grafu
+# i z atrap uruchamianych na porcie STUB_PORT (NOMINATIM_ENDPOINT=http://127.0.0.1:8090/, OVERPASS_ENDPOINT=http://127.0.0.1:8090/api/interpreter)
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Użycie: python -m src.load_test <graf.gpickle|katalog_grafu> [procesy_serwera|adresy_url] [współbieżność] "
+              "[liczba_żądań] [liczba_zapytań] [wynik.json]")
+        sys.exit(1)
+    workers = sys.argv[2] if len(sys.argv) > 2 else "1"
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    number_of_requests = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+    number_of_queries = int(sys.argv[5]) if len(sys.argv) > 5 else 50
+
+    node_coordinates = load_node_coordinates(sys.argv[1])
+    fixtures = build_fixtures(*node_coordinates)
+    with StubServices(node_coordinates, fixtures) as stubs:
+        print(f"Atrapy usług: {stubs.base_url}")
+        if workers.startswith("http"):
+            urls = [url if url.endswith("/") else url + "/" for url in workers.split(",")]
+            report = LoadTestDriver(urls, list(fixtures), concurrency, number_of_requests, number_of_queries).run()
+        else:
+            start = time.perf_counter()
+            with ServerPool(sys.argv[1], stubs, int(workers)) as pool:
+                print(f"Uruchomiono {workers} procesów serwera w {time.perf_counter() - start:.1f} s")
+                report = LoadTestDriver(pool.urls, list(fixtures), concurrency, number_of_requests, number_of_queries).run()
+
+    print_report(report)
+    if len(sys.argv) > 6:
+        with open(sys.argv[6], "w") as f:
+            json.dump(report, f, indent=2)
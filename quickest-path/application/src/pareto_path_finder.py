@@ -0,0 +1,154 @@
+import networkx as nx
+import heapq as h
+from src.left_turn_handler import LeftTurnHandler
+from src.graph_utils import calculate_heuristic
+from src.graph_components import ComponentIndex
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+
+
+# indeksy liczników skrętów w lewo w wektorze kosztu, zgodnie z kategorią skrętu zwracaną przez LeftTurnHandler
+# (1 - skręt w drogę lepszą, 0 - w drogę równą, -1 - w drogę gorszą)
+TURN_CATEGORY_INDEX = {1: 0, 0: 1, -1: 2}
+
+
+# klasa ma na celu wyznaczenie w jednym przebiegu wszystkich tras Pareto-optymalnych między dwoma węzłami
+# względem czasu przejazdu (bez kar) oraz liczby skrętów w lewo (z podziałem na kategorie: w drogę lepszą, równą, gorszą)
+# wykorzystywany jest wielokryterialny algorytm etykietujący (wariant A* z odrzucaniem etykiet zdominowanych)
+# mając taki front, trasę dla dowolnych wartości kar za skręty w lewo można wybrać bez ponownego wyszukiwania
+# stanem przeszukiwania jest para (poprzednik, węzeł), więc zakazy skrętu (G.graph["turn_restrictions"]) sprawdzane są
+# przy każdej relaksacji, a indeks silnie spójnych składowych pozwala pominąć przeszukiwanie dla węzłów nieosiągalnych
+class ParetoPathFinder:
+
+    def __init__(self, left_turn_handler: LeftTurnHandler, heur_maxspeed: int = 140, component_index: ComponentIndex = None):
+        self._left_turn_handler = left_turn_handler
+        self._heur_maxspeed = heur_maxspeed
+        self._component_index = component_index
+
+
+    # główna metoda udostępniana na zewnątrz
+    # zwraca listę trasy Pareto-optymalnych w postaci krotek (czas przejazdu, (skręty w lepszą, równą, gorszą), ścieżka)
+    # posortowaną rosnąco po czasie przejazdu (pustą, jeśli z source nie da się dojechać do dest)
+    def find_pareto_front(self, G: nx.MultiDiGraph, source: int, dest: int) -> list:
+
+        # jeśli wiadomo, że z source nie da się dojechać do dest, nie ma sensu przeszukiwać grafu
+        if self._component_index is not None and not self._component_index.can_reach(source, dest):
+            return []
+
+        # zakazy skrętu (jeśli zostały wczytane razem z grafem)
+        restrictions = G.graph.get(TURN_RESTRICTIONS_KEY)
+
+        # etykieta: (czas, liczniki skrętów, węzeł, poprzednik, indeks etykiety poprzedzającej)
+        # stan przeszukiwania to para (poprzednik, węzeł), bo od poprzednika zależy, czy kolejny ruch jest skrętem w lewo
+        labels = [(0.0, (0, 0, 0), source, -1, -1)]
+        state_labels = {(-1, source): [0]}
+        dead_labels = set()
+        dest_labels = []
+
+        priority_queue = []
+        h.heappush(priority_queue, (calculate_heuristic(G, source, dest, self._heur_maxspeed), (0, 0, 0), 0))
+
+        while len(priority_queue) > 0:
+            f, _, label_id = h.heappop(priority_queue)
+
+            # etykieta mogła zostać zdominowana po dodaniu jej do kolejki
+            if label_id in dead_labels:
+                continue
+            time, turns, current_node, predecessor, _ = labels[label_id]
+
+            # odrzuć etykietę, jeśli nawet w najlepszym przypadku nie poprawi znalezionych już tras
+            if self._is_dominated_by_dest(labels, dest_labels, f, turns):
+                continue
+
+            # etykieta w celu - nowa trasa Pareto-optymalna (nie rozwijamy jej dalej)
+            if current_node == dest:
+                dest_labels.append(label_id)
+                continue
+
+            for edge in nx.edges(G, [current_node]):
+                edge_data = G.edges[(edge[0], edge[1], 0)]
+                neighbor = edge_data["v"]
+
+                # pomiń manewr zabroniony przez zakaz skrętu
+                if restrictions is not None and predecessor != -1 and restrictions.is_forbidden(predecessor, current_node, neighbor):
+                    continue
+
+                # zlicz skręty w lewo (również te w węzłach pośrednich uproszczonego grafu - zawsze w drogę równą)
+                new_turns = list(turns)
+                new_turns[TURN_CATEGORY_INDEX[0]] += edge_data.get("inner_left_turns", 0)
+                if predecessor != -1 and self._left_turn_handler.is_turn_left(G, predecessor, current_node, neighbor):
+                    category = self._left_turn_handler.get_turn_category(G, predecessor, current_node, neighbor)
+                    new_turns[TURN_CATEGORY_INDEX[category]] += 1
+                new_turns = tuple(new_turns)
+                new_time = time + edge_data["estimated_time"]
+
+                # dodaj etykietę, jeśli nie jest zdominowana przez inną etykietę tego samego stanu
+                state = (current_node, neighbor)
+                if not self._insert_label(labels, state_labels, dead_labels, state, new_time, new_turns):
+                    continue
+                labels.append((new_time, new_turns, neighbor, current_node, label_id))
+                state_labels[state].append(len(labels) - 1)
+
+                new_f = new_time + calculate_heuristic(G, neighbor, dest, self._heur_maxspeed)
+                if not self._is_dominated_by_dest(labels, dest_labels, new_f, new_turns):
+                    h.heappush(priority_queue, (new_f, new_turns, len(labels) - 1))
+
+        # odtwórz ścieżki tras Pareto-optymalnych
+        front = [(labels[label_id][0], labels[label_id][1], self._reconstruct_path(labels, label_id)) for label_id in dest_labels]
+        return sorted(front, key=lambda route: route[0])
+
+
+    # wybór trasy z frontu dla zadanych kar za skręty w lewo (w drogę lepszą, równą, gorszą)
+    # zwraca ścieżkę minimalizującą czas przejazdu powiększony o kary
+    def select_route(self, front: list, penalty_to_better_road: float, penalty_to_equal_road: float, penalty_to_worse_road: float) -> list:
+        if len(front) == 0:
+            raise RuntimeError("Brak tras do wyboru - front Pareto jest pusty.")
+        penalties = (penalty_to_better_road, penalty_to_equal_road, penalty_to_worse_road)
+        best_route = min(front, key=lambda route: route[0] + sum(n * p for n, p in zip(route[1], penalties)))
+        return best_route[2]
+
+
+    # rzut frontu na dwa kryteria: czas przejazdu i łączna liczba skrętów w lewo
+    # zwraca listę krotek (czas przejazdu, liczba skrętów w lewo, ścieżka) bez tras zdominowanych
+    def time_vs_left_turns(self, front: list) -> list:
+        result = []
+        for time, turns, path in sorted(front, key=lambda route: (route[0], sum(route[1]))):
+            if len(result) == 0 or sum(turns) < result[-1][1]:
+                result.append((time, sum(turns), path))
+        return result
+
+
+    # dodanie etykiety do stanu z usunięciem etykiet przez nią zdominowanych
+    # zwraca False, jeśli nowa etykieta jest zdominowana przez istniejącą
+    def _insert_label(self, labels: list, state_labels: dict, dead_labels: set, state: tuple, time: float, turns: tuple) -> bool:
+        existing = state_labels.setdefault(state, [])
+        for label_id in existing:
+            if labels[label_id][0] <= time and _all_le(labels[label_id][1], turns):
+                return False
+        surviving = []
+        for label_id in existing:
+            if time <= labels[label_id][0] and _all_le(turns, labels[label_id][1]):
+                dead_labels.add(label_id)
+            else:
+                surviving.append(label_id)
+        existing[:] = surviving
+        return True
+
+
+    # sprawdzenie, czy etykieta o dolnym oszacowaniu czasu f i licznikach turns jest zdominowana przez trasę w celu
+    def _is_dominated_by_dest(self, labels: list, dest_labels: list, f: float, turns: tuple) -> bool:
+        for label_id in dest_labels:
+            if labels[label_id][0] <= f and _all_le(labels[label_id][1], turns):
+                return True
+        return False
+
+
+    def _reconstruct_path(self, labels: list, label_id: int) -> list:
+        path = []
+        while label_id != -1:
+            path.insert(0, labels[label_id][2])
+            label_id = labels[label_id][4]
+        return path
+
+
+def _all_le(a: tuple, b: tuple) -> bool:
+    return a[0] <= b[0] and a[1] <= b[1] and a[2] <= b[2]
@@ -0,0 +1,398 @@
+import sys
+import json
+import time
+import queue
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from osmnx._errors import InsufficientResponseError
+from src.geo_mapper import GeoMapper
+from src.graph_utils import get_resident_memory_mb
+
+
+# metody App, które można wywołać w procesie roboczym regionu (zwracają wyniki, które da się przesłać między procesami)
+SHARD_METHODS = {"run_query_from_coordinates", "get_graph_version", "get_routing_parameters"}
+
+
+# rejestr regionów (shardów): każdy region to osobny graf (np. jedno miasto) opisany nazwą,
+# prostokątem [min dł. geo., min szer. geo., maks. dł. geo., maks. szer. geo.]
+# oraz parametrami App, z którymi graf jest wczytywany (np. array_graph_dir, slim_graph)
+# zapytanie kierowane jest do regionu, którego prostokąt zawiera wszystkie punkty zapytania
+class RegionRegistry:
+
+    def __init__(self):
+        self._regions = OrderedDict()
+
+
+    def add_region(self, name: str, bbox: list, app_parameters: dict):
+        if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+            raise ValueError(f"Niepoprawny prostokąt regionu {name}: {bbox}")
+        if name in self._regions:
+            raise ValueError(f"Region {name} został już zarejestrowany.")
+        self._regions[name] = (tuple(float(value) for value in bbox), dict(app_parameters))
+
+
+    # wczytanie rejestru z pliku JSON:
+    # {"regions": [{"name": "warszawa", "bbox": [20.85, 52.09, 21.28, 52.37], "app": {"array_graph_dir": "graphs/warszawa"}}]}
+    @classmethod
+    def load(cls, filepath: str) -> "RegionRegistry":
+        with open(filepath) as f:
+            data = json.load(f)
+        registry = cls()
+        for region in data["regions"]:
+            registry.add_region(region["name"], region["bbox"], region.get("app", {}))
+        return registry
+
+
+    def names(self) -> list:
+        return list(self._regions)
+
+
+    def get_bbox(self, name: str) -> tuple:
+        return self._regions[name][0]
+
+
+    def get_app_parameters(self, name: str) -> dict:
+        return dict(self._regions[name][1])
+
+
+    # region, do którego należy skierować zapytanie o punkty (szerokość geo., długość geo.)
+    # jeśli punkty leżą w kilku regionach (np. region miasta wewnątrz regionu województwa), wybierany jest najmniejszy
+    def find_region(self, points_coordinates: list) -> str:
+        if len(points_coordinates) == 0:
+            raise RuntimeError("Nie podano żadnych punktów, dla których należy wybrać region.")
+        candidates = []
+        for name, (bbox, _) in self._regions.items():
+            min_lon, min_lat, max_lon, max_lat = bbox
+            if all(min_lat <= lat <= max_lat and min_lon <= lon <= max_lon for lat, lon in points_coordinates):
+                candidates.append(((max_lon - min_lon) * (max_lat - min_lat), name))
+        if len(candidates) == 0:
+            raise RuntimeError("Zadane punkty nie znajdują się w całości w zasięgu żadnego z posiadanych regionów.")
+        return min(candidates)[1]
+
+
+# pętla procesu roboczego regionu: wczytanie grafu (App) i obsługa kolejnych wywołań przesyłanych przez potok
+# każda odpowiedź to krotka (status, wynik, pamięć procesu [MB]); wiadomość None kończy pracę procesu
+def _shard_worker(name: str, app_parameters: dict, connection):
+    try:
+        from src.app import App
+        app = App(**app_parameters)
+        app.initialize_state()
+    except Exception as e:
+        connection.send(("error", f"Nie udało się wczytać regionu {name}: {e}", get_resident_memory_mb()))
+        return
+    connection.send(("ready", None, get_resident_memory_mb()))
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        method, args = message
+        try:
+            connection.send(("ok", getattr(app, method)(*args), get_resident_memory_mb()))
+        except Exception as e:
+            connection.send(("error", str(e), get_resident_memory_mb()))
+
+
+# proces roboczy regionu wraz z potokiem do komunikacji (wywołania są sekwencyjne - potok obsługuje jedno naraz)
+class _ShardWorker:
+
+    def __init__(self, context, name: str, app_parameters: dict):
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=_shard_worker, args=(name, app_parameters, child_connection),
+                                        name=f"shard-{name}", daemon=True)
+        self._process.start()
+        child_connection.close()
+        self.memory_mb = 0.0
+
+
+    # oczekiwanie na wczytanie grafu przez proces roboczy
+    def wait_until_ready(self):
+        status, result = self._receive()
+        if status != "ready":
+            raise RuntimeError(result)
+
+
+    def request(self, method: str, args: tuple) -> tuple:
+        try:
+            self._connection.send((method, args))
+        except (OSError, ValueError):
+            self._process.join(timeout=1)
+            raise RuntimeError(f"Proces roboczy {self._process.name} zakończył działanie (kod wyjścia: {self._process.exitcode}).")
+        return self._receive()
+
+
+    def stop(self):
+        try:
+            self._connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._connection.close()
+
+
+    def _receive(self) -> tuple:
+        try:
+            status, result, self.memory_mb = self._connection.recv()
+        except (EOFError, OSError):
+            self._process.join(timeout=1)
+            raise RuntimeError(f"Proces roboczy {self._process.name} zakończył działanie (kod wyjścia: {self._process.exitcode}).")
+        return status, result
+
+
+# region wczytany w procesach roboczych
+# procesy uruchamiane są przy pierwszym zapytaniu (load), a wolne procesy czekają w kolejce idle_workers
+# proces, który przestał odpowiadać, jest zastępowany nowym - pozostałe procesy regionu obsługują w tym czasie inne zapytania
+class _Shard:
+
+    def __init__(self, context, name: str, app_parameters: dict, workers_per_shard: int):
+        self.name = name
+        self.active_requests = 0
+        self._context = context
+        self._app_parameters = app_parameters
+        self._workers_per_shard = workers_per_shard
+        self._workers = []
+        self._idle_workers = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._stopped = False
+
+
+    def load(self):
+        with self._load_lock:
+            if self._workers:
+                return
+            # procesy wczytują graf równolegle
+            start = time.perf_counter()
+            workers = [_ShardWorker(self._context, self.name, self._app_parameters) for _ in range(self._workers_per_shard)]
+            try:
+                for worker in workers:
+                    worker.wait_until_ready()
+            except RuntimeError:
+                for worker in workers:
+                    worker.stop()
+                raise
+            for worker in workers:
+                self._workers.append(worker)
+                self._idle_workers.put(worker)
+            print(f"Wczytano region {self.name} w {time.perf_counter() - start:.1f} s ({self.memory_mb():.1f} MB)")
+
+
+    def request(self, method: str, args: tuple) -> tuple:
+        worker = self._idle_workers.get()
+        try:
+            return worker.request(method, args)
+        except RuntimeError:
+            worker = self._replace_worker(worker)
+            raise
+        finally:
+            self._idle_workers.put(worker)
+
+
+    # uruchomienie nowego procesu w miejsce procesu, który przestał odpowiadać
+    # jeśli nowy proces nie wczyta grafu, zwracany jest stary - kolejne zapytanie, które go otrzyma, ponowi próbę
+    def _replace_worker(self, failed_worker: _ShardWorker) -> _ShardWorker:
+        if self._stopped:
+            return failed_worker
+        worker = _ShardWorker(self._context, self.name, self._app_parameters)
+        try:
+            worker.wait_until_ready()
+        except RuntimeError:
+            worker.stop()
+            return failed_worker
+        with self._load_lock:
+            self._workers = [worker if w is failed_worker else w for w in self._workers]
+        failed_worker.stop()
+        print(f"Zastąpiono proces roboczy regionu {self.name}")
+        return worker
+
+
+    def memory_mb(self) -> float:
+        return sum(worker.memory_mb for worker in self._workers)
+
+
+    def stop(self):
+        self._stopped = True
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+
+# klasa ma na celu obsługę wielu regionów (np. miast) bez wczytywania wszystkich grafów w jednym procesie
+# każdy region wczytywany jest w osobnych, przeznaczonych dla niego procesach roboczych (App z parametrami z rejestru),
+# a zapytania kierowane są do właściwego regionu na podstawie współrzędnych punktów i przesyłane przez potoki
+# regiony wczytywane są dopiero przy pierwszym zapytaniu; gdy łączna pamięć procesów przekracza budżet
+# (lub liczba wczytanych regionów przekracza limit), zamykane są procesy najdawniej używanych regionów
+class ShardRouter:
+
+    # parametry:
+    # registry - rejestr regionów
+    # workers_per_shard - liczba procesów roboczych regionu (każdy przechowuje własną kopię grafu i obsługuje jedno zapytanie naraz)
+    # memory_budget_mb - łączna pamięć (RSS) procesów roboczych [MB], powyżej której usuwane są nieużywane regiony (None - bez limitu)
+    # max_resident_shards - maksymalna liczba jednocześnie wczytanych regionów (None - bez limitu)
+
+    def __init__(self, registry: RegionRegistry, workers_per_shard: int = 1, memory_budget_mb: float = None,
+                 max_resident_shards: int = None):
+        if workers_per_shard < 1:
+            raise ValueError("Każdy region musi być obsługiwany przez co najmniej jeden proces roboczy.")
+        self._registry = registry
+        self._workers_per_shard = workers_per_shard
+        self._memory_budget_mb = memory_budget_mb
+        self._max_resident_shards = max_resident_shards
+
+        # procesy robocze uruchamiane są metodą spawn - nie dziedziczą pamięci procesu głównego ani innych regionów
+        self._context = mp.get_context("spawn")
+        self._geo_mapper = GeoMapper()
+        self._shards = OrderedDict()
+        self._last_memory_mb = {}
+        self._lock = threading.Lock()
+
+
+    # główna metoda udostępniana na zewnątrz (odpowiednik App.run_query)
+    # adresy geomapowane są w procesie głównym, a zapytanie wykonywane w procesie roboczym właściwego regionu
+    # zwraca krotkę (nazwa regionu, ścieżka)
+    def run_query(self, addresses: list) -> tuple:
+        try:
+            points_coordinates = [self._geo_mapper.map_to_coordinates(address) for address in addresses]
+        except InsufficientResponseError as e:
+            raise RuntimeError(f"Nie udało się zrealizować geomapowania jednego z punktów: {e}")
+        return self.run_query_from_coordinates(points_coordinates)
+
+
+    def run_query_from_coordinates(self, points_coordinates: list) -> tuple:
+        region = self._registry.find_region(points_coordinates)
+        return region, self.call(region, "run_query_from_coordinates", list(points_coordinates))
+
+
+    # wywołanie metody App w procesie roboczym regionu (region jest wczytywany, jeśli jeszcze nie był)
+    def call(self, region: str, method: str, *args):
+        if method not in SHARD_METHODS:
+            raise ValueError(f"Metody {method} nie można wywołać w procesie roboczym regionu.")
+        # jeśli region nie daje się wczytać, kolejne zapytanie ponowi próbę; jeśli proces roboczy przestał odpowiadać,
+        # region zastępuje tylko ten proces (region nie jest usuwany - pozostałe procesy mogą obsługiwać inne zapytania)
+        shard = self._acquire(region)
+        try:
+            shard.load()
+            status, result = shard.request(method, args)
+        finally:
+            self._release(shard)
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+
+    # wczytane regiony wraz z pamięcią ich procesów roboczych [MB], od najdawniej używanego
+    def resident_shards(self) -> dict:
+        with self._lock:
+            return {name: shard.memory_mb() for name, shard in self._shards.items()}
+
+
+    # zamknięcie procesów roboczych regionu (np. przy braku pamięci); kolejne zapytanie wczyta region ponownie
+    def evict(self, region: str):
+        with self._lock:
+            shard = self._shards.pop(region, None)
+        if shard is not None:
+            self._stop(shard)
+
+
+    def close(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            self._shards.clear()
+        for shard in shards:
+            shard.stop()
+
+
+    def __enter__(self) -> "ShardRouter":
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    # pobranie regionu do obsługi zapytania (oznaczenie jako ostatnio używany i zajęty)
+    # przed utworzeniem nowego regionu zwalniane jest miejsce - na podstawie limitu regionów
+    # oraz pamięci zajmowanej przez region przy poprzednim wczytaniu (jeśli jest znana)
+    def _acquire(self, region: str) -> _Shard:
+        if region not in self._registry.names():
+            raise ValueError(f"Nieznany region: {region}")
+        with self._lock:
+            shard = self._shards.get(region)
+            if shard is None:
+                evicted = self._select_for_eviction(self._last_memory_mb.get(region, 0.0), 1, region)
+                shard = _Shard(self._context, region, self._registry.get_app_parameters(region), self._workers_per_shard)
+                self._shards[region] = shard
+            else:
+                evicted = []
+            self._shards.move_to_end(region)
+            shard.active_requests += 1
+        for evicted_shard in evicted:
+            self._stop(evicted_shard)
+        return shard
+
+
+    # zwolnienie regionu po zapytaniu i usunięcie innych nieużywanych regionów, jeśli przekroczono budżet pamięci
+    # (ostatnio używany region pozostaje wczytany, nawet jeśli sam przekracza budżet)
+    def _release(self, shard: _Shard):
+        with self._lock:
+            shard.active_requests -= 1
+            evicted = self._select_for_eviction(0.0, 0, shard.name)
+        for evicted_shard in evicted:
+            self._stop(evicted_shard)
+
+
+    # wybór najdawniej używanych, niezajętych regionów (poza keep_region) do usunięcia, tak aby zmieścić dodatkowe regiony i pamięć
+    # (wywoływane z założoną blokadą; regiony są od razu usuwane ze słownika, a ich procesy zamykane później)
+    def _select_for_eviction(self, additional_memory_mb: float, additional_shards: int, keep_region: str) -> list:
+        evicted = []
+        memory_mb = sum(shard.memory_mb() for shard in self._shards.values()) + additional_memory_mb
+        for name, shard in list(self._shards.items()):
+            over_memory = self._memory_budget_mb is not None and memory_mb > self._memory_budget_mb
+            over_count = (self._max_resident_shards is not None
+                          and len(self._shards) + additional_shards > self._max_resident_shards)
+            if not over_memory and not over_count:
+                break
+            if shard.active_requests > 0 or name == keep_region:
+                continue
+            memory_mb -= shard.memory_mb()
+            evicted.append(self._shards.pop(name))
+        return evicted
+
+
+    def _stop(self, shard: _Shard):
+        memory_mb = shard.memory_mb()
+        if memory_mb > 0:
+            self._last_memory_mb[shard.name] = memory_mb
+        shard.stop()
+        print(f"Usunięto region {shard.name} ({memory_mb:.1f} MB)")
+
+
+# obsługa zapytań dla wielu regionów z ograniczonym budżetem pamięci
+# python -m src.shard_router regions.json queries.json [budżet_pamięci_MB] [maks_regionów] (0 - bez limitu)
+# queries.json: [[[52.23, 21.01], [52.25, 21.03]], ...] - lista zapytań, każde to lista punktów (szerokość geo., długość geo.)
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Użycie: python -m src.shard_router <regions.json> <queries.json> [budżet_pamięci_MB] [maks_regionów]")
+        sys.exit(1)
+
+    with open(sys.argv[2]) as f:
+        queries = json.load(f)
+    memory_budget_mb = float(sys.argv[3]) if len(sys.argv) > 3 and float(sys.argv[3]) > 0 else None
+    max_resident_shards = int(sys.argv[4]) if len(sys.argv) > 4 and int(sys.argv[4]) > 0 else None
+
+    with ShardRouter(RegionRegistry.load(sys.argv[1]), memory_budget_mb=memory_budget_mb,
+                     max_resident_shards=max_resident_shards) as router:
+        for query in queries:
+            start = time.perf_counter()
+            try:
+                region, path = router.run_query_from_coordinates([tuple(point) for point in query])
+                print(f"{region}: ścieżka z {len(path)} węzłów w {(time.perf_counter() - start) * 1000:.1f} ms")
+            except RuntimeError as e:
+                print(f"Błąd: {e}")
+        print(f"Wczytane regiony: {router.resident_shards()}")
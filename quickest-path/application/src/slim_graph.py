@@ -0,0 +1,321 @@
+import os
+import sys
+import pickle
+import numpy as np
+import networkx as nx
+import multiprocessing as mp
+from src.array_graph import ArrayGraph
+from src.graph_utils import encode_highway, haversine_distance, get_resident_memory_mb
+from src.turn_restrictions import TURN_RESTRICTIONS_KEY
+
+
+# nazwa pliku z atrybutami służącymi wyłącznie do wyświetlania (nazwy ulic, geometria krawędzi itp.)
+DISPLAY_STORE_FILENAME = "display.pkl"
+
+# atrybuty krawędzi potrzebne do wyszukiwania tras - tylko one trafiają do tablic grafu
+ROUTING_EDGE_ATTRIBUTES = {"u", "v", "length", "estimated_time", "highway", "maxspeed"}
+
+# atrybuty świadczące o tym, że graf został uproszczony (GraphSimplifier) - takiego grafu nie można odchudzić
+SIMPLIFIED_EDGE_ATTRIBUTES = {"inner_left_turns", "inner_x", "inner_y", "nodes"}
+
+
+# magazyn atrybutów krawędzi służących wyłącznie do wyświetlania
+# dane zapisane są w osobnym pliku i wczytywane dopiero przy pierwszym odwołaniu
+class DisplayAttributeStore:
+
+    def __init__(self, filepath: str):
+        self._filepath = filepath
+        self._attributes = None
+
+
+    # zapis atrybutów wyświetlania wszystkich krawędzi grafu networkx (słownik (u, v, klucz) -> atrybuty)
+    @staticmethod
+    def write(G: nx.MultiDiGraph, filepath: str):
+        attributes = {(u, v, k): {name: value for name, value in data.items() if name not in ROUTING_EDGE_ATTRIBUTES}
+                      for u, v, k, data in G.edges(keys=True, data=True)}
+        with open(filepath, "wb") as f:
+            pickle.dump(attributes, f, pickle.HIGHEST_PROTOCOL)
+
+
+    def is_loaded(self) -> bool:
+        return self._attributes is not None
+
+
+    def get(self, u: int, v: int, key: int = 0) -> dict:
+        if self._attributes is None:
+            with open(self._filepath, "rb") as f:
+                self._attributes = pickle.load(f)
+        return self._attributes.get((u, v, key), {})
+
+
+# widok węzłów grafu działający jak G.nodes w networkx (G.nodes[n]["x"], G.nodes(data=True), iteracja po id)
+class _NodeView:
+
+    def __init__(self, graph: "SlimGraph"):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if not data:
+            return iter(self)
+        return ((node_id, {"x": x, "y": y}) for node_id, x, y
+                in zip(self._graph.node_ids.tolist(), self._graph.x.tolist(), self._graph.y.tolist()))
+
+    def __getitem__(self, node_id: int) -> dict:
+        idx = self._graph.node_index(node_id)
+        return {"x": float(self._graph.x[idx]), "y": float(self._graph.y[idx])}
+
+    def __iter__(self):
+        return iter(self._graph.node_ids.tolist())
+
+    def __len__(self) -> int:
+        return self._graph.number_of_nodes()
+
+    def __contains__(self, node_id: int) -> bool:
+        return self._graph.has_node(node_id)
+
+
+# widok krawędzi grafu działający jak G.edges w networkx (G.edges(nbunch), G.edges[(u, v, klucz)])
+class _EdgeView:
+
+    def __init__(self, graph: "SlimGraph"):
+        self._graph = graph
+
+    def __call__(self, nbunch=None):
+        nodes = self._graph if nbunch is None else nbunch
+        return [edge for node in nodes for edge in self._graph.out_edges(node)]
+
+    def __getitem__(self, edge: tuple) -> dict:
+        u, v, key = edge
+        data = self._graph.get_edge_data(u, v, key)
+        if data is None:
+            raise KeyError(edge)
+        return data
+
+    def __iter__(self):
+        return iter(self())
+
+    def __len__(self) -> int:
+        return self._graph.number_of_edges()
+
+
+# odchudzony graf do wyszukiwania tras
+# przechowuje wyłącznie atrybuty wykorzystywane przez algorytmy (czas przejazdu, długość, kategoria drogi, limit prędkości),
+# w postaci tablic liczbowych oraz kodów kategorii drogi (uint8) zamiast słownika atrybutów dla każdej krawędzi
+# współrzędne mają pełną precyzję (float64), a czasy przejazdu precyzję, z jaką zostały zapisane (float64 przy odchudzaniu
+# grafu networkx) - rozpoznawanie skrętów w lewo i porównywanie kosztów w A* są na nie wrażliwe,
+# więc tylko wtedy ścieżki są takie same jak w grafie networkx
+# udostępnia podzbiór interfejsu grafu networkx (nodes, edges, get_edge_data, successors, predecessors, ...),
+# z którego korzystają algorytmy wyszukiwania tras, dzięki czemu może być używany zamiast nx.MultiDiGraph
+# graf jest tylko do odczytu - nie można go uprościć (GraphSimplifier) ani modyfikować
+# atrybuty służące wyłącznie do wyświetlania przechowywane są osobno (DisplayAttributeStore)
+class SlimGraph(ArrayGraph):
+
+    def __init__(self, node_ids: np.ndarray, x: np.ndarray, y: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 length: np.ndarray, estimated_time: np.ndarray, highway: np.ndarray, maxspeed: np.ndarray,
+                 display_store: DisplayAttributeStore = None):
+        super().__init__(node_ids, x.astype(np.float64, copy=False), y.astype(np.float64, copy=False), indptr,
+                         indices.astype(np.int32, copy=False), length.astype(np.float32, copy=False),
+                         np.asarray(estimated_time), highway.astype(np.uint8, copy=False),
+                         maxspeed.astype(np.uint16, copy=False))
+        self.graph = {}
+        self.display_store = display_store
+        self.nodes = _NodeView(self)
+        self.edges = _EdgeView(self)
+
+        # odwrotny CSR (krawędzie wchodzące), potrzebny do wyznaczania poprzedników
+        # rindices - indeks węzła początkowego krawędzi, redges - indeks krawędzi w tablicach krawędzi wychodzących
+        sources = np.repeat(np.arange(len(node_ids), dtype=np.int32), np.diff(indptr))
+        self.redges = np.argsort(self.indices, kind="stable").astype(np.int32)
+        self.rindices = sources[self.redges]
+        self.rindptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(node_ids)), out=self.rindptr[1:])
+
+
+    # konwersja grafu networkx (np. zbudowanego przez GraphProvider.build_graph) do odchudzonego grafu
+    # jeśli podano display_store_path, pozostałe atrybuty krawędzi zapisywane są w osobnym pliku
+    @classmethod
+    def from_networkx(cls, G: nx.MultiDiGraph, display_store_path: str = "") -> "SlimGraph":
+        u, v, length, estimated_time, highway, maxspeed = [], [], [], [], [], []
+        for edge_u, edge_v, data in G.edges(data=True):
+            if not SIMPLIFIED_EDGE_ATTRIBUTES.isdisjoint(data):
+                raise ValueError("Nie można odchudzić uproszczonego grafu - odchudzony graf nie obsługuje upraszczania (GraphSimplifier).")
+            u.append(edge_u)
+            v.append(edge_v)
+            length.append(data["length"])
+            estimated_time.append(data["estimated_time"])
+            highway.append(encode_highway(data["highway"]))
+            maxspeed.append(data["maxspeed"])
+
+        node_ids = np.array(sorted(G.nodes), dtype=np.int64)
+        x = np.array([G.nodes[node]["x"] for node in node_ids.tolist()], dtype=np.float64)
+        y = np.array([G.nodes[node]["y"] for node in node_ids.tolist()], dtype=np.float64)
+        graph = ArrayGraph.from_edge_arrays(node_ids, x, y, np.array(u, dtype=np.int64), np.array(v, dtype=np.int64),
+                                            np.array(length, dtype=np.float32), np.array(estimated_time, dtype=np.float64),
+                                            np.array(highway, dtype=np.uint8), np.array(maxspeed, dtype=np.uint16))
+
+        display_store = None
+        if display_store_path:
+            DisplayAttributeStore.write(G, display_store_path)
+            display_store = DisplayAttributeStore(display_store_path)
+        slim_graph = cls.from_array_graph(graph, display_store)
+        if TURN_RESTRICTIONS_KEY in G.graph:
+            slim_graph.graph[TURN_RESTRICTIONS_KEY] = G.graph[TURN_RESTRICTIONS_KEY]
+        return slim_graph
+
+
+    @classmethod
+    def from_array_graph(cls, graph: ArrayGraph, display_store: DisplayAttributeStore = None) -> "SlimGraph":
+        return cls(**{name: getattr(graph, name) for name in cls.NODE_ARRAYS + cls.EDGE_ARRAYS}, display_store=display_store)
+
+
+    # zapis grafu wraz z atrybutami wyświetlania (jeśli zostały wcześniej zapisane w innym miejscu, są kopiowane)
+    def save(self, directory: str):
+        super().save(directory)
+        target = os.path.join(directory, DISPLAY_STORE_FILENAME)
+        if self.display_store is not None and os.path.abspath(self.display_store._filepath) != os.path.abspath(target):
+            with open(self.display_store._filepath, "rb") as source, open(target, "wb") as f:
+                f.write(source.read())
+
+
+    # wczytanie grafu z katalogu (również grafu zapisanego przez StreamingGraphIngestor)
+    # atrybuty wyświetlania, jeśli są dostępne, zostaną wczytane dopiero przy pierwszym odwołaniu
+    @classmethod
+    def load(cls, directory: str, mmap: bool = False) -> "SlimGraph":
+        display_store_path = os.path.join(directory, DISPLAY_STORE_FILENAME)
+        display_store = DisplayAttributeStore(display_store_path) if os.path.exists(display_store_path) else None
+        return cls.from_array_graph(ArrayGraph.load(directory, mmap), display_store)
+
+
+    # nowy graf bez podanych węzłów (i krawędzi z nimi incydentnych)
+    def without_nodes(self, nodes: list) -> "SlimGraph":
+        keep = np.ones(self.number_of_nodes(), dtype=bool)
+        keep[np.searchsorted(self.node_ids, np.asarray(list(nodes), dtype=np.int64))] = False
+        sources = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))
+        keep_edges = keep[sources] & keep[self.indices]
+        graph = ArrayGraph.from_edge_arrays(self.node_ids[keep], self.x[keep], self.y[keep],
+                                            self.node_ids[sources[keep_edges]], self.node_ids[self.indices[keep_edges]],
+                                            self.length[keep_edges], self.estimated_time[keep_edges],
+                                            self.highway[keep_edges], self.maxspeed[keep_edges])
+        slim_graph = SlimGraph.from_array_graph(graph, self.display_store)
+        if TURN_RESTRICTIONS_KEY in self.graph:
+            slim_graph.graph[TURN_RESTRICTIONS_KEY] = self.graph[TURN_RESTRICTIONS_KEY]
+        return slim_graph
+
+
+    # najbliższy węzeł grafu dla zadanych współrzędnych
+    def nearest_node(self, lon: float, lat: float) -> int:
+        return int(self.node_ids[np.argmin(haversine_distance(lon, lat, self.x, self.y))])
+
+
+    # atrybuty wyświetlania krawędzi (pusty słownik, jeśli graf nie ma magazynu atrybutów wyświetlania)
+    def display_attributes(self, u: int, v: int, key: int = 0) -> dict:
+        if self.display_store is None:
+            return {}
+        return self.display_store.get(u, v, key)
+
+
+    # podzbiór interfejsu grafu networkx
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_multigraph(self) -> bool:
+        return True
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return self.number_of_nodes()
+
+    def __contains__(self, node_id: int) -> bool:
+        return self.has_node(node_id)
+
+    def has_node(self, node_id: int) -> bool:
+        idx = int(self.node_ids.searchsorted(node_id))
+        return idx < len(self.node_ids) and self.node_ids[idx] == node_id
+
+    def has_edge(self, u: int, v: int, key: int = None) -> bool:
+        return self.get_edge_data(u, v, 0 if key is None else key) is not None
+
+    def out_edges(self, node_id: int) -> list:
+        idx = self.node_index(node_id)
+        return [(node_id, v) for v in self.node_ids[self.indices[self.indptr[idx]:self.indptr[idx + 1]]].tolist()]
+
+    def in_edges(self, node_id: int) -> list:
+        idx = self.node_index(node_id)
+        return [(u, node_id) for u in self.node_ids[self.rindices[self.rindptr[idx]:self.rindptr[idx + 1]]].tolist()]
+
+    def successors(self, node_id: int):
+        return iter(dict.fromkeys(v for _, v in self.out_edges(node_id)))
+
+    def predecessors(self, node_id: int):
+        return iter(dict.fromkeys(u for u, _ in self.in_edges(node_id)))
+
+    def neighbors(self, node_id: int):
+        return self.successors(node_id)
+
+
+    # atrybuty krawędzi (u, v) o podanym kluczu w takiej postaci, jaką mają krawędzie grafu networkx
+    # (kategoria drogi zapisana jest jako kod - compare_highways przyjmuje oba warianty)
+    # bez podania klucza zwraca słownik klucz -> atrybuty dla wszystkich krawędzi (u, v)
+    def get_edge_data(self, u: int, v: int, key: int = None, default=None):
+        try:
+            u_idx = self.node_index(u)
+            v_idx = self.node_index(v)
+        except KeyError:
+            return default
+        start, end = self.indptr[u_idx], self.indptr[u_idx + 1]
+        # krawędzie wychodzące z węzła są posortowane po węźle końcowym
+        first, last = start + self.indices[start:end].searchsorted([v_idx, v_idx + 1])
+        if first == last:
+            return default
+        if key is None:
+            return {k: self._edge_attributes(u, v, e) for k, e in enumerate(range(first, last))}
+        if key >= last - first:
+            return default
+        return self._edge_attributes(u, v, first + key)
+
+
+    def _edge_attributes(self, u: int, v: int, e: int) -> dict:
+        return {"u": u, "v": v, "length": float(self.length[e]), "estimated_time": float(self.estimated_time[e]),
+                "highway": int(self.highway[e]), "maxspeed": int(self.maxspeed[e])}
+
+
+def _measure_memory(graph_path: str, slim: bool, queue):
+    before = get_resident_memory_mb()
+    if slim:
+        G = SlimGraph.load(graph_path)
+    else:
+        with open(graph_path, "rb") as f:
+            G = pickle.load(f)
+    queue.put((get_resident_memory_mb() - before, G.number_of_nodes(), G.number_of_edges()))
+
+
+# odchudzenie grafu zapisanego w pliku pickle i porównanie pamięci zajmowanej przez oba warianty
+# każdy wariant wczytywany jest w osobnym, nowym procesie, aby pomiary nie wpływały na siebie
+# python -m src.slim_graph graph.gpickle katalog_wyjściowy
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Użycie: python -m src.slim_graph <graf.gpickle> <katalog_wyjściowy>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "rb") as f:
+        full_graph = pickle.load(f)
+    os.makedirs(sys.argv[2], exist_ok=True)
+    slim_graph = SlimGraph.from_networkx(full_graph, os.path.join(sys.argv[2], DISPLAY_STORE_FILENAME))
+    slim_graph.save(sys.argv[2])
+    del full_graph, slim_graph
+
+    context = mp.get_context("spawn")
+    results = {}
+    for name, path, slim in (("networkx", sys.argv[1], False), ("slim", sys.argv[2], True)):
+        queue = context.Queue()
+        process = context.Process(target=_measure_memory, args=(path, slim, queue))
+        process.start()
+        results[name] = queue.get()
+        process.join()
+
+    for name, (memory, nodes, edges) in results.items():
+        print(f"{name}: {nodes} węzłów, {edges} krawędzi, pamięć (RSS) po wczytaniu: {memory:.1f} MB")
+    print(f"Zmniejszenie zużycia pamięci: {results['networkx'][0] / max(results['slim'][0], 1e-3):.1f}x")
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+from src.array_graph import ArrayGraph
+from src.turn_restrictions import RestrictionParser, TURN_RESTRICTIONS_FILENAME
+from src.graph_utils import fill_max_speed, is_way_allowed, encode_highway, get_resident_memory_mb, haversine_distance
+
+try:
+    import osmium
+except ImportError:
+    osmium = None
+
+
+# tagi drogi potrzebne do filtrowania i wyznaczania parametrów krawędzi
+WAY_TAGS = ["highway", "access", "area", "bicycle", "foot", "motorcar", "motor_vehicle", "service",
+            "surface", "tracktype", "maxspeed", "oneway", "junction"]
+
+# przybliżony koszt pamięci jednego buforowanego odcinka drogi w listach pythonowych [B]
+BYTES_PER_BUFFERED_SEGMENT = 400
+
+
+# klasa handlera wywoływanego przez pyosmium dla każdej drogi w pliku .osm.pbf
+# drogi przechodzące filtry są dzielone na odcinki między kolejnymi węzłami
+# odcinki buforowane są w pamięci i po przekroczeniu limitu zrzucane na dysk jako osobne porcje (chunki)
+class _WayHandler(osmium.SimpleHandler if osmium is not None else object):
+
+    def __init__(self, ingestor: "StreamingGraphIngestor"):
+        super().__init__()
+        self._ingestor = ingestor
+
+    def way(self, w):
+        tags = {key: w.tags.get(key) for key in WAY_TAGS}
+        self._ingestor._process_way(tags, [(n.ref, n.lon, n.lat) for n in w.nodes if n.location.valid()])
+
+
+# klasa ma na celu zbudowanie grafu sieci drogowej dla regionów większych niż miasto
+# w przeciwieństwie do GraphProvider.build_graph nie wczytuje całej sieci do GeoDataFrame'ów
+# plik .osm.pbf czytany jest strumieniowo (pyosmium), a lokalizacje węzłów przechowywane są w indeksie na dysku
+# wynikiem jest graf w postaci tablic (ArrayGraph) zapisany bezpośrednio do katalogu wyjściowego
+class StreamingGraphIngestor:
+
+    # parametry:
+    # max_memory_mb - limit pamięci procesu; po jego przekroczeniu bufor odcinków jest zrzucany na dysk
+    # progress_every - co ile przetworzonych dróg wypisywana jest informacja o postępie
+    # chunk_segments - maksymalna liczba odcinków w buforze; domyślnie wyznaczana na podstawie limitu pamięci
+
+    def __init__(self, max_memory_mb: int = 2048, progress_every: int = 100000, chunk_segments: int = None):
+        if osmium is None:
+            raise RuntimeError("Strumieniowe wczytywanie grafu wymaga biblioteki pyosmium (pip install osmium).")
+        self._max_memory_mb = max_memory_mb
+        self._progress_every = progress_every
+        # na bufor przeznaczamy jedną czwartą limitu - reszta to indeks lokalizacji i scalanie porcji
+        self._chunk_segments = chunk_segments or max(10000, max_memory_mb * 1024 * 1024 // 4 // BYTES_PER_BUFFERED_SEGMENT)
+
+        self._chunk_dir = None
+        self._chunks = []
+        self._ways_seen = 0
+        self._ways_kept = 0
+        self._segments_total = 0
+        self._start_time = 0.0
+        self._reset_buffer()
+
+
+    # główna metoda udostępniana na zewnątrz
+    # wczytuje plik .osm.pbf, buduje graf i zapisuje go do output_dir
+    def ingest(self, pbf_filepath: str, output_dir: str) -> ArrayGraph:
+        self._start_time = time.time()
+        os.makedirs(output_dir, exist_ok=True)
+        self._chunk_dir = tempfile.mkdtemp(prefix="chunks_", dir=output_dir)
+        try:
+            # indeks lokalizacji węzłów trzymany jest w pliku, więc nie zajmuje pamięci procesu
+            handler = _WayHandler(self)
+            handler.apply_file(pbf_filepath, locations=True, idx=f"sparse_file_array,{os.path.join(self._chunk_dir, 'locations.idx')}")
+            self._flush()
+            self._report("wczytano drogi")
+
+            # scal porcje w jeden graf zapisany na dysku
+            G = self._merge_chunks(output_dir)
+            self._report(f"zapisano graf ({G.number_of_nodes()} węzłów, {G.number_of_edges()} krawędzi)")
+            return G
+        finally:
+            shutil.rmtree(self._chunk_dir, ignore_errors=True)
+            self._chunks = []
+
+
+    def _reset_buffer(self):
+        self._u = []
+        self._v = []
+        self._highway = []
+        self._maxspeed = []
+        self._node_ids = []
+        self._node_x = []
+        self._node_y = []
+
+
+    # przetworzenie pojedynczej drogi: filtrowanie, wyznaczenie kierunków ruchu i podział na odcinki
+    def _process_way(self, tags: dict, nodes: list):
+        self._ways_seen += 1
+        if self._ways_seen % self._progress_every == 0:
+            self._report("postęp")
+
+        if len(nodes) < 2 or not is_way_allowed(tags):
+            return
+        self._ways_kept += 1
+
+        # limit prędkości uzupełniamy tak samo jak przy budowie grafu przez pyrosm
+        highway = tags["highway"]
+        try:
+            maxspeed = fill_max_speed({"maxspeed": tags["maxspeed"], "highway": highway})
+        except ValueError:
+            # niestandardowe wartości (np. "50;70", "signals") traktujemy jak brak informacji
+            maxspeed = fill_max_speed({"maxspeed": None, "highway": highway})
+
+        # wyznacz kierunki ruchu na drodze
+        oneway = tags["oneway"]
+        forward = oneway != "-1"
+        backward = oneway not in ("yes", "true", "1", "-1") and tags["junction"] != "roundabout" and highway != "motorway"
+
+        highway_code = encode_highway(highway)
+        for (u, _, _), (v, _, _) in zip(nodes[:-1], nodes[1:]):
+            if forward:
+                self._add_segment(u, v, highway_code, maxspeed)
+            if backward:
+                self._add_segment(v, u, highway_code, maxspeed)
+        for node_id, lon, lat in nodes:
+            self._node_ids.append(node_id)
+            self._node_x.append(lon)
+            self._node_y.append(lat)
+
+        # zrzuć bufor na dysk, jeśli jest pełny lub proces przekroczył limit pamięci
+        if len(self._u) >= self._chunk_segments or (len(self._u) > 0 and self._ways_kept % 1000 == 0
+                                                     and get_resident_memory_mb() > self._max_memory_mb):
+            self._flush()
+
+
+    def _add_segment(self, u: int, v: int, highway_code: int, maxspeed: int):
+        self._u.append(u)
+        self._v.append(v)
+        self._highway.append(highway_code)
+        self._maxspeed.append(maxspeed)
+
+
+    # zapis zawartości bufora na dysk jako kolejna porcja
+    # duplikaty węzłów usuwane są już na tym etapie, aby zmniejszyć rozmiar porcji
+    def _flush(self):
+        if len(self._u) == 0:
+            return
+        node_ids, first = np.unique(np.array(self._node_ids, dtype=np.int64), return_index=True)
+        chunk_path = os.path.join(self._chunk_dir, f"chunk_{len(self._chunks)}.npz")
+        np.savez(chunk_path,
+                 u=np.array(self._u, dtype=np.int64),
+                 v=np.array(self._v, dtype=np.int64),
+                 highway=np.array(self._highway, dtype=np.uint8),
+                 maxspeed=np.array(self._maxspeed, dtype=np.uint16),
+                 node_ids=node_ids,
+                 node_x=np.array(self._node_x, dtype=np.float64)[first],
+                 node_y=np.array(self._node_y, dtype=np.float64)[first])
+        self._chunks.append(chunk_path)
+        self._segments_total += len(self._u)
+        self._reset_buffer()
+
+
+    # scalenie porcji zapisanych na dysku w jeden graf zapisany w output_dir
+    # porcje przetwarzane są pojedynczo, a tablice krawędzi zapisywane wprost do plików .npy mapowanych do pamięci,
+    # dzięki czemu w pamięci przechowywane są jedynie tablice węzłów oraz jedna porcja krawędzi naraz
+    def _merge_chunks(self, output_dir: str) -> ArrayGraph:
+
+        # scal tablice węzłów kolejnych porcji, pozbywając się duplikatów
+        node_ids = np.empty(0, dtype=np.int64)
+        node_x = np.empty(0, dtype=np.float64)
+        node_y = np.empty(0, dtype=np.float64)
+        for chunk_path in self._chunks:
+            with np.load(chunk_path) as chunk:
+                node_ids, first = np.unique(np.concatenate([node_ids, chunk["node_ids"]]), return_index=True)
+                node_x = np.concatenate([node_x, chunk["node_x"]])[first]
+                node_y = np.concatenate([node_y, chunk["node_y"]])[first]
+        for name, array in (("node_ids", node_ids), ("x", node_x), ("y", node_y)):
+            np.save(os.path.join(output_dir, f"{name}.npy"), array)
+
+        # pierwszy przebieg: liczba krawędzi wychodzących z każdego węzła wyznacza tablicę indptr
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        for chunk_path in self._chunks:
+            with np.load(chunk_path) as chunk:
+                indptr[1:] += np.bincount(np.searchsorted(node_ids, chunk["u"]), minlength=len(node_ids))
+        np.cumsum(indptr, out=indptr)
+        np.save(os.path.join(output_dir, "indptr.npy"), indptr)
+
+        # drugi przebieg: krawędzie każdej porcji trafiają na swoje miejsca w przedziałach węzłów początkowych
+        # wraz z wyznaczoną długością i estymowanym czasem przejazdu
+        # (limit prędkości 0, np. z błędnego tagu maxspeed=0, traktowany jest jak 1 km/h)
+        edges = {name: np.lib.format.open_memmap(os.path.join(output_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=(int(indptr[-1]),))
+                 for name, dtype in (("indices", np.int32), ("length", np.float32), ("estimated_time", np.float32),
+                                     ("highway", np.uint8), ("maxspeed", np.uint16))}
+        cursor = indptr[:-1].copy()
+        for chunk_path in self._chunks:
+            with np.load(chunk_path) as chunk:
+                u_idx = np.searchsorted(node_ids, chunk["u"])
+                v_idx = np.searchsorted(node_ids, chunk["v"])
+                order = np.argsort(u_idx, kind="stable")
+                sorted_u = u_idx[order]
+                positions = cursor[sorted_u] + np.arange(len(sorted_u)) - np.searchsorted(sorted_u, sorted_u)
+                cursor += np.bincount(u_idx, minlength=len(node_ids))
+
+                length = haversine_distance(node_x[u_idx], node_y[u_idx], node_x[v_idx], node_y[v_idx]).astype(np.float32)
+                maxspeed = chunk["maxspeed"]
+                edges["indices"][positions] = v_idx[order]
+                edges["length"][positions] = length[order]
+                edges["estimated_time"][positions] = (length / (np.maximum(maxspeed, 1) / 3.6)).astype(np.float32)[order]
+                edges["highway"][positions] = chunk["highway"][order]
+                edges["maxspeed"][positions] = maxspeed[order]
+
+        # trzeci przebieg: krawędzie wychodzące z węzła sortowane są po węźle końcowym, w blokach węzłów o ograniczonej liczbie krawędzi
+        start = 0
+        while start < len(node_ids):
+            end = max(start + 1, int(np.searchsorted(indptr, indptr[start] + self._chunk_segments, side="right")) - 1)
+            end = min(end, len(node_ids))
+            first, last = indptr[start], indptr[end]
+            sources = np.repeat(np.arange(start, end), np.diff(indptr[start:end + 1]))
+            order = np.lexsort((edges["indices"][first:last], sources))
+            for array in edges.values():
+                array[first:last] = array[first:last][order]
+            start = end
+
+        for array in edges.values():
+            array.flush()
+        del edges
+        G = ArrayGraph.load(output_dir, mmap=True)
+        G.save_meta(output_dir)
+        return G
+
+
+    # wypisanie informacji o postępie wczytywania
+    def _report(self, stage: str):
+        print(f"[{time.time() - self._start_time:8.1f} s] {stage}: drogi {self._ways_seen} (zachowane {self._ways_kept}), "
+              f"odcinki {self._segments_total + len(self._u)}, porcje {len(self._chunks)}, "
+              f"pamięć {get_resident_memory_mb():.0f}/{self._max_memory_mb} MB")
+
+
+# uruchomienie z linii poleceń, np. dla ekstraktu regionalnego:
+# python -m src.stream_ingestor mazowieckie-latest.osm.pbf graph_mazowieckie 4096
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Użycie: python -m src.stream_ingestor <plik.osm.pbf> <katalog_wyjściowy> [limit_pamięci_MB]")
+        sys.exit(1)
+    memory_limit = int(sys.argv[3]) if len(sys.argv) > 3 else 2048
+    StreamingGraphIngestor(max_memory_mb=memory_limit).ingest(sys.argv[1], sys.argv[2])
+
+    # zakazy skrętu zapisywane są obok grafu, tak jak w GraphProvider.build_graph_streaming
+    restriction_index = RestrictionParser().parse(sys.argv[1])
+    restriction_index.save(os.path.join(sys.argv[2], TURN_RESTRICTIONS_FILENAME))
+    print(f"Zapisano zakazy skrętu ({len(restriction_index)} reguł)")
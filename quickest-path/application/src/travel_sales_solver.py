@@ -18,8 +18,49 @@ class TravelSalesmanSolver:
         # zainicjalizuj pusty wynik
         result = []
         
+        # dla kolejnych odcinków trasy dodaj najlepszą ścieżkę do wyniku
+        for best_path, _ in self.solve_iter(G, nodes):
+            if len(result) == 0:
+                result.append(best_path)
+            else:
+                result.append(best_path[1:])
+        
+        # złącz wyniki
+        combined_result = []
+        for subresult in result:
+            combined_result.extend(subresult)
+        
+        # zwróć złączony wynik
+        return combined_result
+    
+    
+    # wariant metody solve zwracający kolejne odcinki trasy od razu po ich wyznaczeniu (generator)
+    # każdy odcinek to krotka (ścieżka między kolejnymi punktami, koszt ścieżki)
+    # pozwala to pokazywać użytkownikowi pierwsze odcinki, zanim zostaną wyznaczone kolejne
+    def solve_iter(self, G: nx.MultiDiGraph, nodes: list):
+        
+        # wyznacz kolejność odwiedzania węzłów
+        order = self.get_visit_order(G, nodes)
+        
+        # dla kolejnych par węzłów
+        for current_node, next_node in zip(order[:-1], order[1:]):
+            
+            # znajdź najlepszą ścieżkę między obecnym węzłem a najbliższym sąsiadem
+            best_path, cost, _ = self._best_path_finder.find_shortest_path_with_stats(G, current_node, next_node)
+            yield best_path, cost
+    
+    
+    # metoda wyznaczająca kolejność odwiedzania węzłów według heurystyki Nearest Neighbor
+    # z danego punktu przechodzimy do najbliższego (w linii prostej) nieodwiedzonego punktu
+    def get_visit_order(self, G: nx.MultiDiGraph, nodes: list) -> list:
+        
+        # bez punktów nie ma czego wyznaczać
+        if len(nodes) == 0:
+            raise RuntimeError("Nie podano żadnych punktów do odwiedzenia.")
+        
         # wybierz pierwszy węzeł jako punkt startowy
         current_node = nodes[0]
+        order = [current_node]
         
         # przechowuj informacje o już przetworzonych węzłach
         visited_nodes = {current_node}
@@ -34,25 +75,12 @@ class TravelSalesmanSolver:
             if nearest_neighbor == -1:
                 break
             
-            # znajdź najlepszą ścieżkę między obecnym węzłem a najbliższym sąsiadem
-            # dodaj ją do wyniku
-            best_path = self._best_path_finder.find_shortest_path(G, current_node, nearest_neighbor)
-            if current_node == nodes[0]:
-                result.append(best_path)
-            else:
-                result.append(best_path[1:])
-            
             # powtórz powyższe kroki dla sąsiada
+            order.append(nearest_neighbor)
             current_node = nearest_neighbor
             visited_nodes.add(nearest_neighbor)
         
-        # złącz wyniki
-        combined_result = []
-        for subresult in result:
-            combined_result.extend(subresult)
-        
-        # zwróć złączony wynik
-        return combined_result
+        return order
         
     
     def _get_nearest_unvisited_neighbor(self, G: nx.MultiDiGraph, current_node: int, all_nodes: list, visited_nodes: set) -> int:
@@ -109,7 +137,7 @@ class TravelSalesmanSolver:
             # znajduj najlepszą ścieżkę pomiędzy kolejnymi punktami
             for i in range(len(sequence) - 1):
                 
-                res = self._best_path_finder.find_shortest_path(G, sequence[i], sequence[i+1])
+                res = self._best_path_finder.find_shortest_path_with_stats(G, sequence[i], sequence[i+1])
                 partial_path = res[0]
                 partial_time = res[1]
                 
@@ -0,0 +1,182 @@
+import sys
+import numpy as np
+
+try:
+    import osmium
+except ImportError:
+    osmium = None
+
+
+# klucz, pod którym indeks zakazów skrętu przechowywany jest w G.graph
+TURN_RESTRICTIONS_KEY = "turn_restrictions"
+
+# nazwa pliku z indeksem zakazów skrętu zapisywanego obok grafu w postaci tablic
+TURN_RESTRICTIONS_FILENAME = "turn_restrictions.npz"
+
+# rodzaje zakazów (relacje type=restriction): zakazujące danego manewru oraz nakazujące jeden manewr (pozostałe są zakazane)
+PROHIBITIVE_RESTRICTIONS = {"no_left_turn", "no_right_turn", "no_straight_on", "no_u_turn"}
+MANDATORY_RESTRICTIONS = {"only_left_turn", "only_right_turn", "only_straight_on", "only_u_turn"}
+
+
+# indeks zakazów skrętu w postaci posortowanych tablic
+# każda reguła to krotka (węzeł poprzedni, węzeł przez który przejeżdżamy (via), węzeł następny, czy nakaz)
+# - tzn. dotyczy przejazdu krawędzią (from_node, via), a następnie krawędzią (via, to_node)
+# reguły posortowane są po (via, from_node, to_node), więc reguły dla danej krawędzi wjazdowej wyznaczamy wyszukiwaniem binarnym
+# węzły, przez które nie prowadzi żaden zakaz, rozpoznawane są w czasie O(1) (zbiór via_nodes)
+class TurnRestrictionIndex:
+
+    def __init__(self, via: np.ndarray, from_node: np.ndarray, to_node: np.ndarray, mandatory: np.ndarray):
+        order = np.lexsort((to_node, from_node, via))
+        self.via = via[order]
+        self.from_node = from_node[order]
+        self.to_node = to_node[order]
+        self.mandatory = mandatory[order]
+        self.via_nodes = frozenset(self.via.tolist())
+
+
+    @classmethod
+    def from_rules(cls, rules: list) -> "TurnRestrictionIndex":
+        from_node, via, to_node, mandatory = zip(*rules) if rules else ((), (), (), ())
+        return cls(np.array(via, dtype=np.int64), np.array(from_node, dtype=np.int64),
+                   np.array(to_node, dtype=np.int64), np.array(mandatory, dtype=bool))
+
+
+    def __len__(self) -> int:
+        return len(self.via)
+
+
+    # wszystkie węzły występujące w regułach (np. do zachowania przy upraszczaniu grafu)
+    def nodes(self) -> set:
+        return set(self.via.tolist()) | set(self.from_node.tolist()) | set(self.to_node.tolist())
+
+
+    # sprawdzenie, czy po przejeździe krawędzią (from_node, via) nie wolno wjechać na krawędź (via, to_node)
+    # manewr jest zakazany, jeśli istnieje dla niego zakaz lub jeśli dla krawędzi wjazdowej istnieje nakaz innego manewru
+    def is_forbidden(self, from_node: int, via: int, to_node: int) -> bool:
+        if via not in self.via_nodes:
+            return False
+        via_start, via_end = self.via.searchsorted([via, via + 1])
+        start, end = via_start + self.from_node[via_start:via_end].searchsorted([from_node, from_node + 1])
+        if start == end:
+            return False
+        to_nodes = self.to_node[start:end]
+        mandatory = self.mandatory[start:end]
+        if np.any(mandatory) and to_node not in to_nodes[mandatory]:
+            return True
+        return bool(np.any((to_nodes == to_node) & ~mandatory))
+
+
+    # sprawdzenie, czy ścieżka (lista węzłów) nie zawiera żadnego zakazanego manewru
+    def allows_path(self, path: list) -> bool:
+        return not any(self.is_forbidden(*turn) for turn in zip(path[:-2], path[1:-1], path[2:]))
+
+
+    def save(self, filepath: str):
+        np.savez(filepath, via=self.via, from_node=self.from_node, to_node=self.to_node, mandatory=self.mandatory)
+
+
+    @classmethod
+    def load(cls, filepath: str) -> "TurnRestrictionIndex":
+        with np.load(filepath) as data:
+            return cls(data["via"], data["from_node"], data["to_node"], data["mandatory"])
+
+
+# handler pierwszego przebiegu: relacje type=restriction z drogą wjazdową (from), węzłem via i drogą wyjazdową (to)
+# zakazy, w których via jest drogą, oraz zakazy nieobowiązujące samochodów (tag except) są pomijane
+class _RelationHandler(osmium.SimpleHandler if osmium is not None else object):
+
+    def __init__(self):
+        super().__init__()
+        self.restrictions = []
+
+    def relation(self, r):
+        if r.tags.get("type") != "restriction":
+            return
+        restriction = r.tags.get("restriction:motorcar") or r.tags.get("restriction")
+        if restriction not in PROHIBITIVE_RESTRICTIONS and restriction not in MANDATORY_RESTRICTIONS:
+            return
+        if "motorcar" in r.tags.get("except", "").split(";"):
+            return
+        members = {}
+        for member in r.members:
+            members.setdefault((member.role, member.type), []).append(member.ref)
+        from_ways, via_nodes, to_ways = members.get(("from", "w"), []), members.get(("via", "n"), []), members.get(("to", "w"), [])
+        if len(from_ways) == 1 and len(via_nodes) == 1 and len(to_ways) == 1:
+            self.restrictions.append((from_ways[0], via_nodes[0], to_ways[0], restriction in MANDATORY_RESTRICTIONS))
+
+
+# handler drugiego przebiegu: listy węzłów dróg występujących w zakazach
+class _WayNodesHandler(osmium.SimpleHandler if osmium is not None else object):
+
+    def __init__(self, way_ids: set):
+        super().__init__()
+        self._way_ids = way_ids
+        self.way_nodes = {}
+
+    def way(self, w):
+        if w.id in self._way_ids:
+            self.way_nodes[w.id] = [n.ref for n in w.nodes]
+
+
+# klasa ma na celu odczytanie zakazów skrętu (relacji restriction) z pliku .osm.pbf
+# plik czytany jest dwukrotnie: najpierw relacje, a następnie węzły dróg, do których relacje się odwołują
+# zakaz dotyczący dróg (from, to) zamieniany jest na reguły dla krawędzi grafu przylegających do węzła via
+class RestrictionParser:
+
+    def __init__(self):
+        if not self.is_available():
+            raise RuntimeError("Odczyt zakazów skrętu wymaga biblioteki pyosmium (pip install osmium).")
+
+
+    # czy odczyt zakazów jest możliwy (pyosmium jest opcjonalną zależnością)
+    @staticmethod
+    def is_available() -> bool:
+        return osmium is not None
+
+
+    # główna metoda udostępniana na zewnątrz
+    def parse(self, pbf_filepath: str) -> TurnRestrictionIndex:
+        relation_handler = _RelationHandler()
+        relation_handler.apply_file(pbf_filepath)
+
+        way_handler = _WayNodesHandler({way for from_way, _, to_way, _ in relation_handler.restrictions for way in (from_way, to_way)})
+        way_handler.apply_file(pbf_filepath)
+
+        rules = []
+        for from_way, via, to_way, mandatory in relation_handler.restrictions:
+            if from_way not in way_handler.way_nodes or to_way not in way_handler.way_nodes:
+                continue
+            from_nodes = self._neighbors_on_way(way_handler.way_nodes[from_way], via)
+            to_nodes = self._neighbors_on_way(way_handler.way_nodes[to_way], via)
+            for from_node in from_nodes:
+                for to_node in to_nodes:
+                    # dla zakazu w obrębie jednej drogi (np. no_u_turn) dotyczy on wyłącznie zawracania
+                    if from_way == to_way and from_node != to_node:
+                        continue
+                    rules.append((from_node, via, to_node, mandatory))
+
+        return TurnRestrictionIndex.from_rules(rules)
+
+
+    # węzły sąsiadujące z węzłem via na drodze (węzeł via może leżeć na końcu drogi lub w jej środku)
+    def _neighbors_on_way(self, way_nodes: list, via: int) -> list:
+        neighbors = []
+        for i, node in enumerate(way_nodes):
+            if node != via:
+                continue
+            if i > 0:
+                neighbors.append(way_nodes[i - 1])
+            if i < len(way_nodes) - 1:
+                neighbors.append(way_nodes[i + 1])
+        return neighbors
+
+
+# odczyt zakazów skrętu z pliku .osm.pbf i zapis indeksu
+# python -m src.turn_restrictions region.osm.pbf turn_restrictions.npz
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Użycie: python -m src.turn_restrictions <plik.osm.pbf> <indeks.npz>")
+        sys.exit(1)
+    index = RestrictionParser().parse(sys.argv[1])
+    index.save(sys.argv[2])
+    print(f"Zapisano {len(index)} reguł zakazów skrętu dla krawędzi grafu")
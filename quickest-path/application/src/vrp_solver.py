@@ -0,0 +1,323 @@
+import sys
+import time
+import pickle
+import random
+import numbers
+import multiprocessing as mp
+import numpy as np
+import networkx as nx
+from concurrent.futures import ProcessPoolExecutor
+from src.a_star import BestPathFinder
+
+
+# względna tolerancja przy porównywaniu kosztów rozwiązań (ruch musi poprawić rozwiązanie o więcej niż błąd zaokrągleń)
+COST_TOLERANCE = 1e-9
+
+# siła losowego zaburzenia oszczędności w kolejnych restartach (restart o ziarnie 0 jest deterministyczny)
+SAVINGS_NOISE = 0.3
+
+# liczba kolejnych restartów bez poprawy najlepszego rozwiązania, po której proces roboczy kończy przeszukiwanie
+MAX_RESTARTS_WITHOUT_IMPROVEMENT = 50
+
+# domyślna liczba procesów roboczych (więcej procesów to więcej restartów, ale i obciążenie wszystkich rdzeni serwera)
+DEFAULT_PROCESSES = 2
+
+
+# macierz czasów przejazdu [s] (wraz z karami za skręty) między każdą parą węzłów
+# dla każdego węzła wykonywane jest jedno przeszukiwanie Dijkstry do wszystkich pozostałych (zamiast A* dla każdej pary)
+# dla par, między którymi nie da się przejechać, w macierzy zapisywana jest nieskończoność
+def build_travel_time_matrix(G: nx.MultiDiGraph, best_path_finder: BestPathFinder, nodes: list) -> np.ndarray:
+    matrix = np.zeros((len(nodes), len(nodes)))
+    for i, source in enumerate(nodes):
+        others = [j for j in range(len(nodes)) if j != i]
+        matrix[i, others] = best_path_finder.find_travel_times(G, source, [nodes[j] for j in others])
+    return matrix
+
+
+# ocena trasy jednego pojazdu: (przekroczenie ograniczeń, czas przejazdu)
+# przekroczenie to liczba nadmiarowych przystanków plus nadmiarowy czas w godzinach (0 dla trasy dopuszczalnej)
+def _evaluate_route(matrix: np.ndarray, depot: int, route: list, max_stops: float, max_route_time: float,
+                    return_to_depot: bool) -> tuple:
+    if len(route) == 0:
+        return 0.0, 0.0
+    cost = matrix[depot, route[0]] + sum(matrix[u, v] for u, v in zip(route[:-1], route[1:]))
+    if return_to_depot:
+        cost += matrix[route[-1], depot]
+    violation = max(0, len(route) - max_stops) + max(0.0, cost - max_route_time) / 3600
+    return violation, cost
+
+
+# rozwiązanie początkowe algorytmem oszczędności (Clarke-Wright) dla macierzy niesymetrycznej
+# oszczędność połączenia trasy kończącej się w i z trasą zaczynającą się w j to koszt usuniętych przejazdów przez bazę
+# minus koszt przejazdu i -> j; trasy łączone są, dopóki mieszczą się w ograniczeniach najbardziej pojemnego pojazdu
+# jeśli tras jest więcej niż pojazdów, łączone są pary tras o najmniejszym dodatkowym koszcie (nawet kosztem ograniczeń)
+def _savings_routes(matrix: np.ndarray, depot: int, stops: list, number_of_vehicles: int, max_stops: list,
+                    max_route_time: list, return_to_depot: bool, rng: random.Random, noise: float) -> list:
+    savings = []
+    for i in stops:
+        for j in stops:
+            if i != j and np.isfinite(matrix[i, j]):
+                saving = matrix[depot, j] - matrix[i, j] + (matrix[i, depot] if return_to_depot else 0.0)
+                savings.append((saving * (1 + noise * rng.random()), i, j))
+    savings.sort(reverse=True)
+
+    route_of = {stop: [stop] for stop in stops}
+    largest_stops, largest_time = max(max_stops), max(max_route_time)
+    for _, i, j in savings:
+        route_i, route_j = route_of[i], route_of[j]
+        if route_i is route_j or route_i[-1] != i or route_j[0] != j:
+            continue
+        merged = route_i + route_j
+        violation, _ = _evaluate_route(matrix, depot, merged, largest_stops, largest_time, return_to_depot)
+        if violation > 0:
+            continue
+        for stop in merged:
+            route_of[stop] = merged
+
+    routes = list({id(route): route for route in route_of.values()}.values())
+    while len(routes) > number_of_vehicles:
+        _, a, b = min((matrix[routes[a][-1], routes[b][0]] - matrix[routes[a][-1], depot] * return_to_depot
+                       - matrix[depot, routes[b][0]], a, b)
+                      for a in range(len(routes)) for b in range(len(routes)) if a != b)
+        routes[a] = routes[a] + routes[b]
+        del routes[b]
+
+    # najdłuższe trasy otrzymują pojazdy o najluźniejszych ograniczeniach
+    routes.sort(key=lambda route: _evaluate_route(matrix, depot, route, np.inf, np.inf, return_to_depot)[1], reverse=True)
+    vehicles = sorted(range(number_of_vehicles), key=lambda vehicle: (max_route_time[vehicle], max_stops[vehicle]), reverse=True)
+    solution = [[] for _ in range(number_of_vehicles)]
+    for vehicle, route in zip(vehicles, routes):
+        solution[vehicle] = route
+    return solution
+
+
+# przeszukiwanie lokalne: przeniesienie przystanku (relocate) i zamiana dwóch przystanków (exchange),
+# w obrębie jednej trasy lub między trasami, oraz zamiana całych tras dwóch pojazdów o różnych ograniczeniach (swap);
+# ruchy przeglądane są w losowej kolejności,
+# a pierwszy poprawiający ruch jest od razu wykonywany (first improvement), do osiągnięcia minimum lokalnego lub terminu
+def _local_search(matrix: np.ndarray, depot: int, solution: list, max_stops: list, max_route_time: list,
+                  return_to_depot: bool, rng: random.Random, deadline: float) -> list:
+
+    def evaluate(vehicle: int, route: list) -> tuple:
+        return _evaluate_route(matrix, depot, route, max_stops[vehicle], max_route_time[vehicle], return_to_depot)
+
+    def is_better(old_scores: list, new_scores: list) -> bool:
+        old_violation, old_cost = map(sum, zip(*old_scores))
+        new_violation, new_cost = map(sum, zip(*new_scores))
+        if new_violation < old_violation - COST_TOLERANCE:
+            return True
+        return new_violation <= old_violation + COST_TOLERANCE and new_cost < old_cost * (1 - COST_TOLERANCE)
+
+    scores = [evaluate(vehicle, route) for vehicle, route in enumerate(solution)]
+    vehicles = list(range(len(solution)))
+    improved = True
+    while improved and time.time() < deadline:
+        improved = False
+        positions = [(a, i) for a in vehicles for i in range(len(solution[a]))]
+        rng.shuffle(positions)
+        for a, i in positions:
+            if i >= len(solution[a]):
+                continue
+            for b in rng.sample(vehicles, len(vehicles)):
+                for move in ("relocate", "exchange", "swap"):
+                    if move == "relocate":
+                        candidates = range(len(solution[b]) + (0 if a == b else 1))
+                    elif move == "swap":
+                        candidates = range(1 if a != b and i == 0 else 0)
+                    else:
+                        candidates = range(i + 1 if a == b else 0, len(solution[b]))
+                    for j in candidates:
+                        route_a, route_b = list(solution[a]), list(solution[b])
+                        if move == "relocate" and a == b:
+                            route_a.insert(j, route_a.pop(i))
+                            if route_a == solution[a]:
+                                continue
+                        elif move == "relocate":
+                            route_b.insert(j, route_a.pop(i))
+                        elif move == "swap":
+                            route_a, route_b = route_b, route_a
+                        elif a == b:
+                            route_a[i], route_a[j] = route_a[j], route_a[i]
+                        else:
+                            route_a[i], route_b[j] = route_b[j], route_a[i]
+
+                        if a == b:
+                            new_scores = [evaluate(a, route_a)]
+                            old_scores = [scores[a]]
+                        else:
+                            new_scores = [evaluate(a, route_a), evaluate(b, route_b)]
+                            old_scores = [scores[a], scores[b]]
+                        if not is_better(old_scores, new_scores):
+                            continue
+
+                        solution[a] = route_a
+                        scores[a] = new_scores[0]
+                        if a != b:
+                            solution[b] = route_b
+                            scores[b] = new_scores[1]
+                        improved = True
+                        break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return solution
+
+
+# ciąg restartów wykonywany w jednym procesie roboczym: rozwiązanie początkowe (oszczędności z losowym zaburzeniem)
+# i przeszukiwanie lokalne, powtarzane do upływu terminu lub do max_idle_restarts kolejnych restartów bez poprawy
+# (co najmniej jeden restart; dla jednego przystanku przeszukiwanie lokalne od razu daje optimum)
+# zwraca najlepsze znalezione rozwiązanie w postaci krotki (przekroczenie ograniczeń, koszt, trasy, liczba restartów)
+def _run_restarts(matrix: np.ndarray, depot: int, number_of_vehicles: int, max_stops: list, max_route_time: list,
+                  return_to_depot: bool, seed: int, deadline: float, max_idle_restarts: int) -> tuple:
+    rng = random.Random(seed)
+    stops = [stop for stop in range(len(matrix)) if stop != depot]
+    if len(stops) <= 1:
+        max_idle_restarts = 0
+    best = (np.inf, np.inf, None)
+    restarts, idle_restarts = 0, 0
+    while restarts == 0 or (time.time() < deadline and idle_restarts < max_idle_restarts):
+        noise = 0.0 if seed == 0 and restarts == 0 else SAVINGS_NOISE
+        solution = _savings_routes(matrix, depot, stops, number_of_vehicles, max_stops, max_route_time, return_to_depot, rng, noise)
+        solution = _local_search(matrix, depot, solution, max_stops, max_route_time, return_to_depot, rng, deadline)
+        violation, cost = map(sum, zip(*(_evaluate_route(matrix, depot, route, max_stops[vehicle], max_route_time[vehicle], return_to_depot)
+                                          for vehicle, route in enumerate(solution))))
+        if (violation, cost) < best[:2]:
+            best = (violation, cost, solution)
+            idle_restarts = 0
+        else:
+            idle_restarts += 1
+        restarts += 1
+    return best + (restarts,)
+
+
+# klasa ma na celu podział przystanków między kilka pojazdów wyjeżdżających z jednej bazy (problem VRP)
+# działa na macierzy czasów przejazdu między przystankami (wyznaczanej raz, algorytmem A*)
+# rozwiązanie początkowe budowane jest algorytmem oszczędności (Clarke-Wright), a następnie poprawiane
+# przeszukiwaniem lokalnym (przenoszenie i zamiana przystanków oraz zamiana tras między pojazdami); restarty z losowym zaburzeniem oszczędności
+# wykonywane są równolegle w puli procesów do upływu zadanego czasu lub do ustania poprawy, a wynikiem jest najlepsze rozwiązanie
+class VehicleRoutingSolver:
+
+    # parametry:
+    # best_path_finder - obiekt wyznaczający najszybsze ścieżki (macierz czasów przejazdu i trasy pojazdów)
+    # number_of_vehicles - liczba pojazdów
+    # max_stops - maksymalna liczba przystanków (bez bazy) na pojazd: jedna wartość lub lista dla kolejnych pojazdów (None - bez limitu)
+    # max_route_time - maksymalny czas trasy pojazdu [s]: jedna wartość lub lista dla kolejnych pojazdów (None - bez limitu)
+    # return_to_depot - czy pojazdy wracają do bazy (czas powrotu wliczany jest do czasu trasy)
+    # time_budget - maksymalny czas przeszukiwania [s] (bez wyznaczania macierzy czasów przejazdu)
+    # max_idle_restarts - liczba kolejnych restartów bez poprawy, po której proces roboczy kończy przeszukiwanie przed czasem
+    # processes - liczba procesów roboczych (domyślnie DEFAULT_PROCESSES, nie więcej niż liczba rdzeni;
+    #             1 - przeszukiwanie w bieżącym procesie)
+    # seed - ziarno generatora liczb losowych (proces roboczy k korzysta z ziarna seed + k)
+
+    def __init__(self, best_path_finder: BestPathFinder, number_of_vehicles: int, max_stops=None, max_route_time=None,
+                 return_to_depot: bool = True, time_budget: float = 5.0,
+                 max_idle_restarts: int = MAX_RESTARTS_WITHOUT_IMPROVEMENT, processes: int = None, seed: int = 0):
+        if number_of_vehicles < 1:
+            raise ValueError("Liczba pojazdów musi być dodatnia.")
+        self._best_path_finder = best_path_finder
+        self._number_of_vehicles = number_of_vehicles
+        self._max_stops = self._per_vehicle(max_stops, "max_stops")
+        self._max_route_time = self._per_vehicle(max_route_time, "max_route_time")
+        self._return_to_depot = return_to_depot
+        self._time_budget = time_budget
+        self._max_idle_restarts = max_idle_restarts
+        self._processes = processes or min(DEFAULT_PROCESSES, mp.cpu_count())
+        self._seed = seed
+
+
+    # główna metoda udostępniana na zewnątrz
+    # pierwszy węzeł w liście jest bazą, pozostałe to przystanki
+    # zwraca listę tras kolejnych pojazdów w postaci krotek (kolejność przystanków (z bazą), ścieżka, koszt);
+    # pojazd bez przystanków otrzymuje pustą trasę
+    def solve(self, G: nx.MultiDiGraph, nodes: list) -> list:
+        matrix = build_travel_time_matrix(G, self._best_path_finder, nodes)
+        unreachable = [nodes[stop] for stop in range(1, len(nodes))
+                       if not np.isfinite(matrix[0, stop]) or (self._return_to_depot and not np.isfinite(matrix[stop, 0]))]
+        if unreachable:
+            raise RuntimeError(f"Nie da się dojechać z bazy do przystanków (lub wrócić z nich do bazy): {unreachable}")
+
+        routes, _ = self.solve_matrix(matrix)
+
+        result = []
+        for route in routes:
+            if len(route) == 0:
+                result.append(([], [], 0.0))
+                continue
+            order = [nodes[0]] + [nodes[stop] for stop in route] + ([nodes[0]] if self._return_to_depot else [])
+            path, cost = [order[0]], 0.0
+            for source, dest in zip(order[:-1], order[1:]):
+                leg_path, leg_cost, _ = self._best_path_finder.find_shortest_path_with_stats(G, source, dest)
+                path.extend(leg_path[1:])
+                cost += leg_cost
+            result.append((order, path, cost))
+        return result
+
+
+    # rozwiązanie problemu dla gotowej macierzy czasów przejazdu (baza w wierszu depot)
+    # zwraca krotkę (trasy kolejnych pojazdów jako listy indeksów przystanków w macierzy, łączny czas przejazdu)
+    def solve_matrix(self, matrix: np.ndarray, depot: int = 0) -> tuple:
+        number_of_stops = len(matrix) - 1
+        if number_of_stops == 0:
+            return [[] for _ in range(self._number_of_vehicles)], 0.0
+
+        # przy małej liczbie przystanków (nie większej niż liczba pojazdów) przeszukiwanie kończy się po kilku
+        # restartach, więc uruchamianie puli procesów kosztowałoby więcej niż samo przeszukiwanie
+        processes = 1 if number_of_stops <= self._number_of_vehicles else self._processes
+        deadline = time.time() + self._time_budget
+        tasks = [(matrix, depot, self._number_of_vehicles, self._max_stops, self._max_route_time, self._return_to_depot,
+                  self._seed + worker, deadline, self._max_idle_restarts) for worker in range(processes)]
+
+        if processes == 1:
+            results = [_run_restarts(*tasks[0])]
+        else:
+            with ProcessPoolExecutor(processes) as executor:
+                results = list(executor.map(_run_restarts, *zip(*tasks)))
+
+        violation, cost, routes, _ = min(results, key=lambda result: result[:2])
+        if violation > 0:
+            raise RuntimeError("Nie udało się znaleźć podziału przystanków spełniającego ograniczenia pojazdów.")
+        return routes, cost
+
+
+    def _per_vehicle(self, value, name: str) -> list:
+        if value is None:
+            return [np.inf] * self._number_of_vehicles
+        if isinstance(value, numbers.Real):
+            return [value] * self._number_of_vehicles
+        if len(value) != self._number_of_vehicles:
+            raise ValueError(f"Parametr {name} musi mieć jedną wartość lub po jednej wartości dla każdego pojazdu.")
+        return [np.inf if limit is None else limit for limit in value]
+
+
+# podział losowo wybranych przystanków między pojazdy
+# python -m src.vrp_solver graph.gpickle [liczba_przystanków] [liczba_pojazdów] [maks_przystanków] [czas_s] [procesy]
+if __name__ == "__main__":
+    from src.left_turn_handler import LeftTurnHandler
+
+    if len(sys.argv) < 2:
+        print("Użycie: python -m src.vrp_solver <graf.gpickle> [liczba_przystanków] [liczba_pojazdów] [maks_przystanków] [czas_s] [procesy]")
+        sys.exit(1)
+    number_of_stops = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    number_of_vehicles = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    max_stops = int(sys.argv[4]) if len(sys.argv) > 4 and int(sys.argv[4]) > 0 else None
+    time_budget = float(sys.argv[5]) if len(sys.argv) > 5 else 5.0
+    processes = int(sys.argv[6]) if len(sys.argv) > 6 else None
+
+    with open(sys.argv[1], "rb") as f:
+        G = pickle.load(f)
+    best_path_finder = BestPathFinder(LeftTurnHandler(30.0, 20.0, 10.0, 45.0), 140)
+    solver = VehicleRoutingSolver(best_path_finder, number_of_vehicles, max_stops, time_budget=time_budget, processes=processes)
+    random.seed(0)
+    nodes = random.sample(list(G.nodes), number_of_stops + 1)
+
+    start = time.perf_counter()
+    matrix = build_travel_time_matrix(G, best_path_finder, nodes)
+    print(f"Macierz czasów przejazdu {len(nodes)}x{len(nodes)} wyznaczona w {time.perf_counter() - start:.1f} s")
+    start = time.perf_counter()
+    routes, cost = solver.solve_matrix(matrix)
+    print(f"Podział przystanków wyznaczony w {time.perf_counter() - start:.1f} s, łączny czas przejazdu: {cost:.1f} s")
+    for vehicle, route in enumerate(routes):
+        print(f"Pojazd {vehicle}: {len(route)} przystanków, kolejność: {route}")
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,6 +83,39 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Computed routes are memoized in the 'routes' cache. Use FileBasedCache or DatabaseCache
+# to keep them between restarts; entries of an older graph snapshot are never hit again,
+# because the graph version is part of the key.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'routes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'routes',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+ROUTE_CACHE_ALIAS = 'routes'
+
+# Time to live of a memoized route [s]
+ROUTE_CACHE_TIMEOUT = 60 * 60
+
+# External services used by the app (can be overridden from the environment, e.g. to point at local stubs under load tests)
+NOMINATIM_ENDPOINT = os.environ.get('NOMINATIM_ENDPOINT', 'https://nominatim.openstreetmap.org/')
+OVERPASS_ENDPOINT = os.environ.get('OVERPASS_ENDPOINT', 'https://overpass-api.de/api/interpreter')
+
+# Graph loaded by the app: a pickle file or a directory with a graph saved as arrays
+# (when both are empty, the graph is built from OSM data for the default region)
+ROUTING_PICKLE_FILEPATH = os.environ.get('ROUTING_PICKLE_FILEPATH', '')
+ROUTING_ARRAY_GRAPH_DIR = os.environ.get('ROUTING_ARRAY_GRAPH_DIR', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -1,6 +1,13 @@
+import json
+import time
+import hashlib
 import requests
+from django.conf import settings
+from django.core.cache import caches
 from xml.etree import ElementTree as ET
 from src.app import App
+from src.geometry_encoder import RouteGeometryEncoder
+from src.graph_utils import normalize_address
 
 def find_feature(array: list, low: int, high: int, id: str) -> int:
     if high >= low:
@@ -11,11 +18,12 @@ def find_feature(array: list, low: int, high: int, id: str) -> int:
             return find_feature(array, low, mid - 1, id)
     else:
         return find_feature(array, mid + 1, high, id)
-def process_text_list(text_list, app: App):
+def process_text_list(text_list, app: App, timings: dict = None):
     # Example processing: convert all texts to uppercase
+    # when a timings dict is given, it is filled with the duration [s] of every phase (for the Server-Timing header)
     processed_list = [text for text in text_list]
     try:
-        list_of_nodes = app.run_query(processed_list)
+        list_of_nodes = app.run_query(processed_list, timings)
     except RuntimeError as e:
         return {'type': 'error',
                 'message': e.args[0]}
@@ -23,7 +31,10 @@ def process_text_list(text_list, app: App):
     string_nodes = [str(x) for x in list_of_nodes]
     result = ", ".join(string_nodes).replace('\n', '')
     data = "(node(id:" + result + "););out body;".replace("\n", "")
-    r = requests.post("https://overpass-api.de/api/interpreter", data=data)
+    start = time.perf_counter()
+    r = requests.post(settings.OVERPASS_ENDPOINT, data=data)
+    if timings is not None:
+        timings['overpass'] = time.perf_counter() - start
     root =  ET.fromstring(r.text)
     geojson = {
         "type": "FeatureCollection",
@@ -65,4 +76,87 @@ def get_last_coords(app: App) -> list:
             coords_json["features"].append(feature)
         return coords_json
 
-    
\ No newline at end of file
+
+def process_text_list_compact(text_list, app: App, zoom: int = 14, use_polyline: bool = False) -> dict:
+    # one simplified LineString (or encoded polyline) per leg instead of one Point per OSM node
+    if len(text_list) == 0:
+        return {'type': 'error',
+                'message': 'No addresses to visit'}
+    try:
+        legs = [(coordinates, cost) for _, coordinates, cost in app.run_query_iter([text for text in text_list])]
+    except RuntimeError as e:
+        return {'type': 'error',
+                'message': e.args[0]}
+    geojson = RouteGeometryEncoder(zoom, use_polyline=use_polyline).encode_legs(legs)
+    geojson['points'] = get_last_coords(app)
+    return geojson
+
+
+def route_cache_key(text_list, app: App) -> str:
+    # the order of addresses matters (the first one is the start point), so it is kept
+    key_data = {
+        'addresses': [normalize_address(text) for text in text_list],
+        'parameters': app.get_routing_parameters(),
+        'graph_version': app.get_graph_version()
+    }
+    digest = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+    return 'route:' + digest
+
+
+def process_text_list_cached(text_list, app: App, timings: dict = None):
+    # returns (geojson, last_coords, cache_hit); errors are not cached, as geocoding failures may be transient
+    cache = caches[settings.ROUTE_CACHE_ALIAS]
+    key = route_cache_key(text_list, app)
+    start = time.perf_counter()
+    cached = cache.get(key)
+    if timings is not None:
+        timings['cache'] = time.perf_counter() - start
+    if cached is not None:
+        return cached[0], cached[1], True
+    geojson = process_text_list(text_list, app, timings)
+    last_coords = get_last_coords(app)
+    if geojson.get('type') != 'error':
+        cache.set(key, (geojson, last_coords), settings.ROUTE_CACHE_TIMEOUT)
+    return geojson, last_coords, False
+
+
+def process_isochrone(address: str, minutes: list, app: App, timings: dict = None) -> dict:
+    try:
+        return app.run_isochrone_query(address, minutes, timings)
+    except RuntimeError as e:
+        return {'type': 'error',
+                'message': e.args[0]}
+
+
+def server_timing_header(timings: dict) -> str:
+    # Server-Timing header value (durations in ms), e.g. "geocode;dur=812.4, search;dur=35.2, overpass;dur=120.9"
+    return ', '.join(f'{phase};dur={duration * 1000:.1f}' for phase, duration in timings.items())
+
+
+def leg_to_geojson(leg_index: int, coordinates: list, cost: float) -> dict:
+    return {
+        "type": "Feature",
+        "properties": {"leg": leg_index, "cost": cost},
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [[float(lon), float(lat)] for lon, lat in coordinates]
+        }
+    }
+
+
+def stream_route(text_list, app: App):
+    # yields (event, data) pairs: first the query points, then every leg as soon as it is computed
+    if len(text_list) == 0:
+        yield 'error', {'type': 'error',
+                        'message': 'No addresses to visit'}
+        return
+    try:
+        legs = app.run_query_iter([text for text in text_list])
+        yield 'points', get_last_coords(app)
+        for leg_index, (_, coordinates, cost) in enumerate(legs):
+            yield 'leg', leg_to_geojson(leg_index, coordinates, cost)
+    except RuntimeError as e:
+        yield 'error', {'type': 'error',
+                        'message': e.args[0]}
+        return
+    yield 'done', {}
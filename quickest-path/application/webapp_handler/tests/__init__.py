@@ -0,0 +1,19 @@
+# The views load the routing graph when they are imported, which happens during the system checks
+# that run before the tests. So that the suite does not depend on a local graph file (or download
+# a whole region), the app is pointed at a small synthetic grid written to a temporary directory.
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+
+from django.conf import settings
+
+from .graphs import build_grid_graph
+
+_graph_dir = tempfile.mkdtemp(prefix='webapp_handler_tests_')
+atexit.register(shutil.rmtree, _graph_dir, ignore_errors=True)
+settings.ROUTING_PICKLE_FILEPATH = os.path.join(_graph_dir, 'grid.gpickle')
+settings.ROUTING_ARRAY_GRAPH_DIR = ''
+with open(settings.ROUTING_PICKLE_FILEPATH, 'wb') as f:
+    pickle.dump(build_grid_graph(6, 6).to_networkx(), f, pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,74 @@
+# small synthetic road graphs shared by the tests
+import networkx as nx
+import numpy as np
+
+from src.array_graph import ArrayGraph
+from src.graph_utils import HIGHWAY_CODES, haversine_distance
+
+
+def build_grid_graph(rows: int = 4, columns: int = 4, seed: int = None) -> ArrayGraph:
+    # streets on a regular grid in Warsaw, node ids are 1..rows*columns
+    # without a seed all streets are two-way residential 50 km/h roads; with a seed the road category, speed limit
+    # and node positions are randomized and some streets become one-way
+    rng = np.random.default_rng(seed)
+    nodes = rows * columns
+    node_ids = np.arange(1, nodes + 1, dtype=np.int64)
+    x = np.array([21.0 + 0.002 * (i % columns) for i in range(nodes)])
+    y = np.array([52.2 + 0.002 * (i // columns) for i in range(nodes)])
+    if seed is not None:
+        x += rng.uniform(-0.0004, 0.0004, nodes)
+        y += rng.uniform(-0.0004, 0.0004, nodes)
+
+    categories = ['primary', 'secondary', 'tertiary', 'residential']
+    u, v, highway, maxspeed = [], [], [], []
+    for i in range(nodes):
+        neighbors = ([i + 1] if i % columns < columns - 1 else []) + ([i + columns] if i // columns < rows - 1 else [])
+        for j in neighbors:
+            category = categories[rng.integers(len(categories))] if seed is not None else 'residential'
+            speed = int(rng.choice([30, 50, 70])) if seed is not None else 50
+            directions = [(i, j), (j, i)]
+            if seed is not None and rng.random() < 0.2:
+                directions = [directions[rng.integers(2)]]
+            for a, b in directions:
+                u.append(a)
+                v.append(b)
+                highway.append(HIGHWAY_CODES[category])
+                maxspeed.append(speed)
+
+    u, v = np.array(u), np.array(v)
+    length = haversine_distance(x[u], y[u], x[v], y[v]).astype(np.float32)
+    maxspeed = np.array(maxspeed, dtype=np.uint16)
+    return ArrayGraph.from_edge_arrays(node_ids, x, y, node_ids[u], node_ids[v], length,
+                                       (length / (maxspeed / 3.6)).astype(np.float32),
+                                       np.array(highway, dtype=np.uint8), maxspeed)
+
+
+def path_triples(path: list) -> list:
+    return list(zip(path[:-2], path[1:-1], path[2:]))
+
+
+def subdivide_streets(G: nx.MultiDiGraph, parts: int = 3, seed: int = 0) -> nx.MultiDiGraph:
+    # every street is split into `parts` segments by new, slightly bent nodes (chains of degree-2 nodes)
+    # both directions of a two-way street share the inner nodes; inner node ids start at 1000
+    rng = np.random.default_rng(seed)
+    H = nx.MultiDiGraph()
+    H.add_nodes_from(G.nodes(data=True))
+    streets = {}
+    for u, v, data in G.edges(data=True):
+        street = (min(u, v), max(u, v))
+        if street not in streets:
+            a, b = G.nodes[street[0]], G.nodes[street[1]]
+            streets[street] = []
+            for step in range(1, parts):
+                node = 1000 + H.number_of_nodes()
+                x = a['x'] + (b['x'] - a['x']) * step / parts + rng.uniform(-0.0002, 0.0002)
+                y = a['y'] + (b['y'] - a['y']) * step / parts + rng.uniform(-0.0002, 0.0002)
+                H.add_node(node, id=node, x=x, y=y)
+                streets[street].append(node)
+        inner = streets[street] if u < v else streets[street][::-1]
+        chain = [u] + inner + [v]
+        for a, b in zip(chain[:-1], chain[1:]):
+            length = float(haversine_distance(H.nodes[a]['x'], H.nodes[a]['y'], H.nodes[b]['x'], H.nodes[b]['y']))
+            H.add_edge(a, b, u=a, v=b, length=length, estimated_time=length / (data['maxspeed'] / 3.6),
+                       highway=data['highway'], maxspeed=data['maxspeed'])
+    return H
@@ -0,0 +1,55 @@
+import random
+
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_components import ComponentIndex
+from src.left_turn_handler import LeftTurnHandler
+from src.slim_graph import SlimGraph
+from .graphs import build_grid_graph
+
+
+class KernelParityTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(8, 8, seed=9).to_networkx()
+        self.slim_graph = SlimGraph.from_networkx(self.G)
+        self.handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+
+    def find(self, finder: BestPathFinder, G, source: int, dest: int) -> tuple:
+        try:
+            return finder.find_shortest_path_with_stats(G, source, dest)
+        except RuntimeError:
+            return None
+
+    def test_kernel_matches_the_python_search(self):
+        python_finder = BestPathFinder(self.handler, 140, None, 'python')
+        kernel_finder = BestPathFinder(self.handler, 140, None, 'kernel')
+        rng = random.Random(0)
+        nodes = list(self.G.nodes)
+        found = 0
+        for _ in range(60):
+            source, dest = rng.sample(nodes, 2)
+            expected = self.find(python_finder, self.G, source, dest)
+            result = self.find(kernel_finder, self.slim_graph, source, dest)
+            if expected is None:
+                self.assertIsNone(result)
+                continue
+            found += 1
+            self.assertEqual(result[0], expected[0])
+            self.assertAlmostEqual(result[1], expected[1], places=6)
+            self.assertEqual(result[2], expected[2])
+        self.assertGreater(found, 40)
+
+    def test_unreachable_pair_is_rejected(self):
+        G = self.G.copy()
+        G.add_node(100, x=21.0, y=52.2)
+        G.add_edge(100, 1, u=100, v=1, length=10.0, estimated_time=1.0, highway='residential', maxspeed=50)
+        slim_graph = SlimGraph.from_networkx(G)
+        for finder, graph in ((BestPathFinder(self.handler, 140, None, 'kernel'), slim_graph),
+                              (BestPathFinder(self.handler, 140, ComponentIndex(slim_graph), 'kernel'), slim_graph)):
+            self.assertRaises(RuntimeError, finder.find_shortest_path_with_stats, graph, 1, 100)
+        self.assertEqual(BestPathFinder(self.handler, 140, None, 'kernel').find_shortest_path(slim_graph, 100, 2)[:2], [100, 1])
+
+    def test_unknown_backend_is_rejected(self):
+        self.assertRaises(ValueError, BestPathFinder, self.handler, 140, None, 'gpu')
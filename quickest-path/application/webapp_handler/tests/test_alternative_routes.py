@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from src.alternative_routes import AlternativeRouteFinder
+from src.left_turn_handler import LeftTurnHandler
+from src.turn_restrictions import TurnRestrictionIndex, TURN_RESTRICTIONS_KEY
+from .graphs import build_grid_graph, path_triples
+
+
+class AlternativeRouteTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(6, 6, seed=6).to_networkx()
+        self.handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+        self.finder = AlternativeRouteFinder(self.handler)
+
+    def assert_valid_routes(self, routes: list, source: int, dest: int):
+        best_cost = routes[0][1]
+        self.assertEqual(routes[0][2], 1.0)
+        for path, cost, overlap in routes:
+            self.assertEqual((path[0], path[-1]), (source, dest))
+            self.assertEqual(len(set(path)), len(path))
+            self.assertAlmostEqual(cost, self.handler.calculate_path_cost(self.G, path), places=6)
+            self.assertLessEqual(cost, 1.3 * best_cost + 1e-6)
+            self.assertLessEqual(overlap, 1.0)
+        for path, _, overlap in routes[1:]:
+            self.assertNotEqual(path, routes[0][0])
+            self.assertLessEqual(overlap, 0.7)
+
+    def test_alternatives_are_distinct_and_bounded(self):
+        for source, dest in ((1, 36), (31, 6), (3, 34)):
+            routes = self.finder.find_alternatives(self.G, source, dest, 3)
+            self.assertGreater(len(routes), 1)
+            self.assert_valid_routes(routes, source, dest)
+
+    def test_turn_restrictions_are_respected(self):
+        best_path = self.finder.find_alternatives(self.G, 1, 36, 1)[0][0]
+        index = TurnRestrictionIndex.from_rules([triple + (False,) for triple in path_triples(best_path)])
+        self.assertFalse(index.allows_path(best_path))
+        self.G.graph[TURN_RESTRICTIONS_KEY] = index
+        routes = self.finder.find_alternatives(self.G, 1, 36, 3)
+        self.assert_valid_routes(routes, 1, 36)
+        self.assertTrue(all(index.allows_path(path) for path, _, _ in routes))
+
+    def test_unreachable_destination_raises(self):
+        self.G.add_node(100, x=21.0, y=52.2)
+        self.assertRaises(RuntimeError, self.finder.find_alternatives, self.G, 1, 100)
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from src import stream_ingestor
+from src.array_graph import ArrayGraph
+from .graphs import build_grid_graph
+
+
+class ArrayGraphTests(SimpleTestCase):
+
+    def test_edges_are_sorted_by_source_and_target(self):
+        graph = build_grid_graph(3, 5, seed=1)
+        sources = np.repeat(np.arange(graph.number_of_nodes()), np.diff(graph.indptr))
+        keys = sources * graph.number_of_nodes() + graph.indices
+        self.assertTrue(np.all(np.diff(keys) >= 0))
+        self.assertEqual(graph.indptr[-1], graph.number_of_edges())
+
+    def test_save_and_load(self):
+        graph = build_grid_graph(3, 5)
+        with tempfile.TemporaryDirectory() as directory:
+            graph.save(directory)
+            with open(os.path.join(directory, 'meta.json')) as f:
+                meta = json.load(f)
+            self.assertEqual((meta['nodes'], meta['edges']), (15, graph.number_of_edges()))
+            for mmap in (False, True):
+                loaded = ArrayGraph.load(directory, mmap=mmap)
+                for name in ArrayGraph.NODE_ARRAYS + ArrayGraph.EDGE_ARRAYS:
+                    np.testing.assert_array_equal(getattr(loaded, name), getattr(graph, name))
+                    self.assertEqual(getattr(loaded, name).dtype, getattr(graph, name).dtype)
+                G = loaded.to_networkx()
+                self.assertEqual(sorted(G.edges()), sorted(graph.to_networkx().edges()))
+                self.assertEqual(loaded.node_index(7), 6)
+                del loaded, G
+
+
+@unittest.skipIf(stream_ingestor.osmium is None, 'pyosmium is not installed')
+class StreamingMergeTests(SimpleTestCase):
+
+    TAGS = {key: None for key in stream_ingestor.WAY_TAGS}
+
+    def ingest(self, ways: list, chunk_segments: int, directory: str) -> ArrayGraph:
+        # the ways are fed to the ingester directly, without reading a .osm.pbf file
+        ingestor = stream_ingestor.StreamingGraphIngestor(chunk_segments=chunk_segments)
+        ingestor._chunk_dir = tempfile.mkdtemp(dir=directory)
+        for tags, nodes in ways:
+            ingestor._process_way(dict(self.TAGS, **tags), nodes)
+        ingestor._flush()
+        output_dir = os.path.join(directory, f'graph_{chunk_segments}')
+        os.makedirs(output_dir)
+        return ingestor._merge_chunks(output_dir)
+
+    def test_chunked_merge_matches_a_single_chunk(self):
+        rng = np.random.default_rng(0)
+        ways = []
+        for _ in range(60):
+            node_ids = rng.choice(40, size=rng.integers(2, 6), replace=False) + 1
+            nodes = [(int(node_id), 21.0 + node_id * 0.001, 52.2 + (node_id % 7) * 0.001) for node_id in node_ids]
+            ways.append(({'highway': 'residential', 'maxspeed': str(rng.choice([0, 30, 50]))}, nodes))
+        with tempfile.TemporaryDirectory() as directory:
+            graphs = [self.ingest(ways, chunk_segments, directory) for chunk_segments in (1, 7, 10 ** 6)]
+            for graph in graphs[:-1]:
+                for name in ArrayGraph.NODE_ARRAYS + ArrayGraph.EDGE_ARRAYS:
+                    np.testing.assert_array_equal(getattr(graph, name), getattr(graphs[-1], name))
+            self.assertGreater(graphs[-1].number_of_edges(), 60)
+            # a zero speed limit must not produce an infinite travel time
+            self.assertTrue(np.all(np.isfinite(graphs[-1].estimated_time)))
+            del graphs
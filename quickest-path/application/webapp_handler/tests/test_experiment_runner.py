@@ -0,0 +1,43 @@
+import csv
+import importlib.util
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from src.experiment_runner import ExperimentRunner, PARQUET_ENGINES
+from src.heuristic_audit import derive_admissible_heuristic_speed
+from .graphs import build_grid_graph
+
+
+class ExperimentRunnerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(4, 4, seed=5).to_networkx()
+
+    def test_default_heuristic_speed_is_derived_from_the_graph(self):
+        combinations = ExperimentRunner(self.G, {'penalty_to_better_road': [10, 30]}).get_parameter_combinations()
+        self.assertEqual([params['heur_maxspeed'] for params in combinations], [derive_admissible_heuristic_speed(self.G)] * 2)
+        combinations = ExperimentRunner(self.G, {'heur_maxspeed': [120]}).get_parameter_combinations()
+        self.assertEqual(combinations[0]['heur_maxspeed'], 120)
+
+    def test_unknown_parameter_is_rejected(self):
+        self.assertRaises(ValueError, ExperimentRunner, self.G, {'max_points_allowed': [5]})
+
+    def test_results_are_saved_as_csv(self):
+        runner = ExperimentRunner(self.G, {'penalty_to_equal_road': [0, 20]}, processes=1)
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, 'results.csv')
+            rows = runner.run([[1, 16], [4, 13, 6]], output_path)
+            with open(output_path, newline='') as f:
+                saved = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row['query_id'] for row in saved], ['0', '1', '0', '1'])
+        self.assertTrue(all(row['status'] == 'ok' and row['cost'] > 0 for row in rows))
+
+    def test_parquet_without_an_engine_fails_before_running(self):
+        if any(importlib.util.find_spec(engine) for engine in PARQUET_ENGINES):
+            self.skipTest('a Parquet engine is installed')
+        runner = ExperimentRunner(self.G, {}, processes=1)
+        with self.assertRaisesMessage(RuntimeError, 'pyarrow'):
+            runner.run([[1, 16]], os.path.join(tempfile.gettempdir(), 'results.parquet'))
@@ -0,0 +1,49 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from src.geometry_encoder import (RouteGeometryEncoder, decode_polyline, encode_polyline, polyline_length,
+                                  simplify_coordinates, tolerance_for_zoom)
+from webapp_handler.services import process_text_list_compact
+
+
+class GeometryEncoderTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        steps = rng.uniform(-0.0005, 0.001, size=(200, 2))
+        self.coordinates = [(float(lon), float(lat)) for lon, lat in np.cumsum(steps, axis=0) + (21.0, 52.2)]
+
+    def test_polyline_round_trip(self):
+        self.assertEqual(encode_polyline([(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        decoded = decode_polyline(encode_polyline(self.coordinates))
+        np.testing.assert_allclose(decoded, self.coordinates, atol=0.5e-5)
+
+    def test_simplification_keeps_the_end_points(self):
+        simplified = simplify_coordinates(self.coordinates, tolerance_for_zoom(12))
+        self.assertLess(len(simplified), len(self.coordinates))
+        self.assertEqual((simplified[0], simplified[-1]), (self.coordinates[0], self.coordinates[-1]))
+        self.assertGreater(len(simplify_coordinates(self.coordinates, tolerance_for_zoom(18))), len(simplified))
+
+    def test_polyline_legs_match_geojson_legs(self):
+        legs = [(self.coordinates[:120], 100.0), (self.coordinates[119:], 50.0)]
+        geojson = RouteGeometryEncoder(16).encode_legs(legs)
+        polyline = RouteGeometryEncoder(16, use_polyline=True).encode_legs(legs)
+        for feature, encoded in zip(geojson['features'], polyline['features']):
+            np.testing.assert_allclose(decode_polyline(encoded['properties']['polyline']),
+                                       feature['geometry']['coordinates'], atol=1e-5)
+            self.assertIsNone(encoded['geometry'])
+        self.assertEqual(polyline['properties']['cost'], 150.0)
+        self.assertAlmostEqual(geojson['properties']['distance'],
+                               polyline_length(self.coordinates[:120]) + polyline_length(self.coordinates[119:]), places=0)
+
+
+class CompactRouteTests(TestCase):
+
+    def test_empty_address_list_is_an_error(self):
+        self.assertEqual(process_text_list_compact([], None), {'type': 'error', 'message': 'No addresses to visit'})
+
+    def test_compact_view_without_entries(self):
+        response = self.client.get('/compact/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'No addresses to visit')
+        self.assertEqual(self.client.get('/compact/', {'zoom': 'x'}).status_code, 400)
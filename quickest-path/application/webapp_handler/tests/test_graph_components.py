@@ -0,0 +1,78 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+from django.test import SimpleTestCase
+
+from src.array_graph import ArrayGraph
+from src.graph_components import ComponentIndex, find_small_component_nodes, prune_small_components
+from src.slim_graph import SlimGraph
+
+
+def random_graph(nodes: int, edges: int, seed: int) -> ArrayGraph:
+    # sparse random directed graph with many small strongly connected components
+    rng = np.random.default_rng(seed)
+    node_ids = np.arange(10, 10 + nodes, dtype=np.int64) * 7
+    u, v = rng.integers(nodes, size=edges), rng.integers(nodes, size=edges)
+    keep = u != v
+    u, v = u[keep], v[keep]
+    ones = np.ones(len(u), dtype=np.float32)
+    return ArrayGraph.from_edge_arrays(node_ids, rng.random(nodes) + 21, rng.random(nodes) + 52, node_ids[u], node_ids[v],
+                                       ones, ones, np.zeros(len(u), dtype=np.uint8), np.full(len(u), 50, dtype=np.uint16))
+
+
+class ComponentIndexTests(SimpleTestCase):
+
+    def graphs(self, seed: int) -> tuple:
+        graph = random_graph(60, 90, seed)
+        return graph.to_networkx(), SlimGraph.from_array_graph(graph)
+
+    def test_labels_match_networkx_components(self):
+        for seed in range(5):
+            G, slim_graph = self.graphs(seed)
+            expected = sorted(sorted(component) for component in nx.strongly_connected_components(G))
+            for graph in (G, slim_graph):
+                index = ComponentIndex(graph)
+                components = {}
+                for node in G.nodes:
+                    components.setdefault(index.component_of(node), []).append(node)
+                self.assertEqual(sorted(sorted(component) for component in components.values()), expected)
+                self.assertEqual(index.number_of_components(), len(expected))
+                largest = max(expected, key=len)
+                self.assertTrue(index.is_in_largest_component(largest[0]))
+                self.assertEqual(index.component_of(1), -1)
+
+    def test_reachability_matches_networkx(self):
+        for seed in range(5):
+            G, slim_graph = self.graphs(seed)
+            reachable = {node: nx.descendants(G, node) | {node} for node in G.nodes}
+            # the bitset and, with no bitset allowed, the search over the component graph
+            for index in (ComponentIndex(G), ComponentIndex(slim_graph), ComponentIndex(G, max_reachability_components=0)):
+                for source, dest in itertools.product(G.nodes, repeat=2):
+                    self.assertEqual(index.can_reach(source, dest), dest in reachable[source], (seed, source, dest))
+
+    def test_unknown_nodes_are_left_to_the_search(self):
+        G, _ = self.graphs(0)
+        self.assertTrue(ComponentIndex(G).can_reach(1, 70))
+
+    def test_long_chain_does_not_recurse(self):
+        nodes = 200000
+        node_ids = np.arange(nodes, dtype=np.int64)
+        ones = np.ones(nodes - 1, dtype=np.float32)
+        graph = SlimGraph.from_array_graph(ArrayGraph.from_edge_arrays(
+            node_ids, np.zeros(nodes), np.zeros(nodes), node_ids[:-1], node_ids[1:], ones, ones,
+            np.zeros(nodes - 1, dtype=np.uint8), np.full(nodes - 1, 50, dtype=np.uint16)))
+        index = ComponentIndex(graph)
+        self.assertEqual(index.number_of_components(), nodes)
+        self.assertTrue(index.can_reach(0, nodes - 1))
+        self.assertFalse(index.can_reach(nodes - 1, 0))
+
+    def test_small_components_are_pruned(self):
+        for seed in range(3):
+            G, slim_graph = self.graphs(seed)
+            small = sorted(node for component in nx.strongly_connected_components(G) if len(component) < 3
+                           for node in component)
+            self.assertEqual(sorted(find_small_component_nodes(slim_graph, 3)), small)
+            self.assertEqual(prune_small_components(G, 3), len(small))
+            self.assertFalse(any(node in G for node in small))
+            self.assertTrue(all(len(component) >= 3 for component in nx.strongly_connected_components(G)))
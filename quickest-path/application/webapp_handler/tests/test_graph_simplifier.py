@@ -0,0 +1,63 @@
+import copy
+import random
+
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_simplifier import GraphSimplifier
+from src.left_turn_handler import LeftTurnHandler
+from .graphs import build_grid_graph, subdivide_streets
+
+
+class GraphSimplifierTests(SimpleTestCase):
+
+    def setUp(self):
+        self.original = subdivide_streets(build_grid_graph(5, 5, seed=3).to_networkx(), parts=4, seed=3)
+        self.handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+        self.finder = BestPathFinder(self.handler, 140)
+        self.simplifier = GraphSimplifier(self.handler)
+        self.simplified = self.simplifier.simplify(copy.deepcopy(self.original))
+
+    def find(self, G, source: int, dest: int) -> tuple:
+        try:
+            path, cost, _ = self.finder.find_shortest_path_with_stats(G, source, dest)
+        except RuntimeError:
+            return None, None
+        return path, cost
+
+    def assert_same_route(self, G, source: int, dest: int):
+        path, cost = self.find(G, source, dest)
+        original_path, original_cost = self.find(self.original, source, dest)
+        if original_path is None:
+            self.assertIsNone(path)
+            return
+        self.assertEqual(self.simplifier.expand_path(G, path), original_path)
+        self.assertAlmostEqual(cost, original_cost, places=6)
+
+    def test_chains_are_contracted(self):
+        self.assertLess(self.simplified.number_of_nodes(), self.original.number_of_nodes() / 2)
+        self.assertTrue(all(node < 1000 for node in self.simplified.nodes))
+
+    def test_contracted_paths_match_the_original_graph(self):
+        rng = random.Random(0)
+        nodes = list(self.simplified.nodes)
+        for _ in range(40):
+            self.assert_same_route(self.simplified, *rng.sample(nodes, 2))
+
+    def test_restored_inner_nodes_match_the_original_graph(self):
+        rng = random.Random(1)
+        inner_nodes = [node for node in self.original.nodes if node not in self.simplified.nodes]
+        nodes, edges = self.simplified.number_of_nodes(), self.simplified.number_of_edges()
+        for _ in range(20):
+            source, dest = rng.sample(inner_nodes, 2)
+            view = self.simplifier.with_restored_nodes(self.simplified, [source, dest])
+            self.assertIn(source, view)
+            self.assert_same_route(view, source, dest)
+        # the restored nodes only exist in the per-query views
+        self.assertEqual((self.simplified.number_of_nodes(), self.simplified.number_of_edges()), (nodes, edges))
+        self.assertNotIn(source, self.simplified)
+
+    def test_snapping_prefers_a_closer_inner_node(self):
+        inner = next(node for node in self.original.nodes if node not in self.simplified.nodes)
+        coordinates = (self.original.nodes[inner]['y'], self.original.nodes[inner]['x'])
+        self.assertEqual(self.simplifier.snap_to_original_node(self.simplified, coordinates, 1), inner)
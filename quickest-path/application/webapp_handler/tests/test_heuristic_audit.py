@@ -0,0 +1,45 @@
+import networkx as nx
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_utils import calculate_heuristic
+from src.heuristic_audit import HeuristicAuditor, derive_admissible_heuristic_speed
+from src.left_turn_handler import LeftTurnHandler
+from src.slim_graph import SlimGraph
+from .graphs import build_grid_graph
+
+
+class HeuristicAdmissibilityTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(5, 5, seed=8).to_networkx()
+        self.speed = derive_admissible_heuristic_speed(self.G)
+        self.auditor = HeuristicAuditor(number_of_targets=25, pairs_per_target=25)
+
+    def test_derived_speed_never_overestimates(self):
+        for target in self.G.nodes:
+            dist = self.auditor._backward_dijkstra(self.G, target)
+            for source, cost in dist.items():
+                self.assertLessEqual(calculate_heuristic(self.G, source, target, self.speed), cost * (1 + 1e-6))
+        self.assertEqual(self.auditor.audit(self.G, self.speed)['violations'], 0)
+
+    def test_derived_speed_is_tight(self):
+        # the fastest edge (at most 70 km/h here) bounds the speed, so a clearly lower speed overestimates somewhere
+        self.assertLess(self.speed, 75)
+        self.assertGreater(self.auditor.audit(self.G, self.speed / 1.5)['violations'], 0)
+
+    def test_slim_graph_gives_the_same_speed(self):
+        self.assertAlmostEqual(derive_admissible_heuristic_speed(SlimGraph.from_networkx(self.G)), self.speed, places=6)
+
+    def test_a_star_with_the_derived_speed_is_optimal(self):
+        finder = BestPathFinder(LeftTurnHandler(0.0, 0.0, 0.0, 45.0), self.speed)
+        lengths = dict(nx.all_pairs_dijkstra_path_length(nx.DiGraph(self.G), weight='estimated_time'))
+        for source, dest in ((1, 25), (21, 5), (3, 23), (13, 2)):
+            if dest in lengths[source]:
+                self.assertAlmostEqual(finder.find_shortest_path_with_stats(self.G, source, dest)[1], lengths[source][dest],
+                                       places=6)
+
+    def test_graph_without_edges_is_rejected(self):
+        G = nx.MultiDiGraph()
+        G.add_node(1, x=21.0, y=52.2)
+        self.assertRaises(ValueError, derive_admissible_heuristic_speed, G)
@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase
+
+from src.isochrone import IsochroneBuilder
+from src.left_turn_handler import LeftTurnHandler
+from webapp_handler import views
+from .graphs import build_grid_graph
+
+
+class IsochroneTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(6, 6, seed=7).to_networkx()
+        self.builder = IsochroneBuilder(LeftTurnHandler(30.0, 20.0, 10.0, 45.0))
+
+    def test_bands_grow_with_the_budget(self):
+        budgets = [30, 90, 60, 90, 400]
+        bands = self.builder.reachable_nodes(self.G, 1, budgets)
+        self.assertEqual(len(bands), len(budgets))
+        dist, _ = self.builder._search(self.G, 1, max(budgets))
+        for budget, band in zip(budgets, bands):
+            self.assertEqual(set(band), {node for node, d in dist.items() if d <= budget})
+            self.assertTrue(all(predecessor == -1 or predecessor in band for predecessor in band.values()))
+        self.assertTrue(set(bands[0]) <= set(bands[2]) <= set(bands[1]) <= set(bands[4]))
+        self.assertEqual(bands[1], bands[3])
+        self.assertEqual(bands[0][1], -1)
+
+    def test_features_are_sorted_by_minutes(self):
+        geojson = self.builder.build_isochrones(self.G, 1, [0.5, 2, 1, 2])
+        minutes = [feature['properties']['minutes'] for feature in geojson['features']]
+        self.assertEqual(minutes, [2, 2, 1, 0.5])
+        nodes = [feature['properties']['reachable_nodes'] for feature in geojson['features']]
+        self.assertEqual(nodes, sorted(nodes, reverse=True))
+        self.assertTrue(all(feature['geometry']['type'] == 'Polygon' for feature in geojson['features']))
+
+    def test_cached_search_serves_smaller_budgets(self):
+        self.builder.reachable_nodes(self.G, 1, [300])
+        cached = self.builder._cache[1]
+        self.builder.reachable_nodes(self.G, 1, [60])
+        self.assertIs(self.builder._cache[1], cached)
+        self.builder.reachable_nodes(self.G, 1, [600])
+        self.assertEqual(self.builder._cache[1][1], 600)
+
+    def test_empty_budgets_are_rejected(self):
+        self.assertRaises(ValueError, self.builder.reachable_nodes, self.G, 1, [])
+
+
+class IsochroneViewTests(SimpleTestCase):
+
+    def test_invalid_minutes_are_rejected(self):
+        for minutes in ('nan', 'inf', '-5', '0', '121', '1e9', '', '10,,20', 'ten'):
+            response = self.client.get('/isochrone/', {'address': 'Plac Defilad 1, Warszawa', 'minutes': minutes})
+            self.assertEqual(response.status_code, 400, minutes)
+            self.assertEqual(response.json()['type'], 'error')
+
+    def test_app_rejects_invalid_minutes_before_geocoding(self):
+        for minutes in ([], [float('nan')], [float('inf')], [0], [121]):
+            self.assertRaises(RuntimeError, views.app.run_isochrone_query, 'Plac Defilad 1, Warszawa', minutes)
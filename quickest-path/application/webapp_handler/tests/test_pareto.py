@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_components import ComponentIndex
+from src.left_turn_handler import LeftTurnHandler
+from src.pareto_path_finder import ParetoPathFinder
+from src.turn_restrictions import TurnRestrictionIndex, TURN_RESTRICTIONS_KEY
+from .graphs import build_grid_graph, path_triples
+
+PENALTIES = (30.0, 20.0, 10.0)
+
+
+class ParetoPathFinderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(5, 5, seed=4).to_networkx()
+        self.handler = LeftTurnHandler(*PENALTIES, 45.0)
+        self.finder = ParetoPathFinder(self.handler, 140)
+
+    def assert_front_is_non_dominated(self, front: list):
+        self.assertGreater(len(front), 0)
+        for i, (time, turns, _) in enumerate(front):
+            for j, (other_time, other_turns, _) in enumerate(front):
+                dominates = other_time <= time and all(a <= b for a, b in zip(other_turns, turns))
+                if i != j and dominates:
+                    self.assertEqual((other_time, other_turns), (time, turns))
+        self.assertEqual([route[0] for route in front], sorted(route[0] for route in front))
+
+    def test_front_contains_the_quickest_route(self):
+        best_path_finder = BestPathFinder(self.handler, 140)
+        for source, dest in ((1, 25), (21, 5), (3, 23), (11, 15)):
+            front = self.finder.find_pareto_front(self.G, source, dest)
+            self.assert_front_is_non_dominated(front)
+            for _, _, path in front:
+                self.assertEqual((path[0], path[-1]), (source, dest))
+            # A* keeps one label per node, so with the same penalties the front never does worse than its route
+            _, cost, _ = best_path_finder.find_shortest_path_with_stats(self.G, source, dest)
+            self.assertLessEqual(min(time + sum(n * p for n, p in zip(turns, PENALTIES)) for time, turns, _ in front),
+                                 cost + 1e-6)
+            # without penalties the quickest route of the front is the quickest route found by A*
+            _, quickest_time, _ = BestPathFinder(LeftTurnHandler(0.0, 0.0, 0.0, 45.0), 140).find_shortest_path_with_stats(
+                self.G, source, dest)
+            self.assertAlmostEqual(front[0][0], quickest_time, places=6)
+            path = self.finder.select_route(front, *PENALTIES)
+            self.assertIn(path, [route[2] for route in front])
+
+    def test_time_vs_left_turns_projection(self):
+        projection = self.finder.time_vs_left_turns(self.finder.find_pareto_front(self.G, 1, 25))
+        self.assertEqual([route[1] for route in projection], sorted((route[1] for route in projection), reverse=True))
+        self.assertEqual(len({route[1] for route in projection}), len(projection))
+
+    def test_turn_restrictions_are_respected(self):
+        quickest = self.finder.find_pareto_front(self.G, 1, 25)[0][2]
+        index = TurnRestrictionIndex.from_rules([triple + (False,) for triple in path_triples(quickest)])
+        self.G.graph[TURN_RESTRICTIONS_KEY] = index
+        front = self.finder.find_pareto_front(self.G, 1, 25)
+        self.assert_front_is_non_dominated(front)
+        for _, _, path in front:
+            self.assertFalse(any(index.is_forbidden(*triple) for triple in path_triples(path)))
+
+    def test_unreachable_destination_gives_an_empty_front(self):
+        self.G.add_node(100, x=21.0, y=52.2)
+        self.G.add_edge(100, 1, u=100, v=1, length=10.0, estimated_time=1.0, highway='residential', maxspeed=50)
+        finder = ParetoPathFinder(self.handler, 140, ComponentIndex(self.G))
+        self.assertEqual(finder.find_pareto_front(self.G, 1, 100), [])
+        self.assertEqual(self.finder.find_pareto_front(self.G, 1, 100), [])
+        self.assertRaises(RuntimeError, self.finder.select_route, [], *PENALTIES)
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webapp_handler import views
+
+
+class QueryTimingsTests(SimpleTestCase):
+
+    def setUp(self):
+        # addresses are node ids of the test grid, geocoded to the node's coordinates without Nominatim
+        G = views.app._G
+        self.nodes = sorted(G.nodes)
+        self.coordinates = {str(node): (G.nodes[node]['y'], G.nodes[node]['x']) for node in self.nodes}
+        patcher = mock.patch.object(views.app._geo_mapper, 'map_to_coordinates', side_effect=self.coordinates.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, index: int) -> dict:
+        timings = {}
+        views.app.run_query([str(self.nodes[index]), str(self.nodes[-1 - index])], timings)
+        return timings
+
+    def isochrone(self, index: int) -> dict:
+        timings = {}
+        views.app.run_isochrone_query(str(self.nodes[index]), [1, 2], timings)
+        return timings
+
+    def test_each_query_fills_its_own_timings(self):
+        with ThreadPoolExecutor(4) as executor:
+            routes = [executor.submit(self.route, index) for index in range(8)]
+            isochrones = [executor.submit(self.isochrone, index) for index in range(8)]
+            for future in routes:
+                self.assertEqual(set(future.result()), {'geocode', 'snap', 'search'})
+            for future in isochrones:
+                self.assertEqual(set(future.result()), {'geocode', 'snap', 'isochrone'})
+
+    def test_timings_are_optional(self):
+        path = views.app.run_query([str(self.nodes[0]), str(self.nodes[-1])])
+        self.assertEqual((path[0], path[-1]), (self.nodes[0], self.nodes[-1]))
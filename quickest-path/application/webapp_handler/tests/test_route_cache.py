@@ -0,0 +1,74 @@
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from webapp_handler import views
+from webapp_handler.services import process_text_list_cached, route_cache_key
+
+
+class _CacheApp:
+    # the parts of App the route cache depends on; run_query fails like a geocoding error would
+    def __init__(self, parameters: dict = None, graph_version: str = 'graph:1'):
+        self._parameters = dict(views.app.get_routing_parameters(), **(parameters or {}))
+        self._graph_version = graph_version
+        self._last_query_coordinates = None
+        self.queries = 0
+
+    def get_routing_parameters(self) -> dict:
+        return self._parameters
+
+    def get_graph_version(self) -> str:
+        return self._graph_version
+
+    def run_query(self, addresses: list, timings: dict = None) -> list:
+        self.queries += 1
+        raise RuntimeError('Nie udało się zrealizować geomapowania jednego z punktów')
+
+
+class RouteCacheKeyTests(SimpleTestCase):
+
+    ADDRESSES = ['Plac Defilad 1, Warszawa', 'Nowy Świat 1, Warszawa']
+
+    def test_addresses_are_normalized(self):
+        app = _CacheApp()
+        self.assertEqual(route_cache_key(self.ADDRESSES, app),
+                         route_cache_key(['  plac  defilad 1,\tWARSZAWA ', 'NOWY ŚWIAT 1, warszawa'], app))
+
+    def test_order_parameters_and_graph_version_change_the_key(self):
+        key = route_cache_key(self.ADDRESSES, _CacheApp())
+        self.assertNotEqual(route_cache_key(self.ADDRESSES[::-1], _CacheApp()), key)
+        self.assertNotEqual(route_cache_key(self.ADDRESSES, _CacheApp({'penalty_to_better_road': 31.0})), key)
+        self.assertNotEqual(route_cache_key(self.ADDRESSES, _CacheApp(graph_version='graph:2')), key)
+
+    def test_replacing_the_graph_file_changes_the_version(self):
+        version = views.app._get_graph_version()
+        stat = os.stat(settings.ROUTING_PICKLE_FILEPATH)
+        os.utime(settings.ROUTING_PICKLE_FILEPATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertNotEqual(views.app._get_graph_version(), version)
+
+
+class RouteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = caches[settings.ROUTE_CACHE_ALIAS]
+        self.cache.clear()
+
+    def test_cached_route_is_served_without_a_query(self):
+        app = _CacheApp()
+        self.cache.set(route_cache_key(['a', 'b'], app), ({'type': 'FeatureCollection', 'features': []}, None))
+        timings = {}
+        geojson, _, cache_hit = process_text_list_cached(['A ', 'b'], app, timings)
+        self.assertTrue(cache_hit)
+        self.assertEqual(geojson['type'], 'FeatureCollection')
+        self.assertEqual(app.queries, 0)
+        self.assertIn('cache', timings)
+
+    def test_errors_are_not_cached(self):
+        app = _CacheApp()
+        for _ in range(2):
+            geojson, _, cache_hit = process_text_list_cached(['a', 'b'], app)
+            self.assertEqual(geojson['type'], 'error')
+            self.assertFalse(cache_hit)
+        self.assertEqual(app.queries, 2)
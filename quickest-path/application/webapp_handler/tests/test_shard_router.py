@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from src.shard_router import RegionRegistry, ShardRouter
+
+
+def build_registry(names: list) -> RegionRegistry:
+    # every region serves the test grid (loaded from the pickle written by the test package)
+    registry = RegionRegistry()
+    for i, name in enumerate(names):
+        registry.add_region(name, [20.0 + i, 52.0, 21.5 + i, 52.5],
+                            {'read_graph_from_pickle': True, 'pickle_filepath': settings.ROUTING_PICKLE_FILEPATH})
+    return registry
+
+
+class RegionRegistryTests(SimpleTestCase):
+
+    def test_smallest_region_containing_all_points_is_chosen(self):
+        registry = RegionRegistry()
+        registry.add_region('mazowieckie', [19.2, 51.0, 23.2, 53.5], {})
+        registry.add_region('warszawa', [20.85, 52.09, 21.28, 52.37], {})
+        self.assertEqual(registry.find_region([(52.23, 21.01), (52.25, 21.03)]), 'warszawa')
+        self.assertEqual(registry.find_region([(52.23, 21.01), (52.5, 21.5)]), 'mazowieckie')
+        self.assertRaises(RuntimeError, registry.find_region, [(52.23, 21.01), (50.06, 19.94)])
+        self.assertRaises(RuntimeError, registry.find_region, [])
+
+    def test_invalid_regions_are_rejected(self):
+        registry = RegionRegistry()
+        registry.add_region('warszawa', [20.85, 52.09, 21.28, 52.37], {})
+        self.assertRaises(ValueError, registry.add_region, 'warszawa', [20.0, 52.0, 21.0, 53.0], {})
+        self.assertRaises(ValueError, registry.add_region, 'pusty', [21.0, 52.0, 21.0, 53.0], {})
+        self.assertRaises(ValueError, registry.add_region, 'krótki', [21.0, 52.0, 22.0], {})
+
+    def test_registry_is_loaded_from_json(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'regions': [{'name': 'warszawa', 'bbox': [20.85, 52.09, 21.28, 52.37],
+                                    'app': {'array_graph_dir': 'graphs/warszawa'}}]}, f)
+        try:
+            registry = RegionRegistry.load(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(registry.names(), ['warszawa'])
+        self.assertEqual(registry.get_app_parameters('warszawa'), {'array_graph_dir': 'graphs/warszawa'})
+
+
+class ShardRouterTests(SimpleTestCase):
+
+    def test_calls_are_validated_before_loading(self):
+        with ShardRouter(build_registry(['a'])) as router:
+            self.assertRaises(ValueError, router.call, 'a', 'initialize_state')
+            self.assertRaises(ValueError, router.call, 'b', 'get_graph_version')
+            self.assertEqual(router.resident_shards(), {})
+        self.assertRaises(ValueError, ShardRouter, build_registry(['a']), 0)
+
+    def test_least_recently_used_region_is_evicted(self):
+        with ShardRouter(build_registry(['a', 'b']), max_resident_shards=1) as router:
+            version = router.call('a', 'get_graph_version')
+            self.assertEqual(list(router.resident_shards()), ['a'])
+            self.assertEqual(router.call('b', 'get_graph_version'), version)
+            self.assertEqual(list(router.resident_shards()), ['b'])
+            region, path = router.run_query_from_coordinates([(52.2, 21.0), (52.21, 21.01)])
+            self.assertEqual((region, path[0], path[-1]), ('a', 1, 36))
+            self.assertEqual(list(router.resident_shards()), ['a'])
+
+    def test_failed_worker_is_replaced_without_evicting_the_region(self):
+        with ShardRouter(build_registry(['a']), workers_per_shard=2) as router:
+            router.call('a', 'get_graph_version')
+            shard = router._shards['a']
+            failed, other = shard._workers
+            failed._process.kill()
+            failed._process.join()
+            errors = 0
+            for _ in range(4):
+                try:
+                    router.call('a', 'get_routing_parameters')
+                except RuntimeError:
+                    errors += 1
+            self.assertEqual(errors, 1)
+            self.assertIs(router._shards['a'], shard)
+            self.assertNotIn(failed, shard._workers)
+            self.assertIn(other, shard._workers)
+            self.assertTrue(all(worker._process.is_alive() for worker in shard._workers))
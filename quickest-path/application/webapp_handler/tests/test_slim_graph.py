@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_simplifier import GraphSimplifier
+from src.graph_utils import encode_highway
+from src.left_turn_handler import LeftTurnHandler
+from src.slim_graph import SlimGraph
+from .graphs import build_grid_graph, subdivide_streets
+
+
+class SlimGraphTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(5, 5, seed=2).to_networkx()
+        for u, v, data in self.G.edges(data=True):
+            data['name'] = f'street {min(u, v)}-{max(u, v)}'
+        self.slim_graph = SlimGraph.from_networkx(self.G)
+
+    def test_structure_matches_networkx(self):
+        self.assertEqual(sorted(self.slim_graph.nodes), sorted(self.G.nodes))
+        self.assertEqual(sorted(self.slim_graph.edges()), sorted(self.G.edges()))
+        for node in self.G.nodes:
+            self.assertEqual(sorted(self.slim_graph.successors(node)), sorted(self.G.successors(node)))
+            self.assertEqual(sorted(self.slim_graph.predecessors(node)), sorted(self.G.predecessors(node)))
+            self.assertEqual(self.slim_graph.nodes[node], {'x': self.G.nodes[node]['x'], 'y': self.G.nodes[node]['y']})
+        for u, v, data in self.G.edges(data=True):
+            slim_data = self.slim_graph.get_edge_data(u, v, 0)
+            self.assertEqual(slim_data['estimated_time'], data['estimated_time'])
+            self.assertEqual((slim_data['maxspeed'], slim_data['highway']), (data['maxspeed'], encode_highway(data['highway'])))
+        self.assertIsNone(self.slim_graph.get_edge_data(1, 25))
+        self.assertNotIn(0, self.slim_graph)
+
+    def test_precision_sensitive_arrays_are_float64(self):
+        self.assertEqual(self.slim_graph.x.dtype, np.float64)
+        self.assertEqual(self.slim_graph.y.dtype, np.float64)
+        self.assertEqual(self.slim_graph.estimated_time.dtype, np.float64)
+        self.assertEqual(self.slim_graph.indices.dtype, np.int32)
+
+    def test_paths_match_networkx(self):
+        finder = BestPathFinder(LeftTurnHandler(30.0, 20.0, 10.0, 45.0), 140, None, 'python')
+        for source, dest in ((1, 25), (5, 21), (13, 1), (22, 4)):
+            try:
+                expected = finder.find_shortest_path_with_stats(self.G, source, dest)[:2]
+            except RuntimeError:
+                self.assertRaises(RuntimeError, finder.find_shortest_path_with_stats, self.slim_graph, source, dest)
+                continue
+            path, cost, _ = finder.find_shortest_path_with_stats(self.slim_graph, source, dest)
+            self.assertEqual(path, expected[0])
+            self.assertAlmostEqual(cost, expected[1], places=9)
+
+    def test_display_attributes_are_stored_separately(self):
+        with tempfile.TemporaryDirectory() as directory:
+            slim_graph = SlimGraph.from_networkx(self.G, os.path.join(directory, 'display.pkl'))
+            slim_graph.save(directory)
+            loaded = SlimGraph.load(directory)
+            self.assertFalse(loaded.display_store.is_loaded())
+            u, v = next(iter(self.G.edges()))
+            self.assertEqual(loaded.display_attributes(u, v), {'name': self.G.edges[u, v, 0]['name']})
+            self.assertNotIn('name', loaded.get_edge_data(u, v, 0))
+
+    def test_without_nodes(self):
+        smaller = self.slim_graph.without_nodes([1, 13])
+        self.G.remove_nodes_from([1, 13])
+        self.assertEqual(sorted(smaller.edges()), sorted(self.G.edges()))
+
+    def test_simplified_graph_is_rejected(self):
+        simplified = GraphSimplifier(LeftTurnHandler(30.0, 20.0, 10.0, 45.0)).simplify(subdivide_streets(self.G))
+        self.assertRaises(ValueError, SlimGraph.from_networkx, simplified)
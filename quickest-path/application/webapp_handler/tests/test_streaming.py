@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from webapp_handler.services import stream_route
+
+
+class _LegApp:
+    # stands in for App: yields the given legs, then optionally fails like a leg with no path would
+    def __init__(self, legs: list, error: str = ''):
+        self._last_query_coordinates = [(52.2, 21.0), (52.21, 21.01)]
+        self._legs = legs
+        self._error = error
+
+    def run_query_iter(self, addresses: list):
+        def legs():
+            yield from self._legs
+            if self._error:
+                raise RuntimeError(self._error)
+        return legs()
+
+
+class StreamRouteTests(TestCase):
+
+    LEG = ([1, 2], [(21.0, 52.2), (21.01, 52.21)], 12.5)
+
+    def test_empty_address_list_streams_an_error(self):
+        self.assertEqual(list(stream_route([], None)), [('error', {'type': 'error', 'message': 'No addresses to visit'})])
+
+    def test_legs_are_streamed_in_order(self):
+        events = list(stream_route(['a', 'b', 'c'], _LegApp([self.LEG, self.LEG])))
+        self.assertEqual([event for event, _ in events], ['points', 'leg', 'leg', 'done'])
+        self.assertEqual(len(events[0][1]['features']), 2)
+        self.assertEqual([data['properties']['leg'] for event, data in events if event == 'leg'], [0, 1])
+        self.assertEqual(events[1][1]['geometry']['coordinates'], [[21.0, 52.2], [21.01, 52.21]])
+
+    def test_failed_leg_ends_the_stream_with_an_error(self):
+        events = list(stream_route(['a', 'b', 'c'], _LegApp([self.LEG], 'brak trasy')))
+        self.assertEqual([event for event, _ in events], ['points', 'leg', 'error'])
+        self.assertEqual(events[-1][1]['message'], 'brak trasy')
+
+    def test_stream_view_without_entries(self):
+        response = self.client.get('/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(b''.join(response.streaming_content).decode(),
+                         'event: error\ndata: {"type": "error", "message": "No addresses to visit"}\n\n')
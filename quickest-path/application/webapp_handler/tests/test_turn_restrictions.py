@@ -0,0 +1,103 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.graph_provider import GraphProvider
+from src.isochrone import IsochroneBuilder
+from src.left_turn_handler import LeftTurnHandler
+from src.slim_graph import SlimGraph
+from src.turn_restrictions import TurnRestrictionIndex, TURN_RESTRICTIONS_FILENAME, TURN_RESTRICTIONS_KEY
+from .graphs import build_grid_graph, path_triples
+
+
+class TurnRestrictionTests(SimpleTestCase):
+
+    SOURCE, DEST = 1, 16
+
+    def setUp(self):
+        self.G = build_grid_graph().to_networkx()
+        self.handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+        self.baseline, self.baseline_cost = self.find(self.G, 'python')
+
+    def find(self, G, backend: str) -> tuple:
+        path, cost, _ = BestPathFinder(self.handler, 140, None, backend).find_shortest_path_with_stats(G, self.SOURCE, self.DEST)
+        return path, cost
+
+    def assert_restricted_paths(self, rules: list):
+        index = TurnRestrictionIndex.from_rules(rules)
+        self.G.graph[TURN_RESTRICTIONS_KEY] = index
+        results = [self.find(self.G, 'python'), self.find(SlimGraph.from_networkx(self.G), 'kernel')]
+        for path, cost in results:
+            self.assertEqual((path[0], path[-1]), (self.SOURCE, self.DEST))
+            self.assertNotEqual(path, self.baseline)
+            self.assertGreaterEqual(cost, self.baseline_cost)
+            self.assertFalse(any(index.is_forbidden(*triple) for triple in path_triples(path)))
+        # both backends must agree on the detour
+        self.assertEqual(results[0][0], results[1][0])
+        self.assertAlmostEqual(results[0][1], results[1][1], places=6)
+
+    def test_prohibitive_restriction_is_avoided(self):
+        self.assert_restricted_paths([triple + (False,) for triple in path_triples(self.baseline)])
+
+    def test_mandatory_restriction_forces_the_given_turn(self):
+        from_node, via, to_node = path_triples(self.baseline)[0]
+        other = next(node for node in self.G.successors(via) if node not in (from_node, to_node))
+        self.assert_restricted_paths([(from_node, via, other, True)])
+
+    def test_restriction_on_another_approach_does_not_block_the_node(self):
+        from_node, via, to_node = path_triples(self.baseline)[0]
+        other = next(node for node in self.G.predecessors(via) if node not in (from_node, to_node))
+        self.G.graph[TURN_RESTRICTIONS_KEY] = TurnRestrictionIndex.from_rules([(other, via, to_node, False)])
+        for G, backend in ((self.G, 'python'), (SlimGraph.from_networkx(self.G), 'kernel')):
+            self.assertEqual(self.find(G, backend)[0], self.baseline)
+
+    def test_index_lookup(self):
+        index = TurnRestrictionIndex.from_rules([(1, 2, 3, False), (4, 2, 5, True), (4, 2, 6, True)])
+        self.assertTrue(index.is_forbidden(1, 2, 3))
+        self.assertFalse(index.is_forbidden(1, 2, 7))
+        self.assertFalse(index.is_forbidden(4, 2, 5))
+        self.assertTrue(index.is_forbidden(4, 2, 7))
+        self.assertFalse(index.is_forbidden(8, 2, 7))
+        self.assertFalse(index.is_forbidden(1, 9, 3))
+        self.assertEqual(index.nodes(), {1, 2, 3, 4, 5, 6})
+
+    def test_isochrone_search_tree_avoids_forbidden_turns(self):
+        builder = IsochroneBuilder(self.handler)
+        _, tree = builder._search(self.G, self.SOURCE, 600)
+        rules = [(tree[tree[node]], tree[node], node, False) for node in tree if tree[node] != -1 and tree[tree[node]] != -1]
+        index = TurnRestrictionIndex.from_rules(rules)
+        self.G.graph[TURN_RESTRICTIONS_KEY] = index
+        dist, tree = IsochroneBuilder(self.handler)._search(self.G, self.SOURCE, 600)
+        for node, predecessor in tree.items():
+            if predecessor != -1 and tree[predecessor] != -1:
+                self.assertFalse(index.is_forbidden(tree[predecessor], predecessor, node))
+        self.assertGreater(len(dist), 1)
+
+
+class StreamingRestrictionTests(SimpleTestCase):
+
+    def test_streaming_build_saves_restrictions_next_to_the_graph(self):
+        graph = build_grid_graph()
+        index = TurnRestrictionIndex.from_rules([(1, 2, 3, False), (5, 6, 7, True)])
+        with tempfile.TemporaryDirectory() as directory:
+            def ingest(pbf_filepath, output_dir):
+                graph.save(output_dir)
+                return graph
+
+            with mock.patch('src.graph_provider.get_data', return_value='region.osm.pbf'), \
+                    mock.patch('src.graph_provider.StreamingGraphIngestor') as ingestor, \
+                    mock.patch('src.graph_provider.RestrictionParser') as parser:
+                ingestor.return_value.ingest.side_effect = ingest
+                parser.is_available.return_value = True
+                parser.return_value.parse.return_value = index
+                self.assertIs(GraphProvider().build_graph_streaming('region', directory), graph)
+                parser.return_value.parse.assert_called_once_with('region.osm.pbf')
+
+            self.assertTrue(os.path.exists(os.path.join(directory, TURN_RESTRICTIONS_FILENAME)))
+            loaded = GraphProvider().read_slim_graph(directory, min_component_size=1)
+            self.assertTrue(loaded.graph[TURN_RESTRICTIONS_KEY].is_forbidden(1, 2, 3))
+            self.assertTrue(loaded.graph[TURN_RESTRICTIONS_KEY].is_forbidden(5, 6, 8))
+            del loaded
@@ -0,0 +1,85 @@
+import itertools
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from src.a_star import BestPathFinder
+from src.left_turn_handler import LeftTurnHandler
+from src.slim_graph import SlimGraph
+from src.turn_restrictions import TurnRestrictionIndex, TURN_RESTRICTIONS_KEY
+from src.vrp_solver import VehicleRoutingSolver, _evaluate_route, build_travel_time_matrix
+from .graphs import build_grid_graph, path_triples
+
+
+class TravelTimeMatrixTests(SimpleTestCase):
+
+    def setUp(self):
+        self.G = build_grid_graph(8, 8, seed=3).to_networkx()
+        self.handler = LeftTurnHandler(30.0, 20.0, 10.0, 45.0)
+        self.nodes = random.Random(3).sample(list(self.G.nodes), 7)
+
+    def pairwise_matrix(self, G) -> np.ndarray:
+        finder = BestPathFinder(self.handler, 140)
+        matrix = np.zeros((len(self.nodes), len(self.nodes)))
+        for (i, source), (j, dest) in itertools.product(enumerate(self.nodes), repeat=2):
+            if i != j:
+                matrix[i, j] = finder.find_shortest_path_with_stats(G, source, dest)[1]
+        return matrix
+
+    def assert_matrix_matches_pairwise_search(self):
+        expected = self.pairwise_matrix(self.G)
+        for G, backend in ((self.G, 'python'), (SlimGraph.from_networkx(self.G), 'kernel')):
+            matrix = build_travel_time_matrix(G, BestPathFinder(self.handler, 140, None, backend), self.nodes)
+            np.testing.assert_allclose(matrix, expected, rtol=1e-9)
+
+    def test_matrix_matches_pairwise_search(self):
+        self.assert_matrix_matches_pairwise_search()
+
+    def test_matrix_matches_pairwise_search_with_restrictions(self):
+        path = BestPathFinder(self.handler, 140).find_shortest_path(self.G, self.nodes[0], self.nodes[1])
+        self.G.graph[TURN_RESTRICTIONS_KEY] = TurnRestrictionIndex.from_rules([triple + (False,) for triple in path_triples(path)])
+        self.assert_matrix_matches_pairwise_search()
+
+    def test_unreachable_stop_gets_infinite_time(self):
+        self.G.add_node(100, x=21.0, y=52.2)
+        self.G.add_edge(100, self.nodes[0], u=100, v=self.nodes[0], length=10.0, estimated_time=1.0,
+                        highway='residential', maxspeed=50)
+        nodes = self.nodes[:3] + [100]
+        for G, backend in ((self.G, 'python'), (SlimGraph.from_networkx(self.G), 'kernel')):
+            matrix = build_travel_time_matrix(G, BestPathFinder(self.handler, 140, None, backend), nodes)
+            self.assertTrue(np.isinf(matrix[:3, 3]).all())
+            self.assertTrue(np.isfinite(matrix[3, :3]).all())
+
+
+class VehicleRoutingSolverTests(SimpleTestCase):
+
+    def brute_force_cost(self, matrix: np.ndarray, max_stops: list) -> float:
+        best = np.inf
+        stops = range(1, len(matrix))
+        for assignment in itertools.product(range(len(max_stops)), repeat=len(stops)):
+            routes = [[stop for stop, vehicle in zip(stops, assignment) if vehicle == k] for k in range(len(max_stops))]
+            if any(len(route) > limit for route, limit in zip(routes, max_stops)):
+                continue
+            cost = sum(min(_evaluate_route(matrix, 0, list(order), limit, np.inf, True)[1]
+                           for order in itertools.permutations(route))
+                       for route, limit in zip(routes, max_stops))
+            best = min(best, cost)
+        return best
+
+    def test_solver_finds_the_optimum_on_small_instances(self):
+        rng = np.random.default_rng(1)
+        for seed in range(5):
+            points = rng.uniform(0, 100, size=(6, 2))
+            matrix = np.linalg.norm(points[:, None] - points[None, :], axis=2) * rng.uniform(1.0, 1.3, size=(6, 6))
+            solver = VehicleRoutingSolver(None, 2, [3, 2], time_budget=2.0, processes=1, seed=seed)
+            routes, cost = solver.solve_matrix(matrix)
+            self.assertEqual(sorted(stop for route in routes for stop in route), list(range(1, 6)))
+            self.assertAlmostEqual(cost, self.brute_force_cost(matrix, [3, 2]), places=6)
+
+    def test_numpy_limits_are_accepted(self):
+        matrix = np.array([[0.0, 5.0], [6.0, 0.0]])
+        solver = VehicleRoutingSolver(None, 3, np.array([0, 0, 1]), time_budget=1.0, processes=1)
+        routes, cost = solver.solve_matrix(matrix)
+        self.assertEqual(routes, [[], [], [1]])
+        self.assertAlmostEqual(cost, 11.0)
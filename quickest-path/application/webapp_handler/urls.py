@@ -5,4 +5,8 @@ urlpatterns = [
     path('', views.text_entry_view, name='text_entry'),
     path('success/', views.text_entry_success_view, name='text_entry_success'),
     path('delete/<int:entry_id>/', views.delete_text_entry_view, name='delete_text_entry'),
+    path('isochrone/', views.isochrone_view, name='isochrone'),
+    path('compact/', views.route_compact_view, name='route_compact'),
+    path('stream/', views.route_stream_view, name='route_stream'),
+    path('api/route/', views.route_api_view, name='route_api'),
 ]
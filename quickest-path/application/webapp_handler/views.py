@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
+import json
+import time
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from .forms import TextEntryForm
 from .models import TextEntry
-from .services import process_text_list, get_last_coords
+from .services import process_text_list_cached, process_text_list_compact, process_isochrone, stream_route, server_timing_header
 from src.app import App
+from src.input_validator import InputValidator, MAX_ISOCHRONE_MINUTES
 
-app = App(False)
+app = App(bool(settings.ROUTING_PICKLE_FILEPATH), settings.ROUTING_PICKLE_FILEPATH,
+          array_graph_dir=settings.ROUTING_ARRAY_GRAPH_DIR, nominatim_endpoint=settings.NOMINATIM_ENDPOINT)
 app.initialize_state()
 
 def text_entry_view(request):
@@ -21,23 +27,91 @@ def text_entry_success_view(request):
     entries = TextEntry.objects.all()
     geojson = None  # Initially, no processing done
     last_coords = None
+    cache_hit = None
+    timings = {}
     if request.method == 'POST':
         # Check if the processing button is clicked
         if 'process_text' in request.POST:
-            # Process all texts
+            # Process all texts (the same addresses are served from the route cache)
             texts = [entry.text for entry in entries]
             geojson = {}
             last_coords = []
             if len(texts) > 0:
-                geojson = process_text_list(texts, app)
-                last_coords = get_last_coords(app)
-    return render(request, 'webapp_handler/text_entry_success.html', {
+                start = time.perf_counter()
+                geojson, last_coords, cache_hit = process_text_list_cached(texts, app, timings)
+                timings['total'] = time.perf_counter() - start
+    response = render(request, 'webapp_handler/text_entry_success.html', {
         'entries': entries,
         'geojson': geojson,
         'last_coords': last_coords
     })
+    if cache_hit is not None:
+        response['X-Route-Cache'] = 'HIT' if cache_hit else 'MISS'
+    if timings:
+        response['Server-Timing'] = server_timing_header(timings)
+    return response
+
+def route_api_view(request):
+    # stateless JSON endpoint (used by the load tests), e.g. /api/route/?address=Plac Defilad 1, Warszawa&address=Wilanów, Warszawa
+    texts = request.GET.getlist('address')
+    if len(texts) < 2:
+        return JsonResponse({'type': 'error', 'message': 'At least two address parameters are required'}, status=400)
+    timings = {}
+    start = time.perf_counter()
+    geojson, last_coords, cache_hit = process_text_list_cached(texts, app, timings)
+    timings['total'] = time.perf_counter() - start
+    response = JsonResponse({'geojson': geojson, 'last_coords': last_coords},
+                            status=400 if geojson.get('type') == 'error' else 200)
+    response['X-Route-Cache'] = 'HIT' if cache_hit else 'MISS'
+    response['Server-Timing'] = server_timing_header(timings)
+    return response
 
 def delete_text_entry_view(request, entry_id):
     entry = get_object_or_404(TextEntry, id=entry_id)
     entry.delete()
     return redirect('text_entry_success')
+
+def isochrone_view(request):
+    # e.g. /isochrone/?address=Plac Defilad 1, Warszawa&minutes=10,20,30
+    address = request.GET.get('address', '')
+    try:
+        minutes = [float(m) for m in request.GET.get('minutes', '10,20,30').split(',')]
+    except ValueError:
+        return JsonResponse({'type': 'error', 'message': 'Invalid minutes parameter'}, status=400)
+    # nan, inf or a huge budget would make the search cover the whole graph (and the result would be cached)
+    if not InputValidator().validate_isochrone_minutes(minutes):
+        return JsonResponse({'type': 'error', 'message': f'Minutes must be positive and at most {MAX_ISOCHRONE_MINUTES}'},
+                            status=400)
+    timings = {}
+    start = time.perf_counter()
+    geojson = process_isochrone(address, minutes, app, timings)
+    timings['total'] = time.perf_counter() - start
+    status = 400 if geojson.get('type') == 'error' else 200
+    response = JsonResponse(geojson, status=status)
+    response['Server-Timing'] = server_timing_header(timings)
+    return response
+
+def route_compact_view(request):
+    # e.g. /compact/?zoom=13&format=polyline
+    texts = [entry.text for entry in TextEntry.objects.all()]
+    try:
+        zoom = int(request.GET.get('zoom', '14'))
+    except ValueError:
+        return JsonResponse({'type': 'error', 'message': 'Invalid zoom parameter'}, status=400)
+    geojson = process_text_list_compact(texts, app, zoom, request.GET.get('format') == 'polyline')
+    response = JsonResponse(geojson, status=400 if geojson.get('type') == 'error' else 200)
+    response['X-Payload-Bytes'] = str(len(response.content))
+    return response
+
+def route_stream_view(request):
+    # server-sent events: every leg of the tour is pushed to the map as soon as it is computed
+    texts = [entry.text for entry in TextEntry.objects.all()]
+
+    def events():
+        for event, data in stream_route(texts, app):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response